@@ -1,8 +1,22 @@
-from .transcriptor import AnalyzeMediaLink
-from .analysis import analyzeTranscript, keywordExtractor
+import importlib
+
+# Exports are imported on first access, so importing one submodule doesn't load the others' dependencies
+_EXPORTS = {
+    "AnalyzeMediaLink": ".transcriptor",
+    "analyzeTranscript": ".analysis",
+    "keywordExtractor": ".analysis",
+    "TranscriptCache": ".cache",
+}
 
 __all__ = [
     "AnalyzeMediaLink",
     "analyzeTranscript",
     "keywordExtractor",
-]
\ No newline at end of file
+    "TranscriptCache",
+]
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
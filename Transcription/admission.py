@@ -0,0 +1,280 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from .metrics import ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS, LLM_SLOT_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, lower is served first
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a pipeline can't be admitted; ``retry_after`` is the suggested wait in seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    def __init__(self, priority: str, bounded: bool):
+        self.priority = priority
+        self.bounded = bounded
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued = time.monotonic()
+
+
+class _LimitedClient:
+    """Ollama client wrapper taking one of the controller's LLM call slots per chat request."""
+
+    def __init__(self, client, controller: "AdmissionController"):
+        self._client = client
+        self._controller = controller
+
+    async def chat(self, *args, **kwargs):
+        started = time.perf_counter()
+        async with self._controller._llm_slots:
+            LLM_SLOT_WAIT_SECONDS.observe(time.perf_counter() - started)
+            self._controller.llm_calls_in_flight += 1
+            try:
+                return await self._client.chat(*args, **kwargs)
+            finally:
+                self._controller.llm_calls_in_flight -= 1
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class AdmissionSlot:
+    """
+    A pipeline slot held by a streamed response, given back exactly once.
+
+    The stream releases it when it ends, and the response's background task when
+    the stream never started (a client gone before the first chunk); ``release``
+    is idempotent, so both may run.
+    """
+
+    def __init__(self, controller: "AdmissionController", waited: float):
+        self._controller = controller
+        self.waited = waited
+        self.started = time.monotonic()
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self._controller.release(time.monotonic() - self.started)
+
+    async def aclose(self) -> None:
+        self.release()
+
+    async def release_after(self, events: AsyncIterator) -> AsyncIterator:
+        """Forward a streamed pipeline, releasing the slot once the stream ends."""
+        try:
+            async for event in events:
+                yield event
+        finally:
+            self.release()
+
+
+class AdmissionController:
+    """
+    Caps the pipelines running at once and the LLM calls they have in flight.
+
+    Pipelines beyond ``max_pipelines`` wait in a queue served by priority class
+    (``interactive`` before ``batch``), first come first served within a class.
+    When ``max_queue`` requests are already waiting, a new request is rejected
+    right away, unless it outranks a queued one, which is then rejected in its
+    place; requests waiting longer than ``max_wait`` are rejected as well.
+    Unbounded admissions (used by the job workers and bulk runs, which already
+    queue their own work) always wait and never count towards ``max_queue``.
+    """
+
+    def __init__(
+        self,
+        max_pipelines: int = 8,
+        max_llm_calls: int = 32,
+        max_queue: int = 64,
+        max_wait: float | None = 60.0,
+    ):
+        self.max_pipelines = max(1, max_pipelines)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.running = 0
+        self.max_llm_calls = max(1, max_llm_calls)
+        self._llm_slots = asyncio.Semaphore(self.max_llm_calls)
+        self.llm_calls_in_flight = 0
+        self._queue: list[tuple[int, int, _Waiter]] = []
+        self._order = itertools.count()
+        self._bounded_waiting = 0
+        # Seconds a pipeline holds its slot, smoothed, to estimate Retry-After
+        self._hold_seconds = 10.0
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.rejected = {priority: 0 for priority in PRIORITIES}
+        self._wait_seconds = {priority: 0.0 for priority in PRIORITIES}
+        self._max_wait_seconds = {priority: 0.0 for priority in PRIORITIES}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Build the controller from the ADMISSION_* environment variables."""
+        max_wait = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "60"))
+        return cls(
+            max_pipelines=int(os.getenv("ADMISSION_MAX_PIPELINES", "8")),
+            max_llm_calls=int(os.getenv("ADMISSION_MAX_LLM_CALLS", "32")),
+            max_queue=int(os.getenv("ADMISSION_QUEUE_SIZE", "64")),
+            max_wait=max_wait if max_wait > 0 else None,
+        )
+
+    def limit(self, client):
+        """Wrap an Ollama client (or backend pool) so its calls share the global LLM call cap."""
+        return _LimitedClient(client, self)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free for a new request, from the queue length and recent run times."""
+        ahead = len(self._queue) + 1
+        return max(1, math.ceil(self._hold_seconds * ahead / self.max_pipelines))
+
+    def _reject(self, priority: str, reason: str) -> AdmissionRejected:
+        self.rejected[priority] += 1
+        ADMISSION_REJECTED.inc(priority=priority, reason=reason)
+        return AdmissionRejected(f"Server busy ({reason}), retry later", self.retry_after())
+
+    def _check_priority(self, priority: str) -> None:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {', '.join(PRIORITIES)}")
+
+    async def acquire(self, priority: str = "interactive", bounded: bool = True) -> float:
+        """
+        Wait for a pipeline slot.
+
+        Args:
+            priority: Priority class of the request
+            bounded: Whether the request counts towards the queue bound and wait limit
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait exceeded ``max_wait``
+        """
+        self._check_priority(priority)
+        if self.running < self.max_pipelines and not self._queue:
+            self.running += 1
+            self.admitted[priority] += 1
+            self._record_wait(priority, 0.0)
+            return 0.0
+
+        if bounded and self._bounded_waiting >= self.max_queue:
+            self._evict_for(priority)
+
+        waiter = _Waiter(priority, bounded)
+        heapq.heappush(self._queue, (PRIORITIES[priority], next(self._order), waiter))
+        if bounded:
+            self._bounded_waiting += 1
+        try:
+            timeout = self.max_wait if bounded else None
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except BaseException as e:
+            self._remove(waiter)
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                # The slot was handed over just as the wait ended, pass it on
+                self._release_slot()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(priority, "timeout")
+            raise
+        finally:
+            self._uncount(waiter)
+        waited = time.monotonic() - waiter.enqueued
+        self._record_wait(priority, waited)
+        return waited
+
+    def _evict_for(self, priority: str) -> None:
+        """Make room in a full queue by rejecting its lowest priority bounded waiter, or reject the newcomer."""
+        bounded = [entry for entry in self._queue if entry[2].bounded and not entry[2].future.done()]
+        worst = max(bounded, default=None)
+        if worst is None or worst[0] <= PRIORITIES[priority]:
+            raise self._reject(priority, "queue_full")
+        evicted = worst[2]
+        self._remove(evicted)
+        self._uncount(evicted)
+        evicted.future.set_exception(self._reject(evicted.priority, "evicted"))
+        logger.info(f"Evicted a queued {evicted.priority} request for an {priority} one")
+
+    def _remove(self, waiter: _Waiter) -> None:
+        for i, entry in enumerate(self._queue):
+            if entry[2] is waiter:
+                self._queue.pop(i)
+                heapq.heapify(self._queue)
+                return
+
+    def _uncount(self, waiter: _Waiter) -> None:
+        # Stop counting a waiter towards max_queue as soon as it leaves the queue, not when its task resumes
+        if waiter.bounded:
+            waiter.bounded = False
+            self._bounded_waiting -= 1
+
+    def _record_wait(self, priority: str, waited: float) -> None:
+        ADMISSION_WAIT_SECONDS.observe(waited, priority=priority)
+        self._wait_seconds[priority] += waited
+        self._max_wait_seconds[priority] = max(self._max_wait_seconds[priority], waited)
+
+    def _release_slot(self) -> None:
+        # Hand the slot straight to the first waiter, so running never exceeds the cap
+        while self._queue:
+            _, _, waiter = heapq.heappop(self._queue)
+            if not waiter.future.done():
+                self.admitted[waiter.priority] += 1
+                self._uncount(waiter)
+                waiter.future.set_result(None)
+                return
+        self.running -= 1
+
+    def release(self, held_seconds: float | None = None) -> None:
+        """Give back a pipeline slot, ``held_seconds`` after it was acquired."""
+        if held_seconds is not None:
+            self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * held_seconds
+        self._release_slot()
+
+    @asynccontextmanager
+    async def admit(self, priority: str = "interactive", bounded: bool = True):
+        """Hold a pipeline slot for the duration of the block, which gets the seconds spent waiting for it."""
+        waited = await self.acquire(priority, bounded)
+        started = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self.release(time.monotonic() - started)
+
+    async def hold(self, priority: str = "interactive", bounded: bool = True) -> "AdmissionSlot":
+        """Acquire a pipeline slot held beyond the caller's block, e.g. for a streamed response."""
+        waited = await self.acquire(priority, bounded)
+        return AdmissionSlot(self, waited)
+
+    def stats(self) -> dict:
+        queued = {priority: 0 for priority in PRIORITIES}
+        for _, _, waiter in self._queue:
+            queued[waiter.priority] += 1
+        return {
+            "running": self.running,
+            "max_pipelines": self.max_pipelines,
+            "llm_calls_in_flight": self.llm_calls_in_flight,
+            "max_llm_calls": self.max_llm_calls,
+            "queued": queued,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "mean_wait_seconds": {
+                priority: self._wait_seconds[priority] / self.admitted[priority] if self.admitted[priority] else 0.0
+                for priority in PRIORITIES
+            },
+            "max_wait_seconds": self._max_wait_seconds,
+            "retry_after": self.retry_after(),
+        }
@@ -1,196 +1,670 @@
-from ..models.prompts import DescriptivePhrasesPrompt, KeywordExtractionPrompt
+from ..models.prompts import DescriptivePhrasesPrompt, BatchedDescriptivePhrasesPrompt, KeywordExtractionPrompt
+from ..models.general_utils import estimate_tokens
+from .backends import BackendPool, default_pool
+from .memo import LLMMemo
+from .deadline import Deadline
+from .prefilter import HeuristicSentenceFilter, SentencePrefilter
+from .metrics import JSON_REPAIRS, LLM_MALFORMED, LLM_OUTPUT_TOKENS, LLM_REQUESTS, record_llm_call, span
+from .segmentation import segment_transcript
 import ollama
-import nltk
-from nltk.tokenize import sent_tokenize
 import json
 import logging
 import asyncio
+import os
+import time
 
-# Configure logging for better debug messages
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Ollama model used by both LLM stages unless a caller picks another one
+DEFAULT_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
 
-async def analyzeTranscript(transcript: str, model_name: str = "llama3"):
+# Upper bound on Ollama requests in flight per analysis call
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4"))
+
+# Default token budget for the sentences packed into one batched prompt
+DEFAULT_BATCH_TOKEN_BUDGET = int(os.getenv("OLLAMA_BATCH_TOKEN_BUDGET", "1024"))
+
+
+# Structured output format of each stage's replies, Ollama constrains generation to it
+STAGE_SCHEMAS = {
+    "fragments": DescriptivePhrasesPrompt.schema,
+    "fragments_batched": BatchedDescriptivePhrasesPrompt.schema,
+    "keywords": KeywordExtractionPrompt.schema,
+}
+
+# Prompt template of each stage, part of its memo keys
+STAGE_TEMPLATES = {
+    "fragments": DescriptivePhrasesPrompt.template,
+    "fragments_batched": BatchedDescriptivePhrasesPrompt.template,
+    "keywords": KeywordExtractionPrompt.template,
+}
+
+# Cap on the tokens generated per reply (per sentence for batched prompts), so a
+# rambling model is cut off instead of generating up to the context size
+MAX_OUTPUT_TOKENS = {
+    "fragments": int(os.getenv("OLLAMA_MAX_FRAGMENT_TOKENS", "256")),
+    "keywords": int(os.getenv("OLLAMA_MAX_KEYWORD_TOKENS", "128")),
+}
+
+
+def generation_options(stage: str, units: int = 1) -> dict:
+    """
+    Options of a stage's chat requests, also part of its memo keys and fingerprint.
+
+    Args:
+        stage: ``fragments``, ``fragments_batched`` or ``keywords``
+        units: Sentences answered by one reply, scaling its output token cap
+    """
+    cap = MAX_OUTPUT_TOKENS["keywords" if stage == "keywords" else "fragments"]
+    return {"format": STAGE_SCHEMAS[stage], "options": {"num_predict": cap * max(1, units)}}
+
+# Process-wide count of Ollama chat requests sent, for throughput reporting
+LLM_CALL_STATS = {"calls": 0}
+
+# Per-sentence and per-fragment INFO logs are costly under load, so they are opt-in
+LOG_PER_SENTENCE = os.getenv("LOG_PER_SENTENCE", "0").lower() in ("1", "true", "yes")
+
+# httpx logs one INFO line per Ollama request, kept only along with the per-sentence logs
+if not LOG_PER_SENTENCE:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+class _StageRun:
+    """Shared state of the concurrent LLM calls of one analyzeTranscript/keywordExtractor run."""
+
+    def __init__(
+        self,
+        client: ollama.AsyncClient | BackendPool,
+        model_name: str,
+        max_concurrency: int,
+        total: int | None,
+        memo: LLMMemo | None = None,
+    ):
+        self.client = client
+        self.model_name = model_name
+        self.semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        # Set when the run must stop early (e.g. missing model)
+        self.stop_event = asyncio.Event()
+        self.total = total
+        self.memo = memo
+
+    def memo_key(self, stage: str, template: str, text: str) -> str | None:
+        if self.memo is None:
+            return None
+        return self.memo.key(stage, self.model_name, template, generation_options(stage), text)
+
+    async def chat(self, prompt: str, stage: str, units: int = 1):
+        """Send a single schema-constrained chat request through the async Ollama client, recording its metrics under ``stage``."""
+        LLM_CALL_STATS["calls"] += 1
+        started = time.perf_counter()
+        try:
+            response = await self.client.chat(
+                model=self.model_name,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                **generation_options(stage, units)
+            )
+        except BaseException:
+            record_llm_call(stage, time.perf_counter() - started, outcome="error")
+            raise
+        record_llm_call(stage, time.perf_counter() - started, response)
+        return response
+
+    def stop_for_missing_model(self) -> None:
+        if not self.stop_event.is_set():
+            logging.error(f"Model '{self.model_name}' not found. Please check if it's installed.")
+        self.stop_event.set()
+
+
+def _is_model_missing(error: ollama.ResponseError) -> bool:
+    """Whether an Ollama error means the requested model is not installed."""
+    return error.status_code == 404 or "model not found" in str(error).lower()
+
+
+async def analyzeTranscript(
+    transcript: str,
+    model_name: str = DEFAULT_MODEL,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    client: ollama.AsyncClient | BackendPool | None = None,
+    batch_size: int | None = None,
+    batch_token_budget: int | None = None,
+    memo: LLMMemo | None = None,
+    prefilter: SentencePrefilter | None = None,
+    segments: list[dict] | None = None,
+    deadline: Deadline | None = None,
+):
     """
     Analyze transcript by breaking it into sentences and extracting descriptive phrases.
+
+    Sentences are sent to Ollama concurrently, with at most ``max_concurrency``
+    requests in flight; fragments are returned in sentence order.
+
+    When ``batch_size`` or ``batch_token_budget`` is set, consecutive sentences
+    are packed into one indexed prompt instead of one prompt per sentence.
     
     Args:
         transcript: The text to analyze
         model_name: The Ollama model to use for analysis
+        max_concurrency: Maximum number of concurrent Ollama requests
+        client: Async Ollama client or backend pool to use, the process-wide default pool if omitted
+        batch_size: Maximum number of sentences per batched prompt
+        batch_token_budget: Maximum estimated tokens of sentences per batched prompt
+        memo: Memo of parsed LLM results, sentences found in it are not sent again
+        prefilter: Local scorer dropping sentences unlikely to hold descriptive phrases
+        segments: Units to analyze instead of the transcript's sentences, as returned by
+            ``segment_transcript``; unpunctuated transcripts are split into windows otherwise
+        deadline: Latency budget; the most promising sentences are sent first, and the
+            calls still pending when it expires are cancelled and recorded in it
         
     Returns:
         dict: Dictionary containing all extracted fragments
     """
+    fragments_by_index = {}
+    async for batch_fragments in iterTranscriptFragments(
+        transcript,
+        model_name=model_name,
+        max_concurrency=max_concurrency,
+        client=client,
+        batch_size=batch_size,
+        batch_token_budget=batch_token_budget,
+        memo=memo,
+        prefilter=prefilter,
+        segments=segments,
+        deadline=deadline,
+    ):
+        fragments_by_index.update(batch_fragments)
+
+    all_fragments = [
+        fragment
+        for i in sorted(fragments_by_index)
+        for fragment in fragments_by_index[i]
+    ]
+
+    logging.info(f"Analysis complete. Total fragments extracted: {len(all_fragments)}")
+    return {"fragments": all_fragments}
+
+
+async def iterTranscriptFragments(
+    transcript: str,
+    model_name: str = DEFAULT_MODEL,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    client: ollama.AsyncClient | BackendPool | None = None,
+    batch_size: int | None = None,
+    batch_token_budget: int | None = None,
+    memo: LLMMemo | None = None,
+    prefilter: SentencePrefilter | None = None,
+    segments: list[dict] | None = None,
+    deadline: Deadline | None = None,
+):
+    """
+    Stream the fragments of a transcript as the Ollama calls complete.
+
+    Takes the same arguments as ``analyzeTranscript``. Every sentence (or batch of
+    sentences) is started right away; results are yielded in transcript order.
+
+    With a ``deadline``, sentences take the LLM slots in order of their pre-filter
+    score, highest first. Once its fragment stage expires, the results already done
+    are yielded and the rest is cancelled.
+
+    Yields:
+        dict: Fragments keyed by sentence (or segment) index, one dict per sentence or batch
+    """
     # Input validation
     if not transcript or not transcript.strip():
         logging.warning("Empty or whitespace-only transcript provided")
-        return {"fragments": []}
-    
-    # Download required NLTK data if not present
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        logging.info("Downloading NLTK punkt tokenizer...")
-        nltk.download('punkt')
+        return
     
+    # The tokenizer data is checked once per process, never downloaded mid-request
     try:
-        sentences = sent_tokenize(transcript)
+        if segments is None:
+            segments = segment_transcript(transcript)
+        sentences = [segment["text"] for segment in segments]
         logging.info(f"Processing {len(sentences)} sentences from transcript")
     except Exception as e:
         logging.error(f"Failed to tokenize transcript: {e}")
-        return {"fragments": []}
+        return
     
     if not sentences:
         logging.warning("No sentences found in transcript")
-        return {"fragments": []}
-    
-    all_fragments = []
+        return
+
+    run = _StageRun(client or default_pool(), model_name, max_concurrency, len(sentences), memo)
 
+    # Skip empty or very short sentences
+    indexed_sentences = []
     for i, sentence in enumerate(sentences):
-        # Skip empty or very short sentences
         if not sentence.strip() or len(sentence.strip()) < 5:
             logging.debug(f"Skipping sentence {i+1}: too short or empty")
             continue
-            
+        indexed_sentences.append((i, sentence))
+
+    # Leave filler sentences out before any LLM call
+    if prefilter is not None:
+        indexed_sentences = prefilter.select(indexed_sentences)
+
+    # (first sentence index, sentence indexes, ready result or coroutine) per unit of work
+    units = []
+    if batch_size or batch_token_budget:
+        # Memoized sentences are answered directly and left out of the batches
+        pending = []
+        for i, sentence in indexed_sentences:
+            key = run.memo_key("fragments_batched", BatchedDescriptivePhrasesPrompt.template, sentence)
+            cached = await run.memo.get(key) if key else None
+            if cached is not None:
+                units.append((i, [i], {i: cached}))
+            else:
+                pending.append((i, sentence))
+
+        batches = pack_sentence_batches(
+            pending,
+            batch_size=batch_size,
+            token_budget=batch_token_budget or DEFAULT_BATCH_TOKEN_BUDGET,
+        )
+        logging.info(f"Packed {len(pending)} sentences into {len(batches)} batches")
+        units.extend(
+            (batch[0][0], [i for i, _ in batch], _batch_fragments(run, batch)) for batch in batches
+        )
+        units.sort(key=lambda unit: unit[0])
+    else:
+        units = [(i, [i], _indexed_sentence_fragments(run, sentence, i)) for i, sentence in indexed_sentences]
+
+    # Tasks take the LLM slots in creation order: under a deadline, the best scoring units go first
+    order = list(range(len(units)))
+    if deadline is not None and units:
+        scorer = prefilter.scorer if prefilter is not None else HeuristicSentenceFilter()
+        scores = dict(zip(
+            (i for i, _ in indexed_sentences),
+            scorer.score([sentence for _, sentence in indexed_sentences]),
+        ))
+        order.sort(key=lambda k: -max(scores[i] for i in units[k][1]))
+
+    # Start everything now, then hand the results out in transcript order
+    scheduled = [None] * len(units)
+    for k in order:
+        work = units[k][2]
+        scheduled[k] = asyncio.create_task(work) if asyncio.iscoroutine(work) else work
+    try:
+        for position, work in enumerate(scheduled):
+            if not isinstance(work, asyncio.Task):
+                yield work
+                continue
+            if deadline is None:
+                yield await work
+                continue
+            try:
+                yield await deadline.wait(work, "fragments")
+            except asyncio.TimeoutError:
+                # Out of time: hand out what is already done and give up on the rest
+                cut = 0
+                for k in range(position, len(units)):
+                    work = scheduled[k]
+                    if not isinstance(work, asyncio.Task):
+                        yield work
+                    elif work.done() and not work.cancelled():
+                        yield work.result()
+                    else:
+                        work.cancel()
+                        deadline.segments_cut.update(units[k][1])
+                        cut += 1
+                logging.warning(f"Fragment stage out of time, cancelled {cut} of {len(units)} LLM calls")
+                return
+    finally:
+        for work in scheduled:
+            if isinstance(work, asyncio.Task):
+                work.cancel()
+
+
+async def _indexed_sentence_fragments(run: _StageRun, sentence: str, i: int) -> dict[int, list]:
+    return {i: await _sentence_fragments(run, sentence, i)}
+
+
+async def _sentence_fragments(run: _StageRun, sentence: str, i: int) -> list:
+    """
+    Extract the fragments of a single sentence.
+
+    Args:
+        run: Shared state of the analysis run
+        sentence: Sentence to analyze
+        i: Zero-based sentence index, used for logging
+
+    Returns:
+        list: Fragments for the sentence, empty if the call failed or was skipped
+    """
+    memo_key = run.memo_key("fragments", DescriptivePhrasesPrompt.template, sentence)
+    if memo_key:
+        cached = await run.memo.get(memo_key)
+        if cached is not None:
+            logging.debug(f"Memoized fragments for sentence {i+1}")
+            return cached
+
+    async with run.semaphore:
+        if run.stop_event.is_set():
+            return []
+
         try:
             # Use the prompt template from the DescriptivePhrasesPrompt class
             prompt_template_content = DescriptivePhrasesPrompt.template.format(sentence=sentence)
             
-            logging.info(f"Processing sentence {i+1}/{len(sentences)}: '{sentence[:100]}...'")
+            if LOG_PER_SENTENCE:
+                logging.info(f"Processing sentence {i+1}/{run.total}: '{sentence[:100]}...'")
 
             # Make the API call with proper error handling
-            response = ollama.chat(
-                model=model_name,
-                messages=[
-                    {"role": "user", "content": prompt_template_content}
-                ],
-                format="json"
-            )
+            response = await run.chat(prompt_template_content, "fragments")
 
-            raw_ollama_content = response.get('message', {}).get('content', '')
-            
-            if not raw_ollama_content.strip():
-                logging.warning(f"Ollama returned empty content for sentence {i+1}")
-                continue
-
-            logging.debug(f"Raw Ollama response for sentence {i+1}: {raw_ollama_content}")
-
-            # Parse JSON response with robust error handling
-            json_content = parse_json_response(raw_ollama_content, i+1)
-            
-            if json_content is None:
-                continue
-                
-            # Extract fragments from the response
-            fragments = extract_fragments(json_content, i+1)
-            if fragments:
-                all_fragments.extend(fragments)
+            reply = parse_reply(response, "fragments", f"sentence {i+1}")
+            if reply is None:
+                return []
+            fragments = clean_strings(reply["fragments"])
+            if fragments and LOG_PER_SENTENCE:
                 logging.info(f"Added {len(fragments)} fragments from sentence {i+1}")
+            if memo_key:
+                await run.memo.set(memo_key, fragments)
+            return fragments
 
         except ollama.ResponseError as e:
             logging.error(f"Ollama API error for sentence {i+1}: {e}")
-            # Consider whether to continue or break based on error type
-            if "model not found" in str(e).lower():
-                logging.error(f"Model '{model_name}' not found. Please check if it's installed.")
-                break
+            # Stop the remaining sentences if the model itself is missing
+            if _is_model_missing(e):
+                run.stop_for_missing_model()
         except asyncio.TimeoutError:
             logging.error(f"Timeout error for sentence {i+1}")
         except Exception as e:
             logging.error(f"Unexpected error for sentence {i+1}: {e}")
             logging.debug(f"Sentence content: '{sentence}'")
+        return []
 
-    logging.info(f"Analysis complete. Total fragments extracted: {len(all_fragments)}")
-    return {"fragments": all_fragments}
 
+def pack_sentence_batches(
+    indexed_sentences: list[tuple[int, str]],
+    batch_size: int | None = None,
+    token_budget: int | None = None,
+) -> list[list[tuple[int, str]]]:
+    """
+    Pack consecutive sentences into batches for a single prompt.
+
+    A batch is closed when it holds ``batch_size`` sentences or when adding the
+    next sentence would exceed ``token_budget`` estimated tokens. A sentence that
+    is larger than the budget on its own still gets a batch of its own.
+
+    Args:
+        indexed_sentences: (sentence index, sentence) pairs in transcript order
+        batch_size: Maximum number of sentences per batch, unbounded if None
+        token_budget: Maximum estimated tokens per batch, unbounded if None
 
-def parse_json_response(raw_content: str, sentence_num: int) -> dict:
+    Returns:
+        list: Batches of (sentence index, sentence) pairs
     """
-    Parse JSON response from Ollama with robust error handling.
-    
+    batches = []
+    current = []
+    current_tokens = 0
+    for i, sentence in indexed_sentences:
+        tokens = estimate_tokens(sentence)
+        if current and (
+            (batch_size and len(current) >= batch_size)
+            or (token_budget and current_tokens + tokens > token_budget)
+        ):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append((i, sentence))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def _batch_fragments(run: _StageRun, batch: list[tuple[int, str]]) -> dict[int, list]:
+    """
+    Extract the fragments of a batch of sentences with one indexed prompt.
+
+    A malformed reply splits the batch in two halves which are retried on their
+    own; a single sentence falls back to the per-sentence prompt.
+
     Args:
-        raw_content: Raw response string from Ollama
-        sentence_num: Sentence number for logging
-        
+        run: Shared state of the analysis run
+        batch: (sentence index, sentence) pairs to analyze
+
     Returns:
-        dict: Parsed JSON content or None if parsing fails
+        dict: Fragments keyed by sentence index
     """
-    try:
-        # First, try direct JSON parsing
-        if raw_content.strip().startswith(("{", "[")):
-            return json.loads(raw_content)
-        
-        # If not direct JSON, try to extract JSON from the response
-        logging.warning(f"Response for sentence {sentence_num} doesn't start with JSON. Attempting extraction.")
-        
-        # Look for JSON object boundaries
-        start_idx = raw_content.find('{')
-        end_idx = raw_content.rfind('}')
-        
-        if start_idx == -1 or end_idx == -1 or end_idx <= start_idx:
-            logging.error(f"No valid JSON object found in response for sentence {sentence_num}")
-            return None
-            
-        potential_json_str = raw_content[start_idx:end_idx + 1]
-        parsed_json = json.loads(potential_json_str)
-        logging.info(f"Successfully extracted JSON from response for sentence {sentence_num}")
-        return parsed_json
-        
-    except json.JSONDecodeError as e:
-        logging.error(f"JSON decode error for sentence {sentence_num}: {e}")
-        logging.debug(f"Problematic content: {raw_content}")
-        return None
-    except Exception as e:
-        logging.error(f"Unexpected error parsing JSON for sentence {sentence_num}: {e}")
+    if len(batch) == 1:
+        i, sentence = batch[0]
+        return {i: await _sentence_fragments(run, sentence, i)}
+
+    first, last = batch[0][0] + 1, batch[-1][0] + 1
+    async with run.semaphore:
+        if run.stop_event.is_set():
+            return {}
+
+        try:
+            numbered = "\n".join(f"[{n}] {sentence}" for n, (_, sentence) in enumerate(batch))
+            prompt_content = BatchedDescriptivePhrasesPrompt.template.format(sentences=numbered)
+
+            if LOG_PER_SENTENCE:
+                logging.info(f"Processing sentences {first}-{last}/{run.total} as one batch")
+
+            response = await run.chat(prompt_content, "fragments_batched", units=len(batch))
+
+            reply = parse_reply(response, "fragments_batched", f"sentences {first}-{last}")
+            batch_fragments = extract_batched_fragments(reply, len(batch), first) if reply is not None else None
+            if batch_fragments is not None:
+                fragments_by_index = {i: batch_fragments[n] for n, (i, _) in enumerate(batch)}
+                if LOG_PER_SENTENCE:
+                    logging.info(
+                        f"Added {sum(map(len, batch_fragments))} fragments from sentences {first}-{last}"
+                    )
+                for i, sentence in batch:
+                    memo_key = run.memo_key("fragments_batched", BatchedDescriptivePhrasesPrompt.template, sentence)
+                    if memo_key:
+                        await run.memo.set(memo_key, fragments_by_index[i])
+                return fragments_by_index
+
+        except ollama.ResponseError as e:
+            logging.error(f"Ollama API error for sentences {first}-{last}: {e}")
+            if _is_model_missing(e):
+                run.stop_for_missing_model()
+            return {}
+        except asyncio.TimeoutError:
+            logging.error(f"Timeout error for sentences {first}-{last}")
+            return {}
+        except Exception as e:
+            logging.error(f"Unexpected error for sentences {first}-{last}: {e}")
+            return {}
+
+    # Retry outside the semaphore so the halves can acquire it themselves
+    logging.warning(f"Malformed batch reply for sentences {first}-{last}, splitting the batch")
+    middle = len(batch) // 2
+    halves = await asyncio.gather(
+        _batch_fragments(run, batch[:middle]),
+        _batch_fragments(run, batch[middle:]),
+    )
+    return {**halves[0], **halves[1]}
+
+
+# Python types of the JSON schema types used by the stage schemas
+_JSON_TYPES = {"object": dict, "array": list, "string": str, "integer": int}
+
+
+def parse_reply(response, stage: str, label: str) -> dict | None:
+    """
+    Parse an LLM reply and validate it against the JSON schema of its stage.
+
+    The one parse path of every stage. Replies are requested in the schema's
+    structured output format, so they normally parse as they are; a JSON object
+    wrapped in other text (a model or server ignoring the format) is still
+    extracted as a fallback.
+
+    Args:
+        response: Ollama chat response
+        stage: Stage of the call: ``fragments``, ``fragments_batched`` or ``keywords``
+        label: What the reply answers, for logging (e.g. "sentence 3")
+
+    Returns:
+        dict: The reply, matching the stage schema, or None if it is malformed
+        (counted in ``media_analysis_llm_malformed_total`` by reason)
+    """
+    content = response.get('message', {}).get('content', '') or ''
+    reason = None
+    if not content.strip():
+        reason = "empty"
+    else:
+        try:
+            reply = json.loads(content)
+        except json.JSONDecodeError:
+            reply = _repair_json(content, stage, label)
+        if reply is None:
+            # A reply cut by the output token cap is not valid JSON either
+            reason = "truncated" if response.get("done_reason") == "length" else "invalid_json"
+        elif not _conforms(reply, STAGE_SCHEMAS[stage]):
+            reason = "schema"
+
+    if reason is not None:
+        LLM_MALFORMED.inc(stage=stage, reason=reason)
+        logging.warning(f"Malformed reply for {label} ({reason})")
+        logging.debug(f"Reply content for {label}: {content}")
         return None
+    return reply
+
+
+def _repair_json(content: str, stage: str, label: str):
+    """The JSON object inside a reply holding other text too, None if there is none."""
+    with span("json_repair", llm_stage=stage, reply=label):
+        start_idx = content.find('{')
+        end_idx = content.rfind('}')
+        try:
+            if start_idx == -1 or end_idx <= start_idx:
+                raise ValueError("no JSON object")
+            parsed = json.loads(content[start_idx:end_idx + 1])
+        except ValueError:
+            JSON_REPAIRS.inc(stage=stage, outcome="failed")
+            return None
+    logging.info(f"Extracted the JSON object from the reply for {label}")
+    JSON_REPAIRS.inc(stage=stage, outcome="repaired")
+    return parsed
+
+
+def _conforms(value, schema: dict) -> bool:
+    """Whether a parsed value matches a JSON schema, for the subset of JSON schema the stages use."""
+    expected = _JSON_TYPES[schema["type"]]
+    if not isinstance(value, expected) or isinstance(value, bool):
+        return False
+    if expected is dict:
+        if any(key not in value for key in schema.get("required", ())):
+            return False
+        return all(_conforms(value[key], sub) for key, sub in schema.get("properties", {}).items() if key in value)
+    if expected is list:
+        return all(_conforms(item, schema["items"]) for item in value)
+    return True
 
 
-def extract_fragments(json_content: dict, sentence_num: int) -> list:
+def clean_strings(items: list[str]) -> list[str]:
+    """Strip the fragments or keywords of a validated reply, dropping quotes around them and empty ones."""
+    cleaned = []
+    for item in items:
+        item = item.strip()
+        if len(item) >= 2 and item[0] == item[-1] and item[0] in "\"'":
+            item = item[1:-1].strip()
+        if item:
+            cleaned.append(item)
+    return cleaned
+
+
+def extract_batched_fragments(reply: dict, batch_len: int, first_sentence_num: int) -> list | None:
     """
-    Extract fragments from parsed JSON response.
-    
+    Map the entries of a validated batched reply back to the batch positions.
+
     Args:
-        json_content: Parsed JSON response
-        sentence_num: Sentence number for logging
-        
+        reply: Reply matching the batched schema
+        batch_len: Number of sentences in the batch
+        first_sentence_num: Number of the first sentence in the batch, used for logging
+
     Returns:
-        list: List of fragments or empty list if extraction fails
+        list: One list of fragments per batch position, or None if some position is missing
     """
-    if not isinstance(json_content, dict):
-        logging.warning(f"JSON content for sentence {sentence_num} is not a dictionary")
-        return []
-    
-    fragments = json_content.get("fragments", [])
-    
-    if not isinstance(fragments, list):
-        logging.warning(f"'fragments' key for sentence {sentence_num} is not a list: {type(fragments)}")
-        return []
-    
-    # Validate fragments
-    valid_fragments = []
-    for fragment in fragments:
-        if isinstance(fragment, str) and fragment.strip():
-            valid_fragments.append(fragment.strip())
-        elif isinstance(fragment, dict):
-            # Handle case where fragments are objects with text field
-            text = fragment.get('text', fragment.get('phrase', ''))
-            if text and isinstance(text, str):
-                valid_fragments.append(text.strip())
-    
-    if len(valid_fragments) != len(fragments):
-        logging.debug(f"Filtered {len(fragments) - len(valid_fragments)} invalid fragments from sentence {sentence_num}")
-    
-    return valid_fragments
+    batch_fragments = [None] * batch_len
+    for entry in reply["sentences"]:
+        if 0 <= entry["index"] < batch_len:
+            batch_fragments[entry["index"]] = clean_strings(entry["fragments"])
+
+    missing = [index for index, fragments in enumerate(batch_fragments) if fragments is None]
+    if missing:
+        LLM_MALFORMED.inc(stage="fragments_batched", reason="incomplete")
+        logging.warning(f"Batch at sentence {first_sentence_num} is missing indexes {missing}")
+        return None
+    return batch_fragments
+
 
-async def keywordExtractor(fragments, model_name: str = "llama3"):
+def llm_output_stats() -> dict:
+    """Per stage: LLM replies received, malformed replies by reason and average output tokens per reply."""
+    stats = {}
+    for stage in STAGE_SCHEMAS:
+        replies = LLM_REQUESTS.value(stage=stage, outcome="ok")
+        malformed = {
+            reason: LLM_MALFORMED.value(stage=stage, reason=reason)
+            for reason in ("empty", "invalid_json", "truncated", "schema", "incomplete")
+        }
+        stats[stage] = {
+            "replies": int(replies),
+            "malformed": {reason: int(count) for reason, count in malformed.items() if count},
+            "malformed_rate": sum(malformed.values()) / replies if replies else 0.0,
+            "mean_output_tokens": LLM_OUTPUT_TOKENS.value(stage=stage) / replies if replies else 0.0,
+        }
+    return stats
+
+
+async def keywordExtractor(
+    fragments,
+    model_name: str = DEFAULT_MODEL,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    client: ollama.AsyncClient | BackendPool | None = None,
+    memo: LLMMemo | None = None,
+):
     """
     Extract keywords from a list of text fragments using Ollama.
+
+    Fragments are sent to Ollama concurrently, with at most ``max_concurrency``
+    requests in flight; keywords are returned in fragment order.
     
     Args:
         fragments: List of text fragments to process, or dict with 'fragments' key
         model_name: The Ollama model to use for keyword extraction
+        max_concurrency: Maximum number of concurrent Ollama requests
+        client: Async Ollama client or backend pool to use, the process-wide default pool if omitted
+        memo: Memo of parsed LLM results, fragments found in it are not sent again
         
     Returns:
         dict: Dictionary containing all extracted keywords
     """
+    unique_keywords = []
+    seen = set()
+    async for keywords in iterFragmentKeywords(
+        fragments,
+        model_name=model_name,
+        max_concurrency=max_concurrency,
+        client=client,
+        memo=memo,
+    ):
+        unique_keywords.extend(dedupe_keywords(keywords, seen))
+
+    logging.info(f"Keyword extraction complete. Total unique keywords: {len(unique_keywords)}")
+    return {"keywords": unique_keywords}
+
+
+async def iterFragmentKeywords(
+    fragments,
+    model_name: str = DEFAULT_MODEL,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    client: ollama.AsyncClient | BackendPool | None = None,
+    memo: LLMMemo | None = None,
+):
+    """
+    Stream the keywords of each fragment as the Ollama calls complete.
+
+    Takes the same arguments as ``keywordExtractor``. Every fragment is started
+    right away; results are yielded in fragment order and are not deduplicated.
+
+    Yields:
+        list: Keywords of one fragment
+    """
     # Handle both dict input (with 'fragments' key) and direct list input
     if isinstance(fragments, dict):
         if 'fragments' in fragments:
@@ -198,170 +672,194 @@ async def keywordExtractor(fragments, model_name: str = "llama3"):
             logging.info(f"Received fragments dictionary with {len(fragments_list)} fragments")
         else:
             logging.warning("Dictionary provided but no 'fragments' key found")
-            return {"keywords": []}
+            return
     elif isinstance(fragments, list):
         fragments_list = fragments
     else:
         logging.warning("Invalid input type. Expected list or dict with 'fragments' key")
-        return {"keywords": []}
+        return
     
     # Input validation
     if not fragments_list or not isinstance(fragments_list, list):
         logging.warning("Empty or invalid fragments list provided")
-        return {"keywords": []}
-    
-    all_keywords = []
-    
+        return
+
+    run = _StageRun(client or default_pool(), model_name, max_concurrency, len(fragments_list), memo)
+
+    tasks = []
     for i, fragment in enumerate(fragments_list):
         # Skip empty or very short fragments
         if not fragment or not isinstance(fragment, str) or len(fragment.strip()) < 3:
             logging.debug(f"Skipping fragment {i+1}: too short or empty")
             continue
-            
+        tasks.append(asyncio.create_task(_fragment_keywords(run, fragment, i)))
+
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def iterQueuedFragmentKeywords(
+    fragments: asyncio.Queue,
+    model_name: str = DEFAULT_MODEL,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    client: ollama.AsyncClient | BackendPool | None = None,
+    memo: LLMMemo | None = None,
+    window: int | None = None,
+    deadline: Deadline | None = None,
+):
+    """
+    Stream the keywords of fragments read from a queue while they are still being produced.
+
+    Fragments are read from ``fragments`` until a None sentinel and started as soon
+    as they arrive. At most ``window`` fragments (default twice ``max_concurrency``)
+    are started but not yet yielded; once the window is full the queue is no longer
+    read, which holds back its producer when the queue is bounded.
+
+    With a ``deadline``, the stream ends when its keyword stage expires: keywords
+    already extracted are still yielded, the other fragments (started or still
+    queued) are counted in ``deadline.fragments_cut``.
+
+    Yields:
+        list: Keywords of one fragment, in fragment order and not deduplicated
+    """
+    run = _StageRun(client or default_pool(), model_name, max_concurrency, None, memo)
+    slots = asyncio.Semaphore(window or 2 * max(1, max_concurrency))
+    started: asyncio.Queue = asyncio.Queue()
+
+    async def start():
         try:
-            # Use the prompt template from the KeywordExtractionPrompt class
-            prompt_content = KeywordExtractionPrompt.template.format(fragment=fragment)
-            
-            logging.info(f"Processing fragment {i+1}/{len(fragments)}: '{fragment[:100]}...'")
+            i = 0
+            while (fragment := await fragments.get()) is not None:
+                # Skip empty or very short fragments
+                if fragment and isinstance(fragment, str) and len(fragment.strip()) >= 3:
+                    await slots.acquire()
+                    await started.put(asyncio.create_task(_fragment_keywords(run, fragment, i)))
+                else:
+                    logging.debug(f"Skipping fragment {i+1}: too short or empty")
+                i += 1
+        finally:
+            started.put_nowait(None)
 
-            # Make the API call
-            response = ollama.chat(
-                model=model_name,
-                messages=[
-                    {"role": "user", "content": prompt_content}
-                ],
-                format="json"
-            )
+    starter = asyncio.create_task(start())
+    try:
+        if deadline is None:
+            while (task := await started.get()) is not None:
+                try:
+                    yield await task
+                finally:
+                    slots.release()
+            return
 
-            raw_content = response.get('message', {}).get('content', '')
-            
-            if not raw_content.strip():
-                logging.warning(f"Ollama returned empty content for fragment {i+1}")
-                continue
+        left = []
+        try:
+            while (task := await deadline.wait(started.get(), "keywords")) is not None:
+                left = [task]
+                try:
+                    yield await deadline.wait(task, "keywords")
+                finally:
+                    slots.release()
+                left = []
+        except asyncio.TimeoutError:
+            # Out of time: hand out what is already done and count the fragments left without keywords
+            starter.cancel()
+            while not started.empty():
+                left.append(started.get_nowait())
+            cut = 0
+            for task in left:
+                if task is None:
+                    continue
+                if task.done() and not task.cancelled():
+                    yield task.result()
+                else:
+                    task.cancel()
+                    cut += 1
+            while not fragments.empty():
+                if fragments.get_nowait() is not None:
+                    cut += 1
+            deadline.fragments_cut += cut
+            logging.warning(f"Keyword stage out of time, {cut} fragments left without keywords")
+    finally:
+        starter.cancel()
+        while not started.empty():
+            task = started.get_nowait()
+            if task is not None:
+                task.cancel()
 
-            logging.debug(f"Raw Ollama response for fragment {i+1}: {raw_content}")
 
-            # Parse JSON response
-            json_content = parse_keyword_json_response(raw_content, i+1)
-            
-            if json_content is None:
-                continue
-                
-            # Extract keywords from the response
-            keywords = extract_keywords_from_response(json_content, i+1)
-            if keywords:
-                all_keywords.extend(keywords)
-                logging.info(f"Added {len(keywords)} keywords from fragment {i+1}")
+def dedupe_keywords(keywords: list, seen: set) -> list:
+    """
+    Remove duplicates while preserving order, case-insensitively.
 
-        except ollama.ResponseError as e:
-            logging.error(f"Ollama API error for fragment {i+1}: {e}")
-            if "model not found" in str(e).lower():
-                logging.error(f"Model '{model_name}' not found. Please check if it's installed.")
-                break
-        except Exception as e:
-            logging.error(f"Unexpected error for fragment {i+1}: {e}")
-            logging.debug(f"Fragment content: '{fragment}'")
+    Args:
+        keywords: Keywords to filter
+        seen: Lowercased keywords already emitted, updated in place
 
-    # Remove duplicates while preserving order
+    Returns:
+        list: Keywords not seen before, in their original order
+    """
     unique_keywords = []
-    seen = set()
-    for keyword in all_keywords:
+    for keyword in keywords:
         keyword_lower = keyword.lower()
         if keyword_lower not in seen:
             unique_keywords.append(keyword)
             seen.add(keyword_lower)
+    return unique_keywords
 
-    logging.info(f"Keyword extraction complete. Total unique keywords: {len(unique_keywords)}")
-    return {"keywords": unique_keywords}
 
-
-def parse_keyword_json_response(raw_content: str, fragment_num: int) -> dict:
+async def _fragment_keywords(run: _StageRun, fragment: str, i: int) -> list:
     """
-    Parse JSON response from Ollama for keyword extraction.
-    
+    Extract the keywords of a single fragment.
+
     Args:
-        raw_content: Raw response string from Ollama
-        fragment_num: Fragment number for logging
-        
+        run: Shared state of the extraction run
+        fragment: Fragment to analyze
+        i: Zero-based fragment index, used for logging
+
     Returns:
-        dict: Parsed JSON content or None if parsing fails
+        list: Keywords for the fragment, empty if the call failed or was skipped
     """
-    try:
-        # First, try direct JSON parsing
-        if raw_content.strip().startswith(("{", "[")):
-            return json.loads(raw_content)
-        
-        # If not direct JSON, try to extract JSON from the response
-        logging.warning(f"Response for fragment {fragment_num} doesn't start with JSON. Attempting extraction.")
-        
-        # Look for JSON object boundaries
-        start_idx = raw_content.find('{')
-        end_idx = raw_content.rfind('}')
-        
-        if start_idx == -1 or end_idx == -1 or end_idx <= start_idx:
-            logging.error(f"No valid JSON object found in response for fragment {fragment_num}")
-            return None
-            
-        potential_json_str = raw_content[start_idx:end_idx + 1]
-        parsed_json = json.loads(potential_json_str)
-        logging.info(f"Successfully extracted JSON from response for fragment {fragment_num}")
-        return parsed_json
-        
-    except json.JSONDecodeError as e:
-        logging.error(f"JSON decode error for fragment {fragment_num}: {e}")
-        logging.debug(f"Problematic content: {raw_content}")
-        return None
-    except Exception as e:
-        logging.error(f"Unexpected error parsing JSON for fragment {fragment_num}: {e}")
-        return None
+    memo_key = run.memo_key("keywords", KeywordExtractionPrompt.template, fragment)
+    if memo_key:
+        cached = await run.memo.get(memo_key)
+        if cached is not None:
+            logging.debug(f"Memoized keywords for fragment {i+1}")
+            return cached
 
+    async with run.semaphore:
+        if run.stop_event.is_set():
+            return []
 
-def extract_keywords_from_response(json_content: dict, fragment_num: int) -> list:
-    """
-    Extract keywords from parsed JSON response.
-    
-    Args:
-        json_content: Parsed JSON response
-        fragment_num: Fragment number for logging
-        
-    Returns:
-        list: List of keywords or empty list if extraction fails
-    """
-    if not isinstance(json_content, dict):
-        logging.warning(f"JSON content for fragment {fragment_num} is not a dictionary")
-        return []
-    
-    # Try different possible key names (handle inconsistencies in the prompt template)
-    keywords = None
-    for key in ["keywords", "key_words", "key-words"]:
-        if key in json_content:
-            keywords = json_content[key]
-            break
-    
-    if keywords is None:
-        logging.warning(f"No recognized keywords key found for fragment {fragment_num}. Available keys: {list(json_content.keys())}")
-        return []
-    
-    if not isinstance(keywords, list):
-        logging.warning(f"Keywords for fragment {fragment_num} is not a list: {type(keywords)}")
-        return []
-    
-    # Validate and clean keywords
-    valid_keywords = []
-    for keyword in keywords:
-        if isinstance(keyword, str) and keyword.strip():
-            cleaned_keyword = keyword.strip()
-            # Remove quotes if present
-            if (cleaned_keyword.startswith('"') and cleaned_keyword.endswith('"')) or \
-               (cleaned_keyword.startswith("'") and cleaned_keyword.endswith("'")):
-                cleaned_keyword = cleaned_keyword[1:-1].strip()
+        try:
+            # Use the prompt template from the KeywordExtractionPrompt class
+            prompt_content = KeywordExtractionPrompt.template.format(fragment=fragment)
             
-            if cleaned_keyword:  # Make sure it's not empty after cleaning
-                valid_keywords.append(cleaned_keyword)
-    
-    if len(valid_keywords) != len(keywords):
-        logging.debug(f"Filtered {len(keywords) - len(valid_keywords)} invalid keywords from fragment {fragment_num}")
-    
-    return valid_keywords
+            if LOG_PER_SENTENCE:
+                logging.info(f"Processing fragment {i+1}/{run.total or '?'}: '{fragment[:100]}...'")
+
+            # Make the API call
+            response = await run.chat(prompt_content, "keywords")
 
+            reply = parse_reply(response, "keywords", f"fragment {i+1}")
+            if reply is None:
+                return []
+            keywords = clean_strings(reply["keywords"])
+            if keywords and LOG_PER_SENTENCE:
+                logging.info(f"Added {len(keywords)} keywords from fragment {i+1}")
+            if memo_key:
+                await run.memo.set(memo_key, keywords)
+            return keywords
 
+        except ollama.ResponseError as e:
+            logging.error(f"Ollama API error for fragment {i+1}: {e}")
+            if _is_model_missing(e):
+                run.stop_for_missing_model()
+        except asyncio.TimeoutError:
+            logging.error(f"Timeout error for fragment {i+1}")
+        except Exception as e:
+            logging.error(f"Unexpected error for fragment {i+1}: {e}")
+            logging.debug(f"Fragment content: '{fragment}'")
+        return []
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+# Whisper model of the current pool worker process, loaded once by _init_worker
+_worker_model = None
+
+
+def _init_worker(model_size: str, device: str, threads: int | None) -> None:
+    """Load the Whisper model once per pool worker process."""
+    global _worker_model
+    import torch
+    import whisper
+
+    if threads:
+        torch.set_num_threads(threads)
+    started = time.perf_counter()
+    _worker_model = whisper.load_model(model_size, device=device)
+    logger.info(
+        f"Loaded Whisper model '{model_size}' on {device} in pid {os.getpid()} "
+        f"({time.perf_counter() - started:.1f}s)"
+    )
+
+
+def _warmup() -> int:
+    return os.getpid()
+
+
+def _transcribe(audio, options: dict) -> dict:
+    """Transcribe a file path or 16 kHz mono float32 array in a pool worker."""
+    started = time.perf_counter()
+    result = _worker_model.transcribe(audio, **options)
+    return {
+        "text": result["text"].strip(),
+        "segments": [
+            {"start": segment["start"], "end": segment["end"], "text": segment["text"].strip()}
+            for segment in result.get("segments", [])
+        ],
+        "duration": time.perf_counter() - started,
+    }
+
+
+class ASREngine:
+    """
+    Whisper transcription engine backed by a bounded process pool.
+
+    The model is loaded once in every pool worker, at startup with ``preload``
+    (the server's default) or else on the first transcription, so the engine is
+    meant to be created once per server process (in the FastAPI lifespan) and
+    shared by all requests.
+    Transcriptions run off the event loop; the engine tracks the queue depth and
+    recent per-job latencies.
+    """
+
+    def __init__(
+        self,
+        model_size: str = "base",
+        workers: int = 1,
+        threads: int | None = None,
+        device: str = "cpu",
+        preload: bool = True,
+        latency_window: int = 256,
+        chunk_seconds: float = 300.0,
+        overlap_seconds: float = 2.0,
+    ):
+        self.model_size = model_size
+        self.workers = max(1, workers)
+        self.threads = threads
+        self.device = device
+        self.preload = preload
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self._executor: ProcessPoolExecutor | None = None
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._latencies: deque[float] = deque(maxlen=latency_window)
+        self._run_times: deque[float] = deque(maxlen=latency_window)
+
+    @classmethod
+    def from_env(cls) -> "ASREngine":
+        """Build the engine from the WHISPER_MODEL and ASR_* environment variables."""
+        threads = os.getenv("ASR_THREADS")
+        return cls(
+            model_size=os.getenv("WHISPER_MODEL", "base"),
+            workers=int(os.getenv("ASR_WORKERS", "1")),
+            threads=int(threads) if threads else None,
+            device=os.getenv("ASR_DEVICE", "cpu"),
+            preload=os.getenv("ASR_PRELOAD", "1").lower() not in ("0", "false", "no"),
+            chunk_seconds=float(os.getenv("ASR_CHUNK_SECONDS", "300")),
+            overlap_seconds=float(os.getenv("ASR_CHUNK_OVERLAP_SECONDS", "2")),
+        )
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn keeps the event loop and its threads out of the workers
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_size, self.device, self.threads),
+            )
+        return self._executor
+
+    async def start(self) -> None:
+        """Start the pool and, if preloading, load the model in every worker."""
+        executor = self._ensure_executor()
+        if not self.preload:
+            return
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        pids = await asyncio.gather(*[
+            loop.run_in_executor(executor, _warmup) for _ in range(self.workers)
+        ])
+        logger.info(
+            f"ASR engine ready with {len(set(pids))} worker(s) in {time.perf_counter() - started:.1f}s"
+        )
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    async def transcribe(self, audio, **options) -> dict:
+        """
+        Transcribe audio in the process pool.
+
+        Args:
+            audio: Path to an audio file, or a 16 kHz mono float32 array
+            **options: Extra keyword arguments for ``whisper.transcribe``
+
+        Returns:
+            dict: ``text``, timestamped ``segments`` and worker ``duration``
+        """
+        options.setdefault("fp16", self.device != "cpu")
+        executor = self._ensure_executor()
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+        self._in_flight += 1
+        try:
+            result = await loop.run_in_executor(executor, _transcribe, audio, options)
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+        latency = time.perf_counter() - queued_at
+        self._completed += 1
+        self._latencies.append(latency)
+        self._run_times.append(result["duration"])
+        logger.info(
+            f"ASR job done in {latency:.2f}s ({result['duration']:.2f}s transcribing, "
+            f"{self._in_flight} still in flight)"
+        )
+        return result
+
+    async def transcribe_long(
+        self,
+        audio,
+        chunk_seconds: float | None = None,
+        overlap_seconds: float | None = None,
+        **options,
+    ) -> dict:
+        """
+        Transcribe long audio as silence-aligned chunks spread over the pool workers.
+
+        Chunks overlap slightly; every chunk's segments are shifted to the
+        position of the chunk in the full audio, and each chunk keeps only the
+        segments whose midpoint falls between its own cut and the next chunk's
+        cut, so a segment straddling a cut is kept by exactly one of the two
+        chunks before they are joined back together. Audio shorter than one chunk (or given as a file
+        path) is transcribed in one job.
+
+        Args:
+            audio: 16 kHz mono float32 array, or a path to an audio file
+            chunk_seconds: Target chunk length, defaults to the engine's setting
+            overlap_seconds: Audio shared by consecutive chunks, defaults to the engine's setting
+            **options: Extra keyword arguments for ``whisper.transcribe``
+
+        Returns:
+            dict: ``text``, timestamped ``segments``, summed worker ``duration`` and ``chunks`` count
+        """
+        chunk_seconds = chunk_seconds or self.chunk_seconds
+        overlap_seconds = self.overlap_seconds if overlap_seconds is None else overlap_seconds
+        if isinstance(audio, str):
+            return {**await self.transcribe(audio, **options), "chunks": 1}
+
+        # numpy is only loaded once audio actually has to be transcribed
+        from .audio import SAMPLE_RATE, split_on_silence
+
+        spans = split_on_silence(audio, chunk_seconds, overlap_seconds)
+        if len(spans) == 1:
+            return {**await self.transcribe(audio, **options), "chunks": 1}
+
+        logger.info(f"Transcribing {len(audio) / SAMPLE_RATE:.0f}s of audio as {len(spans)} chunks")
+        results = await asyncio.gather(*[
+            self.transcribe(audio[start:end], **dict(options))
+            for start, _, end in spans
+        ])
+
+        segments = []
+        next_cuts = [cut for _, cut, _ in spans[1:]] + [None]
+        for (start, cut, _), next_cut, result in zip(spans, next_cuts, results):
+            offset = start / SAMPLE_RATE
+            own_audio_from = cut / SAMPLE_RATE
+            own_audio_until = next_cut / SAMPLE_RATE if next_cut is not None else float("inf")
+            for segment in result["segments"]:
+                segment_start, segment_end = segment["start"] + offset, segment["end"] + offset
+                # Segments centered in the overlap belong to the previous chunk, those past the next cut to the next one
+                midpoint = (segment_start + segment_end) / 2
+                if not own_audio_from <= midpoint < own_audio_until:
+                    continue
+                segments.append({"start": segment_start, "end": segment_end, "text": segment["text"]})
+
+        return {
+            "text": " ".join(segment["text"] for segment in segments if segment["text"]),
+            "segments": segments,
+            "duration": sum(result["duration"] for result in results),
+            "chunks": len(spans),
+        }
+
+    def stats(self) -> dict:
+        """Queue depth, job counts and recent per-job latencies in seconds."""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> float | None:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "model": self.model_size,
+            "device": self.device,
+            "workers": self.workers,
+            "queue_depth": max(0, self._in_flight - self.workers),
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "failed": self._failed,
+            "latency_avg": sum(latencies) / len(latencies) if latencies else None,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "transcribe_avg": sum(self._run_times) / len(self._run_times) if self._run_times else None,
+        }
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import os
+from collections.abc import AsyncIterator
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Whisper expects 16 kHz mono audio
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2
+
+# Longest audio decoded for one request, bounds the PCM buffer (115 MB per hour)
+MAX_AUDIO_SECONDS = float(os.getenv("AUDIO_MAX_SECONDS", str(3 * 3600)))
+
+_READ_SIZE = 64 * 1024
+
+
+class AudioDecodeError(Exception):
+    """Raised when ffmpeg cannot decode the media stream."""
+
+
+def ffmpeg_executable() -> str:
+    """Path of the ffmpeg binary, preferring the one bundled with imageio-ffmpeg."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+
+def _ffmpeg_args(source: str) -> list[str]:
+    return [
+        ffmpeg_executable(),
+        "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", source,
+        "-vn", "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "pipe:1",
+    ]
+
+
+def _max_bytes(max_seconds: float) -> int:
+    return int(max_seconds * SAMPLE_RATE) * BYTES_PER_SAMPLE
+
+
+async def _collect_pcm(process: asyncio.subprocess.Process, max_seconds: float) -> bytes:
+    """Read ffmpeg's PCM output, stopping once ``max_seconds`` of audio were decoded."""
+    max_bytes = _max_bytes(max_seconds)
+    pcm = bytearray()
+    while len(pcm) < max_bytes:
+        chunk = await process.stdout.read(_READ_SIZE)
+        if not chunk:
+            break
+        pcm.extend(chunk)
+    if len(pcm) >= max_bytes:
+        logger.warning(f"Audio truncated to {max_seconds:.1f}s")
+        del pcm[max_bytes:]
+        process.kill()
+    return bytes(pcm)
+
+
+def _to_float32(pcm: bytes) -> np.ndarray:
+    usable = len(pcm) - len(pcm) % BYTES_PER_SAMPLE
+    return np.frombuffer(pcm[:usable], dtype=np.int16).astype(np.float32) / 32768.0
+
+
+async def _finish(process: asyncio.subprocess.Process, pcm: bytes, truncated: bool) -> np.ndarray:
+    stderr = (await process.stderr.read()).decode("utf-8", "replace").strip()
+    returncode = await process.wait()
+    if returncode != 0 and not truncated:
+        raise AudioDecodeError(stderr or f"ffmpeg exited with code {returncode}")
+    if not pcm:
+        raise AudioDecodeError(stderr or "No audio stream found")
+    return _to_float32(pcm)
+
+
+async def decode_audio_stream(
+    chunks: AsyncIterator[bytes],
+    max_seconds: float = MAX_AUDIO_SECONDS,
+) -> np.ndarray:
+    """
+    Decode a media byte stream to 16 kHz mono float32 samples through an ffmpeg pipe.
+
+    The input is written to ffmpeg as it arrives while the PCM output is read
+    concurrently, so neither the media file nor a WAV copy is ever held in memory
+    or written to disk.
+
+    Args:
+        chunks: Media bytes, e.g. an HTTP response body read in chunks
+        max_seconds: Longest audio to decode, the rest is dropped
+
+    Returns:
+        np.ndarray: Samples in [-1, 1], ready for Whisper
+
+    Raises:
+        AudioDecodeError: If ffmpeg fails or finds no audio
+    """
+    process = await asyncio.create_subprocess_exec(
+        *_ffmpeg_args("pipe:0"),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+    async def feed():
+        try:
+            async for chunk in chunks:
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg stopped reading (truncated or failed), its exit status tells why
+            pass
+        finally:
+            if not process.stdin.is_closing():
+                process.stdin.close()
+
+    feeder = asyncio.create_task(feed())
+    try:
+        pcm = await _collect_pcm(process, max_seconds)
+        truncated = len(pcm) >= _max_bytes(max_seconds)
+        # After EOF ffmpeg has either read all input or failed, either way stop feeding
+        feeder.cancel()
+        await asyncio.gather(feeder, return_exceptions=True)
+        return await _finish(process, pcm, truncated)
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+async def decode_audio_url(url: str, max_seconds: float = MAX_AUDIO_SECONDS) -> np.ndarray:
+    """
+    Decode the audio of a remote media URL by letting ffmpeg fetch it.
+
+    ffmpeg issues its own range requests, which is needed for MP4 files whose
+    index is stored at the end and can't be demuxed from a pipe.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *_ffmpeg_args(url),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        pcm = await _collect_pcm(process, max_seconds)
+        truncated = len(pcm) >= _max_bytes(max_seconds)
+        return await _finish(process, pcm, truncated)
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+def split_on_silence(
+    audio: np.ndarray,
+    chunk_seconds: float,
+    overlap_seconds: float = 2.0,
+    search_seconds: float = 15.0,
+    frame_seconds: float = 0.03,
+) -> list[tuple[int, int, int]]:
+    """
+    Split long audio into chunks cut at the quietest point near each chunk boundary.
+
+    Cuts are searched for in the last ``search_seconds`` before every
+    ``chunk_seconds`` mark, using the RMS energy of short frames. Each chunk but the
+    first also starts ``overlap_seconds`` before its cut, so a word clipped at the
+    boundary is still heard whole by one of the two chunks.
+
+    Args:
+        audio: 16 kHz mono float32 samples
+        chunk_seconds: Target chunk length
+        overlap_seconds: Audio repeated before every cut
+        search_seconds: How far back from the target boundary to look for silence
+        frame_seconds: Length of the frames the energy is measured on
+
+    Returns:
+        list: (chunk start, cut, chunk end) sample offsets; the chunk's own audio starts
+        at the cut, the part before it is overlap with the previous chunk
+    """
+    total = len(audio)
+    chunk_len = int(chunk_seconds * SAMPLE_RATE)
+    if chunk_len <= 0 or total <= chunk_len:
+        return [(0, 0, total)]
+
+    frame_len = max(1, int(frame_seconds * SAMPLE_RATE))
+    frame_count = total // frame_len
+    frames = audio[:frame_count * frame_len].reshape(frame_count, frame_len)
+    energy = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+
+    search_len = int(search_seconds * SAMPLE_RATE)
+    overlap_len = int(overlap_seconds * SAMPLE_RATE)
+    cuts = [0]
+    while total - cuts[-1] > chunk_len:
+        target = cuts[-1] + chunk_len
+        low = max(cuts[-1] + chunk_len // 2, target - search_len)
+        first_frame, last_frame = low // frame_len, min(target // frame_len, frame_count)
+        if last_frame > first_frame:
+            quietest = first_frame + int(np.argmin(energy[first_frame:last_frame]))
+            cut = quietest * frame_len + frame_len // 2
+        else:
+            cut = target
+        cuts.append(cut)
+    cuts.append(total)
+
+    return [
+        (max(0, start - overlap_len) if index else 0, start, end)
+        for index, (start, end) in enumerate(zip(cuts[:-1], cuts[1:]))
+    ]
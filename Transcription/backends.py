@@ -0,0 +1,359 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+import httpx
+import ollama
+
+from .metrics import LLM_BACKEND_REQUESTS, LLM_BACKEND_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class NoBackendAvailable(Exception):
+    """Raised when every Ollama backend is ejected or was already tried for a call."""
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Whether a failed call may succeed on another host: connection problems, server errors or a missing model."""
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code >= 500 or error.status_code == 404
+    return isinstance(error, (httpx.TransportError, ConnectionError))
+
+
+def _counts_against_host(error: BaseException) -> bool:
+    """Whether a failure says the host itself is unhealthy (a missing model does not)."""
+    return not (isinstance(error, ollama.ResponseError) and error.status_code < 500)
+
+
+class Backend:
+    """One Ollama host with its client, model aliases and load/health counters."""
+
+    def __init__(
+        self,
+        host: str | None,
+        models: dict[str, str] | None = None,
+        weight: float = 1.0,
+        max_connections: int = 8,
+        keepalive_seconds: float = 30.0,
+        connect_timeout: float = 10.0,
+        timeout: float | None = 300.0,
+    ):
+        self.host = host or os.getenv("OLLAMA_HOST") or "http://127.0.0.1:11434"
+        self.models = models or {}
+        self.weight = max(weight, 1e-9)
+        # Kept to close the pooled connections on shutdown, ollama.AsyncClient has no close()
+        self._transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_seconds,
+            ),
+        )
+        self.client = ollama.AsyncClient(
+            host=self.host,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            transport=self._transport,
+        )
+
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        # Ejected for failing health checks rather than calls, readmitted as soon as a check passes
+        self.ejected_by_health_check = False
+        self.last_error: str | None = None
+        self.latency_seconds = 0.0  # total wall time of completed requests
+        self.ewma_latency: float | None = None
+        self._started = time.monotonic()
+        self._busy_since: float | None = None
+        self._busy_seconds = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def load(self) -> float:
+        """Outstanding requests relative to the backend's weight, lower is better."""
+        return self.outstanding / self.weight
+
+    def model(self, name: str, aliases: dict[str, str]) -> str:
+        """Model name to send to this host for ``name``: host alias first, then the pool-wide alias."""
+        return self.models.get(name) or aliases.get(name, name)
+
+    def begin(self) -> None:
+        if self.outstanding == 0:
+            self._busy_since = time.monotonic()
+        self.outstanding += 1
+        self.requests += 1
+
+    def end(self, seconds: float, error: BaseException | None = None) -> None:
+        """Record a finished request; cancelled requests count neither as a failure nor for latency."""
+        self.outstanding -= 1
+        if self.outstanding == 0 and self._busy_since is not None:
+            self._busy_seconds += time.monotonic() - self._busy_since
+            self._busy_since = None
+        if error is not None and not isinstance(error, Exception):
+            return
+        LLM_BACKEND_SECONDS.observe(seconds, backend=self.host)
+        self.latency_seconds += seconds
+        if error is None:
+            self.ewma_latency = seconds if self.ewma_latency is None else 0.8 * self.ewma_latency + 0.2 * seconds
+            self.consecutive_failures = 0
+        else:
+            self.failures += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+
+    def eject(self, seconds: float, reason: str, health_check: bool = False) -> None:
+        if self.healthy(time.monotonic()):
+            logger.warning(f"Ejecting Ollama backend {self.host} for {seconds:.0f}s: {reason}")
+        self.ejected_until = time.monotonic() + seconds
+        self.ejected_by_health_check = health_check
+
+    def readmit(self) -> None:
+        if not self.healthy(time.monotonic()):
+            logger.info(f"Ollama backend {self.host} is healthy again")
+        self.ejected_until = 0.0
+        self.ejected_by_health_check = False
+        self.consecutive_failures = 0
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        uptime = max(now - self._started, 1e-9)
+        busy = self._busy_seconds + (now - self._busy_since if self._busy_since is not None else 0.0)
+        completed = self.requests - self.outstanding
+        return {
+            "host": self.host,
+            "healthy": self.healthy(now),
+            "weight": self.weight,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "mean_latency": self.latency_seconds / completed if completed else None,
+            "ewma_latency": self.ewma_latency,
+            # Share of the time with at least one request in flight
+            "utilization": busy / uptime,
+            # Average number of requests in flight (Little's law)
+            "mean_outstanding": self.latency_seconds / uptime,
+            "last_error": self.last_error,
+        }
+
+    async def close(self) -> None:
+        await self._transport.aclose()
+
+
+class BackendPool:
+    """
+    Ollama client spreading chat requests over several hosts.
+
+    Each call goes to the healthy backend with the fewest outstanding requests
+    (relative to its weight), ties broken by recent latency. A call failing with
+    a connection or server error is retried on another host, and a host failing
+    ``failure_threshold`` calls in a row is ejected for ``eject_seconds``. Once
+    started, a background task also checks every host each ``health_interval``
+    seconds, ejecting the ones that do not answer and readmitting recovered ones.
+
+    The pool has the ``chat`` method of ``ollama.AsyncClient`` and is used in its place.
+    """
+
+    def __init__(
+        self,
+        backends: list[Backend],
+        aliases: dict[str, str] | None = None,
+        max_attempts: int = 3,
+        failure_threshold: int = 3,
+        eject_seconds: float = 30.0,
+        health_interval: float = 15.0,
+    ):
+        if not backends:
+            raise ValueError("BackendPool needs at least one backend")
+        self.backends = backends
+        self.aliases = aliases or {}
+        self.max_attempts = max(1, max_attempts)
+        self.failure_threshold = max(1, failure_threshold)
+        self.eject_seconds = eject_seconds
+        self.health_interval = health_interval
+        self._health_task: asyncio.Task | None = None
+
+    @classmethod
+    def from_env(
+        cls,
+        max_connections: int = 8,
+        keepalive_seconds: float = 30.0,
+        connect_timeout: float = 10.0,
+        timeout: float | None = 300.0,
+    ) -> "BackendPool":
+        """
+        Build the pool from the OLLAMA_* environment variables.
+
+        OLLAMA_BACKENDS holds a JSON list of ``{"host", "weight", "models"}`` objects
+        (or ``@path`` to a JSON file), ``models`` mapping model names to the name
+        used on that host. Otherwise OLLAMA_HOSTS lists comma-separated hosts, and
+        failing that the single OLLAMA_HOST is used. OLLAMA_MODEL_ALIASES maps
+        model names to host model names for every backend, as a JSON object.
+        """
+        client_options = {
+            "max_connections": max_connections,
+            "keepalive_seconds": keepalive_seconds,
+            "connect_timeout": connect_timeout,
+            "timeout": timeout,
+        }
+        configured = os.getenv("OLLAMA_BACKENDS", "").strip()
+        if configured.startswith("@"):
+            with open(configured[1:], "r", encoding="utf-8") as f:
+                configured = f.read()
+        if configured:
+            backends = [
+                Backend(
+                    entry["host"],
+                    models=entry.get("models"),
+                    weight=float(entry.get("weight", 1.0)),
+                    **client_options,
+                )
+                for entry in json.loads(configured)
+            ]
+        else:
+            hosts = [host.strip() for host in os.getenv("OLLAMA_HOSTS", "").split(",") if host.strip()]
+            backends = [Backend(host, **client_options) for host in hosts or [None]]
+
+        return cls(
+            backends,
+            aliases=json.loads(os.getenv("OLLAMA_MODEL_ALIASES", "{}")),
+            max_attempts=int(os.getenv("OLLAMA_MAX_ATTEMPTS", "3")),
+            failure_threshold=int(os.getenv("OLLAMA_FAILURE_THRESHOLD", "3")),
+            eject_seconds=float(os.getenv("OLLAMA_EJECT_SECONDS", "30")),
+            health_interval=float(os.getenv("OLLAMA_HEALTH_INTERVAL", "15")),
+        )
+
+    def _pick(self, tried: set[int]) -> Backend | None:
+        now = time.monotonic()
+        candidates = [
+            backend for backend in self.backends
+            if id(backend) not in tried and backend.healthy(now)
+        ]
+        if not candidates:
+            # Every untried host is ejected: try the one coming back soonest rather than fail outright
+            candidates = sorted(
+                (backend for backend in self.backends if id(backend) not in tried),
+                key=lambda backend: backend.ejected_until,
+            )[:1]
+        if not candidates:
+            return None
+        return min(
+            candidates,
+            key=lambda backend: (backend.load(), backend.ewma_latency or 0.0),
+        )
+
+    async def chat(self, model: str, messages: list[dict], **kwargs):
+        """Send a chat request to the least loaded healthy backend, retrying on another one on failure."""
+        tried: set[int] = set()
+        last_error: BaseException | None = None
+        for _ in range(min(self.max_attempts, len(self.backends))):
+            backend = self._pick(tried)
+            if backend is None:
+                break
+            tried.add(id(backend))
+
+            backend.begin()
+            started = time.perf_counter()
+            try:
+                response = await backend.client.chat(
+                    model=backend.model(model, self.aliases),
+                    messages=messages,
+                    **kwargs,
+                )
+            except BaseException as e:
+                backend.end(time.perf_counter() - started, e)
+                if not isinstance(e, Exception):
+                    LLM_BACKEND_REQUESTS.inc(backend=backend.host, outcome="cancelled")
+                    raise
+                if not _is_retryable(e):
+                    LLM_BACKEND_REQUESTS.inc(backend=backend.host, outcome="error")
+                    raise
+                LLM_BACKEND_REQUESTS.inc(backend=backend.host, outcome="retried")
+                if _counts_against_host(e):
+                    backend.consecutive_failures += 1
+                    if backend.consecutive_failures >= self.failure_threshold:
+                        backend.eject(self.eject_seconds, backend.last_error)
+                logger.warning(f"Ollama call to {backend.host} failed ({backend.last_error}), trying another backend")
+                last_error = e
+                continue
+
+            backend.end(time.perf_counter() - started)
+            LLM_BACKEND_REQUESTS.inc(backend=backend.host, outcome="ok")
+            return response
+
+        if last_error is not None:
+            raise last_error
+        raise NoBackendAvailable("No Ollama backend available")
+
+    async def check_health(self) -> None:
+        """Ping every backend once, ejecting those that fail and readmitting those that answer."""
+
+        async def check(backend: Backend) -> None:
+            try:
+                await asyncio.wait_for(backend.client.list(), timeout=max(1.0, self.health_interval / 2))
+            except Exception as e:
+                backend.last_error = f"health check: {type(e).__name__}: {e}"
+                backend.eject(self.eject_seconds, backend.last_error, health_check=True)
+                return
+            # Hosts ejected for failing calls (e.g. answering 500s) sit out their full ejection
+            if backend.ejected_by_health_check:
+                backend.readmit()
+
+        await asyncio.gather(*(check(backend) for backend in self.backends))
+
+    async def _health_loop(self) -> None:
+        while True:
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error(f"Ollama health check failed: {e}")
+            await asyncio.sleep(self.health_interval)
+
+    async def start(self) -> None:
+        """Start the periodic health checks (only worth it with more than one backend)."""
+        if self._health_task is None and len(self.backends) > 1 and self.health_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        await asyncio.gather(*(backend.close() for backend in self.backends))
+
+    def stats(self) -> dict:
+        return {"backends": [backend.stats() for backend in self.backends], "aliases": self.aliases}
+
+
+# Pool of the stages called without a client, with the event loop it was created in
+_default_pool: tuple[asyncio.AbstractEventLoop, BackendPool] | None = None
+
+
+def default_pool() -> BackendPool:
+    """
+    Process-wide pool configured from OLLAMA_*, used by the stages called without a client.
+
+    Created on first use, so every call made without a client shares the same
+    connections; a pool is bound to its event loop, so a new loop (another
+    ``asyncio.run``) gets a new one. Close it with ``close_default_pool``.
+    """
+    global _default_pool
+    loop = asyncio.get_running_loop()
+    if _default_pool is None or _default_pool[0] is not loop:
+        _default_pool = (loop, BackendPool.from_env())
+    return _default_pool[1]
+
+
+async def close_default_pool() -> None:
+    """Close the default pool if it was created in the running event loop."""
+    global _default_pool
+    if _default_pool is None:
+        return
+    loop, pool = _default_pool
+    _default_pool = None
+    if loop is asyncio.get_running_loop():
+        await pool.close()
@@ -0,0 +1,277 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+
+from . import analysis
+
+logger = logging.getLogger(__name__)
+
+# Analyzer of one link: (link, options) -> details, as returned by runAnalysis
+LinkAnalyzer = Callable[[str, dict], Awaitable[dict]]
+
+# Upper bound on the concurrency a bulk request may ask for
+MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", "32"))
+
+# Request fields forwarded to the pipeline for each link
+LINK_OPTIONS = ("batch_size", "batch_token_budget", "prefilter_threshold", "dedup_threshold", "budget_seconds")
+
+
+def parse_link_line(line: str) -> tuple[str, dict] | None:
+    """
+    Parse one JSONL input line into a link and its pipeline options.
+
+    Lines may be a JSON object with a ``link`` (or ``url``) field, a JSON string,
+    or a bare link. Blank lines give None.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith(("{", '"')):
+        value = json.loads(line)
+        if isinstance(value, str):
+            return value, {}
+        link = value.get("link") or value.get("url")
+        if not link:
+            raise ValueError("no 'link' field")
+        return link, {key: value[key] for key in LINK_OPTIONS if value.get(key) is not None}
+    return line, {}
+
+
+class BulkStats:
+    """Throughput counters of one bulk run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.llm_calls_at_start = analysis.LLM_CALL_STATS["calls"]
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def to_dict(self) -> dict:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        llm_calls = analysis.LLM_CALL_STATS["calls"] - self.llm_calls_at_start
+        return {
+            "done": self.done,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "elapsed": elapsed,
+            "links_per_minute": (self.done + self.failed) * 60 / elapsed,
+            "llm_calls": llm_calls,
+            "llm_calls_per_second": llm_calls / elapsed,
+        }
+
+
+async def bulkAnalysis(
+    lines: AsyncIterator[tuple[int, str]],
+    analyze: LinkAnalyzer,
+    concurrency: int = 4,
+    skip_lines: set[int] | None = None,
+    stats: BulkStats | None = None,
+) -> AsyncIterator[dict]:
+    """
+    Analyze many links concurrently.
+
+    Input is read lazily through a small bounded queue, so arbitrarily large inputs
+    use constant memory. Results are yielded as links complete, not in input order;
+    each one carries its input ``line`` number.
+
+    Args:
+        lines: (line number, raw JSONL line) pairs
+        analyze: Runs the pipeline for one link
+        concurrency: Number of links analyzed at the same time
+        skip_lines: Line numbers already processed in a previous run
+        stats: Throughput counters to update
+
+    Yields:
+        dict: One record per input link with ``line``, ``link``, ``success`` and
+        either ``details`` or ``error``
+    """
+    stats = stats or BulkStats()
+    skip_lines = skip_lines or set()
+    concurrency = max(1, concurrency)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    results: asyncio.Queue = asyncio.Queue()
+
+    reader_errors = []
+
+    async def reader():
+        try:
+            async for line_no, line in lines:
+                if line_no in skip_lines:
+                    stats.skipped += 1
+                    continue
+                await queue.put((line_no, line))
+        except Exception as e:
+            reader_errors.append(e)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def worker():
+        while (item := await queue.get()) is not None:
+            line_no, line = item
+            record = {"line": line_no, "link": None}
+            try:
+                parsed = parse_link_line(line)
+                if parsed is None:
+                    continue
+                link, options = parsed
+                record["link"] = link
+                record["details"] = await analyze(link, options)
+                record["success"] = True
+                stats.done += 1
+            except Exception as e:
+                logger.error(f"Bulk analysis of line {line_no} failed: {e}")
+                record["success"] = False
+                record["error"] = str(e)
+                stats.failed += 1
+            await results.put(record)
+        await results.put(None)
+
+    tasks = [asyncio.create_task(reader())]
+    tasks.extend(asyncio.create_task(worker()) for _ in range(concurrency))
+    try:
+        finished = 0
+        while finished < len(tasks) - 1:
+            record = await results.get()
+            if record is None:
+                finished += 1
+                continue
+            yield record
+        # Surface reader errors (e.g. unreadable input)
+        if reader_errors:
+            raise reader_errors[0]
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Let the cancelled analyses unwind (and release their slots) before the generator closes
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def iterLines(lines: Iterable[str]) -> AsyncIterator[tuple[int, str]]:
+    """Number the lines of a synchronous iterable (e.g. an open file), starting at 1."""
+    for line_no, line in enumerate(lines, start=1):
+        yield line_no, line
+        # Give the workers a chance to run between reads
+        await asyncio.sleep(0)
+
+
+def completed_lines(output_path: str) -> set[int]:
+    """
+    Line numbers already analyzed successfully according to an output file, which doubles as the checkpoint.
+
+    Failed records don't count, so their links are retried on resume (the new
+    record is appended after the failed one). A partially written last record
+    (from a crash mid-write) is truncated away.
+    """
+    if not os.path.exists(output_path):
+        return set()
+    done = set()
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    for raw in data.splitlines():
+        try:
+            record = json.loads(raw)
+            if record.get("success"):
+                done.add(record["line"])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            continue
+    return done
+
+
+async def runBulkFile(
+    input_path: str,
+    output_path: str,
+    analyze: LinkAnalyzer,
+    concurrency: int = 4,
+    resume: bool = True,
+    report_every: float = 30.0,
+) -> dict:
+    """
+    Analyze every link of a JSONL file and append the results to a JSONL output.
+
+    Every record is flushed as soon as its link completes. With ``resume``,
+    lines already analyzed successfully in the output are skipped, so a crashed
+    run can be restarted with the same arguments and failed links are retried.
+
+    Returns:
+        dict: Final throughput statistics
+    """
+    skip = completed_lines(output_path) if resume else set()
+    if skip:
+        logger.info(f"Resuming {input_path}: {len(skip)} links already analyzed in {output_path}")
+
+    stats = BulkStats()
+    last_report = time.perf_counter()
+    with open(input_path, "r", encoding="utf-8") as source, \
+            open(output_path, "a" if resume else "w", encoding="utf-8") as sink:
+        async for record in bulkAnalysis(iterLines(source), analyze, concurrency, skip, stats):
+            sink.write(json.dumps(record) + "\n")
+            sink.flush()
+            if time.perf_counter() - last_report >= report_every:
+                last_report = time.perf_counter()
+                logger.info(f"Bulk progress: {stats.to_dict()}")
+
+    summary = stats.to_dict()
+    logger.info(f"Bulk analysis complete: {summary}")
+    return summary
+
+
+async def _run_cli(args: argparse.Namespace) -> dict:
+    from .analysis import STAGE_TEMPLATES
+    from .asr import ASREngine
+    from .cache import TranscriptCache
+    from .clients import SharedClients
+    from .memo import LLMMemo
+    from .pipeline import runAnalysis
+    from .store import AnalysisStore
+    from .transcriptor import AnalyzeMediaLink
+
+    asr_engine = ASREngine.from_env()
+    asr_engine.preload = False
+    await asr_engine.start()
+    clients = SharedClients.from_env()
+    await clients.start()
+    media = AnalyzeMediaLink(cache=TranscriptCache.from_env(), asr_engine=asr_engine, clients=clients)
+    memo = LLMMemo.from_env()
+    await memo.prune(STAGE_TEMPLATES)
+    store = AnalysisStore.from_env()
+
+    async def analyze(link: str, options: dict) -> dict:
+        return await runAnalysis(link, media, memo=memo, store=store, client=clients.ollama, **options)
+
+    try:
+        return await runBulkFile(
+            args.input,
+            args.output,
+            analyze,
+            concurrency=args.concurrency,
+            resume=not args.restart,
+            report_every=args.report_every,
+        )
+    finally:
+        await clients.close()
+        await asr_engine.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Analyze the links of a JSONL file in bulk.")
+    parser.add_argument("input", help="JSONL file with one {\"link\": ...} object per line")
+    parser.add_argument("output", help="JSONL file the results are appended to, also used to resume")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BULK_CONCURRENCY", "4")),
+                        help="number of links analyzed at the same time")
+    parser.add_argument("--restart", action="store_true", help="overwrite the output instead of resuming")
+    parser.add_argument("--report-every", type=float, default=30.0, help="seconds between progress reports")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(json.dumps(asyncio.run(_run_cli(args))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteStore:
+    """
+    Base of the SQLite-backed stores: one WAL-mode connection per thread and a schema created once.
+
+    SQLite's file locking makes the stores safe to share between several worker
+    processes. Subclasses define their tables in ``SCHEMA``.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn: sqlite3.Connection) -> None:
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            conn.executescript(self.SCHEMA)
+            self._schema_ready = True
+
+
+class SqliteLRUCache(SqliteStore):
+    """
+    Size-bounded, TTL-expiring JSON key/value store backed by a SQLite file.
+
+    Each thread keeps its own connection. Entries are evicted least recently used
+    first once the stored payloads exceed ``max_bytes``. Hit and miss counters are
+    kept in the database so they cover every process.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: float | None = None, name: str = "cache"):
+        super().__init__(path)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+
+    def _count(self, conn: sqlite3.Connection, counter: str) -> None:
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (counter,),
+        )
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for ``key``, or None on a miss or expired entry."""
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count(conn, "misses")
+            return None
+
+        value, created_at = row
+        if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._count(conn, "expired")
+            self._count(conn, "misses")
+            return None
+
+        conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count(conn, "hits")
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store ``value`` under ``key`` and evict old entries beyond the size bound."""
+        payload = json.dumps(value)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            logger.warning(f"Not caching {key} in {self.name}: {size} bytes exceeds the cache size")
+            return
+
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, now, now),
+            )
+            if self.ttl_seconds is not None:
+                conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl_seconds,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            while total > self.max_bytes:
+                oldest = conn.execute(
+                    "SELECT key, size FROM entries ORDER BY accessed_at LIMIT 1"
+                ).fetchone()
+                if oldest is None:
+                    break
+                conn.execute("DELETE FROM entries WHERE key = ?", (oldest[0],))
+                self._count(conn, "evictions")
+                total -= oldest[1]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete_prefix(self, prefix: str, keep_prefix: str | None = None) -> int:
+        """Delete every entry whose key starts with ``prefix`` but not with ``keep_prefix``."""
+        conn = self._connection()
+        if keep_prefix is None:
+            query, params = "DELETE FROM entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+        else:
+            query = "DELETE FROM entries WHERE substr(key, 1, ?) = ? AND substr(key, 1, ?) != ?"
+            params = (len(prefix), prefix, len(keep_prefix), keep_prefix)
+        return conn.execute(query, params).rowcount
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size, aggregated over every process."""
+        conn = self._connection()
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "expired": counters.get("expired", 0),
+            "evictions": counters.get("evictions", 0),
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class TranscriptCache(SqliteLRUCache):
+    """On-disk transcript cache keyed by platform and video ID."""
+
+    @classmethod
+    def from_env(cls) -> "TranscriptCache":
+        """Build the cache from the TRANSCRIPT_CACHE_* environment variables."""
+        return cls(
+            path=os.getenv("TRANSCRIPT_CACHE_PATH", os.path.join(".cache", "transcripts.sqlite3")),
+            max_bytes=int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+            ttl_seconds=float(os.getenv("TRANSCRIPT_CACHE_TTL", str(7 * 24 * 3600))),
+            name="transcript cache",
+        )
+
+    @staticmethod
+    def key(platform: str, video_id: str) -> str:
+        return f"{platform}:{video_id}"
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+
+from .analysis import DEFAULT_MAX_CONCURRENCY
+from .backends import Backend, BackendPool
+
+logger = logging.getLogger(__name__)
+
+
+class SharedClients:
+    """
+    HTTP session and Ollama backend pool shared by every request of a process.
+
+    Reusing them keeps connections alive between requests (no new DNS lookup or
+    TLS handshake per link) and caps the outbound connections. The aiohttp
+    session is only created on first use, so caption-only workers never import aiohttp.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_connections_per_host: int = 10,
+        keepalive_seconds: float = 30.0,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+        ollama: BackendPool | None = None,
+    ):
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_seconds = keepalive_seconds
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # Used in place of an ollama.AsyncClient by both LLM stages
+        self.ollama = ollama if ollama is not None else BackendPool([Backend(None)])
+        self._session = None
+        self._session_lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SharedClients":
+        """Build the clients from the HTTP_* and OLLAMA_* environment variables."""
+        keepalive_seconds = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30"))
+        connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10"))
+        ollama_timeout = float(os.getenv("OLLAMA_TIMEOUT_SECONDS", "300"))
+        return cls(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+            max_connections_per_host=int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10")),
+            keepalive_seconds=keepalive_seconds,
+            connect_timeout=connect_timeout,
+            read_timeout=float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "60")),
+            ollama=BackendPool.from_env(
+                max_connections=int(os.getenv("OLLAMA_MAX_CONNECTIONS", str(2 * DEFAULT_MAX_CONCURRENCY))),
+                keepalive_seconds=keepalive_seconds,
+                connect_timeout=connect_timeout,
+                timeout=ollama_timeout if ollama_timeout > 0 else None,
+            ),
+        )
+
+    async def start(self) -> None:
+        await self.ollama.start()
+
+    async def session(self):
+        """The shared aiohttp session, created on first use."""
+        if self._session is None:
+            async with self._session_lock:
+                if self._session is None:
+                    import aiohttp
+
+                    self._session = aiohttp.ClientSession(
+                        connector=aiohttp.TCPConnector(
+                            limit=self.max_connections,
+                            limit_per_host=self.max_connections_per_host,
+                            keepalive_timeout=self.keepalive_seconds,
+                            ttl_dns_cache=300,
+                        ),
+                        # No total timeout: video bodies stream for as long as they keep coming
+                        timeout=aiohttp.ClientTimeout(
+                            total=None,
+                            connect=self.connect_timeout,
+                            sock_read=self.read_timeout,
+                        ),
+                    )
+                    logger.info(
+                        f"Created shared HTTP session ({self.max_connections} connections, "
+                        f"{self.max_connections_per_host} per host)"
+                    )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        await self.ollama.close()
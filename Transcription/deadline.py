@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Awaitable
+
+logger = logging.getLogger(__name__)
+
+# Latency budget of /transcription_analyzer requests setting none; unset lets them run to completion
+DEFAULT_BUDGET_SECONDS = float(os.environ["ANALYSIS_BUDGET_SECONDS"]) if os.getenv("ANALYSIS_BUDGET_SECONDS") else None
+
+# Share of the budget given to the transcript and fragment stages, the rest is left
+# to extract the keywords of the last fragments
+FRAGMENTS_SHARE = float(os.getenv("DEADLINE_FRAGMENTS_SHARE", "0.8"))
+
+
+class Deadline:
+    """
+    Latency budget of one analysis, shared by its stages.
+
+    The transcript and fragment stages stop ``fragments_share`` of the way through
+    the budget and the keyword stage at its end. Stages hand out the results that
+    are already done at that point, cancel the LLM calls still pending and record
+    here what they had to leave out, from which ``coverage`` reports how much of
+    the transcript the partial result covers.
+    """
+
+    def __init__(self, seconds: float, fragments_share: float = FRAGMENTS_SHARE):
+        self.seconds = max(0.0, seconds)
+        self.started = time.monotonic()
+        self.expires = {
+            "fragments": self.started + self.seconds * min(max(fragments_share, 0.0), 1.0),
+            "keywords": self.started + self.seconds,
+        }
+        self.transcript_cut = False
+        # Segment indexes whose fragment calls were cancelled
+        self.segments_cut: set[int] = set()
+        # Fragments whose keyword calls were cancelled or never started
+        self.fragments_cut = 0
+
+    def remaining(self, stage: str) -> float:
+        """Seconds left to ``stage`` (``fragments`` or ``keywords``), zero once expired."""
+        return max(0.0, self.expires[stage] - time.monotonic())
+
+    def expired(self, stage: str) -> bool:
+        return time.monotonic() >= self.expires[stage]
+
+    async def wait(self, awaitable: Awaitable, stage: str):
+        """
+        Await ``awaitable`` until the deadline of ``stage``.
+
+        Tasks are shielded, so on timeout they are left running for the caller to
+        collect or cancel; other awaitables are cancelled.
+
+        Raises:
+            asyncio.TimeoutError: If the stage ran out of time first
+        """
+        if isinstance(awaitable, asyncio.Task):
+            awaitable = asyncio.shield(awaitable)
+        return await asyncio.wait_for(awaitable, self.remaining(stage))
+
+    @property
+    def partial(self) -> bool:
+        return self.transcript_cut or bool(self.segments_cut) or self.fragments_cut > 0
+
+    def coverage(self, segments: list[dict], representatives: int) -> dict:
+        """
+        Share of the work done within the budget.
+
+        Args:
+            segments: Segments of the transcript, as analyzed by the fragment stage
+            representatives: Fragments that were due for keyword extraction
+
+        Returns:
+            dict: ``partial``, ``transcript`` (share of the transcript characters
+            analyzed, 0 when it was not fetched in time), the segments analyzed out
+            of all segments, and ``keywords`` (share of the fragments whose keywords
+            were extracted)
+        """
+        total = sum(len(segment["text"]) for segment in segments)
+        cut = sum(len(segments[i]["text"]) for i in self.segments_cut if i < len(segments))
+        if self.transcript_cut:
+            transcript = 0.0
+        else:
+            transcript = 1.0 - cut / total if total else 1.0
+        return {
+            "partial": self.partial,
+            "budget_seconds": self.seconds,
+            "transcript": round(transcript, 4),
+            "segments": len(segments),
+            "segments_analyzed": len(segments) - len(self.segments_cut),
+            "keywords": round(1.0 - self.fragments_cut / representatives, 4) if representatives else 1.0,
+        }
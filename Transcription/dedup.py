@@ -0,0 +1,125 @@
+import logging
+import os
+import zlib
+
+from ..models.general_utils import STOPWORDS, words
+
+logger = logging.getLogger(__name__)
+
+# Cosine similarity from which a fragment joins an earlier cluster; empty disables the stage
+_threshold = os.getenv("FRAGMENT_DEDUP_THRESHOLD", "0.85")
+DEFAULT_THRESHOLD = float(_threshold) if _threshold else None
+
+# Size of the hashed feature space the fragments are embedded in
+EMBEDDING_DIM = int(os.getenv("FRAGMENT_DEDUP_DIM", "1024"))
+
+# Bump whenever the features or the clustering change, stored keyword stages are then recomputed
+DEDUP_VERSION = 1
+
+
+def fragment_features(fragment: str) -> list[str]:
+    """Content words of a fragment and their character trigrams, so "sturdy" and "sturdier" still overlap."""
+    content = [word for word in words(fragment) if word not in STOPWORDS]
+    trigrams = [f"#{word[i:i + 3]}" for word in content if len(word) > 3 for i in range(len(word) - 2)]
+    return content + trigrams
+
+
+def embed_fragments(fragments: list[str], dim: int = EMBEDDING_DIM):
+    """
+    Embed fragments as L2-normalized hashed bags of features, on the CPU.
+
+    Each feature is hashed to one of ``dim`` columns with a hashed sign, so
+    collisions tend to cancel out instead of adding up.
+
+    Returns:
+        numpy.ndarray: One float32 row per fragment (all zeros for fragments without content words)
+    """
+    # NumPy is only imported once the stage runs, keeping it out of the server's startup
+    import numpy as np
+
+    rows, columns, signs = [], [], []
+    for row, fragment in enumerate(fragments):
+        for feature in fragment_features(fragment):
+            digest = zlib.crc32(feature.encode("utf-8"))
+            rows.append(row)
+            columns.append(digest % dim)
+            signs.append(1.0 if digest & 0x80000000 else -1.0)
+
+    vectors = np.zeros((len(fragments), dim), dtype=np.float32)
+    np.add.at(vectors, (np.asarray(rows, dtype=np.intp), np.asarray(columns, dtype=np.intp)), signs)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+class FragmentDeduplicator:
+    """
+    Online clustering of near-duplicate fragments.
+
+    Fragments are added in order; a fragment whose cosine similarity to a cluster
+    representative reaches ``threshold`` joins the most similar cluster, otherwise it
+    becomes the representative of a new one. Comparing against every representative
+    is a single matrix-vector product.
+    """
+
+    def __init__(self, threshold: float = 0.85, dim: int = EMBEDDING_DIM):
+        import numpy as np
+
+        self.threshold = threshold
+        self.dim = dim
+        self._representatives = np.zeros((16, dim), dtype=np.float32)
+        self.clusters: list[dict] = []
+        self.fragments = 0
+
+    def add(self, fragment: str) -> int | None:
+        """
+        Cluster one fragment.
+
+        Returns:
+            int | None: Fragment index of the representative it duplicates, None when it starts a new cluster
+        """
+        import numpy as np
+
+        index = self.fragments
+        self.fragments += 1
+        vector = embed_fragments([fragment], self.dim)[0]
+
+        count = len(self.clusters)
+        if count and vector.any():
+            similarities = self._representatives[:count] @ vector
+            best = int(np.argmax(similarities))
+            # Tolerance for rounding, so identical fragments always match at a threshold of 1
+            if similarities[best] >= self.threshold - 1e-6:
+                self.clusters[best]["members"].append(index)
+                return self.clusters[best]["representative"]
+
+        if count == len(self._representatives):
+            self._representatives = np.concatenate([self._representatives, np.zeros_like(self._representatives)])
+        self._representatives[count] = vector
+        self.clusters.append({"representative": index, "members": [index]})
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "fragments": self.fragments,
+            "clusters": len(self.clusters),
+            "collapsed": self.fragments - len(self.clusters),
+        }
+
+
+def collapse_fragments(fragments: list[str], threshold: float = 0.85) -> tuple[list[str], list[dict]]:
+    """
+    Collapse near-duplicate fragments before keyword extraction.
+
+    Args:
+        fragments: Fragments, as returned by analyzeTranscript
+        threshold: Cosine similarity from which fragments are considered duplicates
+
+    Returns:
+        tuple: Representative fragments in order, and the clusters as
+        ``{"representative", "members"}`` fragment indexes
+    """
+    dedup = FragmentDeduplicator(threshold)
+    representatives = [fragment for fragment in fragments if dedup.add(fragment) is None]
+    logger.info(f"Collapsed {len(fragments)} fragments into {len(representatives)} clusters")
+    return representatives, dedup.clusters
@@ -0,0 +1,95 @@
+import hashlib
+import json
+
+from ..models.prompts import DescriptivePhrasesPrompt, BatchedDescriptivePhrasesPrompt, KeywordExtractionPrompt
+from .analysis import DEFAULT_MODEL, generation_options
+from .dedup import DEDUP_VERSION, EMBEDDING_DIM
+from .memo import template_fingerprint
+from .segmentation import (
+    DEFAULT_OVERLAP_TOKENS,
+    DEFAULT_PAUSE_SECONDS,
+    DEFAULT_WINDOW_TOKENS,
+    SEGMENTATION_VERSION,
+)
+
+# Pipeline stages in execution order, each one consumes the output of the previous one
+STAGES = ("transcript", "segmentation", "fragments", "dedup", "keywords")
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def transcript_fingerprint(source: str) -> str:
+    """Fingerprint of the transcript stage: where the text came from (captions or a Whisper model)."""
+    return _digest("transcript", source)
+
+
+def segmentation_fingerprint(
+    window_tokens: int = DEFAULT_WINDOW_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+    pause_seconds: float = DEFAULT_PAUSE_SECONDS,
+) -> str:
+    return _digest("segmentation", SEGMENTATION_VERSION, window_tokens, overlap_tokens, pause_seconds)
+
+
+def fragments_fingerprint(
+    model_name: str = DEFAULT_MODEL,
+    batch_size: int | None = None,
+    batch_token_budget: int | None = None,
+    prefilter_threshold: float | None = None,
+) -> str:
+    """Fingerprint of the fragment stage: model, the prompt template in use and the options changing its input."""
+    if batch_size or batch_token_budget:
+        template, stage = BatchedDescriptivePhrasesPrompt.template, "fragments_batched"
+    else:
+        template, stage = DescriptivePhrasesPrompt.template, "fragments"
+    return _digest(
+        "fragments",
+        model_name,
+        template_fingerprint(template),
+        generation_options(stage),
+        batch_size,
+        batch_token_budget,
+        prefilter_threshold,
+    )
+
+
+def dedup_fingerprint(threshold: float | None = None, dim: int = EMBEDDING_DIM) -> str:
+    """Fingerprint of the dedup stage: its similarity threshold (None when disabled) and embedding."""
+    return _digest("dedup", DEDUP_VERSION, threshold, dim if threshold is not None else None)
+
+
+def keywords_fingerprint(model_name: str = DEFAULT_MODEL) -> str:
+    return _digest(
+        "keywords", model_name, template_fingerprint(KeywordExtractionPrompt.template), generation_options("keywords")
+    )
+
+
+def stage_fingerprints(
+    source: str,
+    model_name: str = DEFAULT_MODEL,
+    batch_size: int | None = None,
+    batch_token_budget: int | None = None,
+    prefilter_threshold: float | None = None,
+    dedup_threshold: float | None = None,
+) -> dict[str, str]:
+    """Current fingerprint of every stage, for a transcript from ``source``."""
+    return {
+        "transcript": transcript_fingerprint(source),
+        "segmentation": segmentation_fingerprint(),
+        "fragments": fragments_fingerprint(model_name, batch_size, batch_token_budget, prefilter_threshold),
+        "dedup": dedup_fingerprint(dedup_threshold),
+        "keywords": keywords_fingerprint(model_name),
+    }
+
+
+def stale_stages(recorded: dict[str, str], current: dict[str, str]) -> list[str]:
+    """
+    Stages to run again: the first one whose fingerprint changed (or was never
+    recorded) and every stage downstream of it.
+    """
+    for i, stage in enumerate(STAGES):
+        if recorded.get(stage) != current[stage]:
+            return list(STAGES[i:])
+    return []
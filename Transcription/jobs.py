@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable
+
+from .transcriptor import video_key
+
+logger = logging.getLogger(__name__)
+
+# Pipeline factory: (link, options) -> stream of pipeline events (see streamAnalysis)
+PipelineFactory = Callable[[str, dict], AsyncIterator[dict]]
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the job queue is at capacity."""
+
+
+def dedup_key(link: str, options: dict | None = None) -> str:
+    """
+    Key under which identical requests share one job.
+
+    Made of the platform and video ID when known, and the pipeline options that
+    are set, so a request with other options never gets another run's result.
+    """
+    normalized = {name: value for name, value in (options or {}).items() if value is not None}
+    if not normalized:
+        return video_key(link)
+    return f"{video_key(link)}?{json.dumps(normalized, sort_keys=True, separators=(',', ':'))}"
+
+
+class Job:
+    """State and per-stage progress of one pipeline run."""
+
+    def __init__(self, link: str, key: str, options: dict):
+        self.id = uuid.uuid4().hex
+        self.link = link
+        self.key = key
+        self.options = options
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.attached = 0
+        self.result: dict | None = None
+        self.error: str | None = None
+        self.stages = {
+            "transcript": {"status": "pending"},
+            "fragments": {"status": "pending", "batches": 0, "fragments": 0},
+            "keywords": {"status": "pending", "fragments_done": 0, "fragments_total": None, "keywords": 0},
+        }
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def apply(self, event: dict) -> None:
+        """Update the stage progress from one pipeline event."""
+        kind = event["event"]
+        if kind == "started":
+            self.stages["transcript"]["status"] = "running"
+        elif kind == "transcript":
+            self.stages["transcript"]["status"] = "done"
+            self.stages["fragments"]["status"] = "running"
+            self.stages["keywords"]["status"] = "running"
+        elif kind == "fragments":
+            self.stages["fragments"]["batches"] += 1
+            self.stages["fragments"]["fragments"] += len(event["fragments"])
+        elif kind == "fragments_done":
+            self.stages["fragments"]["status"] = "done"
+            # Only cluster representatives go through keyword extraction
+            self.stages["keywords"]["fragments_total"] = event.get("representatives", event["fragments_total"])
+        elif kind == "keywords":
+            self.stages["keywords"]["fragments_done"] = event["fragments_done"]
+            self.stages["keywords"]["keywords"] += len(event["keywords"])
+        elif kind == "summary":
+            self.stages["keywords"]["status"] = "done"
+            self.result = event["details"]
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        return {
+            "job_id": self.id,
+            "link": self.link,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "attached": self.attached,
+            "progress": self.stages,
+            "result": self.result if include_result else None,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Runs analysis jobs on a bounded pool of worker tasks.
+
+    Submitting a link that already has a queued or running job attaches to that
+    job instead of starting another pipeline. Finished jobs stay available for
+    ``retention_seconds``. Jobs live in the memory of one server process.
+    """
+
+    def __init__(
+        self,
+        pipeline: PipelineFactory,
+        workers: int = 4,
+        retention_seconds: float = 3600,
+        max_queue: int = 1000,
+    ):
+        self.pipeline = pipeline
+        self.workers = max(1, workers)
+        self.retention_seconds = retention_seconds
+        self._queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=max_queue)
+        self._jobs: dict[str, Job] = {}
+        self._in_progress: dict[str, Job] = {}
+        self._tasks: list[asyncio.Task] = []
+        self.submitted = 0
+        self.deduplicated = 0
+
+    @classmethod
+    def from_env(cls, pipeline: PipelineFactory) -> "JobManager":
+        """Build the manager from the JOB_* environment variables."""
+        return cls(
+            pipeline,
+            workers=int(os.getenv("JOB_WORKERS", "4")),
+            retention_seconds=float(os.getenv("JOB_RETENTION_SECONDS", "3600")),
+            max_queue=int(os.getenv("JOB_QUEUE_SIZE", "1000")),
+        )
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._purge_loop()))
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, link: str, options: dict | None = None) -> tuple[Job, bool]:
+        """
+        Queue a pipeline run for ``link``, or attach to the one already in progress with the same options.
+
+        Returns:
+            tuple: The job, and whether it was an existing in-progress job
+
+        Raises:
+            JobQueueFull: If a new job is needed and the queue is at capacity
+        """
+        key = dedup_key(link, options)
+        job = self._in_progress.get(key)
+        if job is not None:
+            job.attached += 1
+            self.deduplicated += 1
+            logger.info(f"Attached request for {link} to in-progress job {job.id}")
+            return job, True
+
+        job = Job(link, key, options or {})
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Job queue is full ({self._queue.maxsize} jobs)")
+        self._jobs[job.id] = job
+        self._in_progress[key] = job
+        self.submitted += 1
+        return job, False
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            async for event in self.pipeline(job.link, job.options):
+                job.apply(event)
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "Cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.id} for {job.link} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            if self._in_progress.get(job.key) is job:
+                del self._in_progress[job.key]
+
+    async def _purge_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, min(60.0, self.retention_seconds / 2)))
+            self.purge()
+
+    def purge(self) -> int:
+        """Forget finished jobs older than the retention window."""
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+    def stats(self) -> dict:
+        statuses = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize(),
+            "jobs": statuses,
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+        }
@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any
+
+from .cache import SqliteLRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def template_fingerprint(template: str) -> str:
+    """Short hash of a prompt template, changes whenever the template text is edited."""
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+
+class LLMMemo:
+    """
+    Content-addressed memo of parsed LLM stage outputs.
+
+    Keys are ``{stage}:{template fingerprint}:{hash}`` where the hash covers the
+    model name, the generation options and the input text. An in-memory LRU tier
+    sits in front of an optional persistent SqliteLRUCache tier. Because the
+    template fingerprint is part of the key, editing a prompt template misses on
+    that stage only; ``prune`` drops the entries of older templates, once at startup.
+    """
+
+    def __init__(self, store: SqliteLRUCache | None = None, max_memory_entries: int = 4096):
+        self.store = store
+        self.max_memory_entries = max_memory_entries
+        self._memory: OrderedDict[str, Any] = OrderedDict()
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "LLMMemo":
+        """Build the memo from the LLM_MEMO_* environment variables."""
+        path = os.getenv("LLM_MEMO_PATH", os.path.join(".cache", "llm_memo.sqlite3"))
+        store = None
+        if path:
+            store = SqliteLRUCache(
+                path=path,
+                max_bytes=int(os.getenv("LLM_MEMO_MAX_BYTES", str(128 * 1024 * 1024))),
+                ttl_seconds=float(os.getenv("LLM_MEMO_TTL", str(30 * 24 * 3600))),
+                name="LLM memo",
+            )
+        return cls(store, max_memory_entries=int(os.getenv("LLM_MEMO_MEMORY_ENTRIES", "4096")))
+
+    def key(self, stage: str, model_name: str, template: str, options: dict, text: str) -> str:
+        """Build the memo key of one stage call."""
+        digest = hashlib.sha256(
+            json.dumps([model_name, options, text], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return f"{stage}:{template_fingerprint(template)}:{digest}"
+
+    async def prune(self, templates: dict[str, str]) -> int:
+        """
+        Drop the results memoized with older prompt templates.
+
+        Args:
+            templates: Current prompt template of each stage
+
+        Returns:
+            int: Persistent entries removed
+        """
+        removed = 0
+        for stage, template in templates.items():
+            prefix, keep = f"{stage}:", f"{stage}:{template_fingerprint(template)}:"
+            for key in [key for key in self._memory if key.startswith(prefix) and not key.startswith(keep)]:
+                del self._memory[key]
+            if self.store is None:
+                continue
+            try:
+                count = await asyncio.to_thread(self.store.delete_prefix, prefix, keep_prefix=keep)
+            except Exception as e:
+                logger.warning(f"Failed to drop stale '{stage}' memo entries: {e}")
+                continue
+            if count:
+                logger.info(f"Dropped {count} memoized '{stage}' results from an older prompt template")
+            removed += count
+        return removed
+
+    async def get(self, key: str) -> Any | None:
+        """Return the memoized result for ``key``, or None if it was never stored."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            self.memory_hits += 1
+            return self._memory[key]
+
+        value = None
+        if self.store is not None:
+            try:
+                value = await asyncio.to_thread(self.store.get, key)
+            except Exception as e:
+                logger.warning(f"LLM memo lookup failed: {e}")
+
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._remember(key, value)
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        """Store a parsed result in both tiers."""
+        self._remember(key, value)
+        if self.store is not None:
+            try:
+                await asyncio.to_thread(self.store.set, key, value)
+            except Exception as e:
+                logger.warning(f"LLM memo write failed: {e}")
+
+    def _remember(self, key: str, value: Any) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Hit/miss counters of this process, plus the persistent tier's own stats."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "persistent": self.store.stats() if self.store is not None else None,
+        }
@@ -0,0 +1,194 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets in seconds, from a JSON parse up to a long Whisper run
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labelnames), 0.0)
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket], sum, count
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[0][index] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    def samples(self):
+        for key, (counts, total, count) in self._values.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_bucket", {**labels, "le": "+Inf"}, count
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class MetricsRegistry:
+    """Metrics of one process, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "media_analysis_stage_seconds", "Time spent in each pipeline stage", ("stage",))
+STAGE_TOTAL = REGISTRY.counter(
+    "media_analysis_stage_total", "Pipeline stage runs by outcome", ("stage", "outcome"))
+LLM_REQUESTS = REGISTRY.counter(
+    "media_analysis_llm_requests_total", "Ollama chat requests by stage and outcome", ("stage", "outcome"))
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "media_analysis_llm_request_seconds", "Wall time of Ollama chat requests", ("stage",))
+LLM_PROMPT_TOKENS = REGISTRY.counter(
+    "media_analysis_llm_prompt_tokens_total", "Prompt tokens evaluated by Ollama (prompt_eval_count)", ("stage",))
+LLM_OUTPUT_TOKENS = REGISTRY.counter(
+    "media_analysis_llm_output_tokens_total", "Tokens generated by Ollama (eval_count)", ("stage",))
+LLM_EVAL_SECONDS = REGISTRY.counter(
+    "media_analysis_llm_eval_seconds_total", "Generation time reported by Ollama (eval_duration)", ("stage",))
+JSON_REPAIRS = REGISTRY.counter(
+    "media_analysis_json_repairs_total", "Replies needing JSON extraction or failing to parse", ("stage", "outcome"))
+LLM_MALFORMED = REGISTRY.counter(
+    "media_analysis_llm_malformed_total", "LLM replies dropped as malformed, by stage and reason", ("stage", "reason"))
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "media_analysis_admission_wait_seconds", "Time pipelines waited for an admission slot", ("priority",))
+ADMISSION_REJECTED = REGISTRY.counter(
+    "media_analysis_admission_rejected_total", "Pipelines rejected by admission control", ("priority", "reason"))
+LLM_SLOT_WAIT_SECONDS = REGISTRY.histogram(
+    "media_analysis_llm_slot_wait_seconds", "Time LLM calls waited under the global in-flight cap")
+LLM_BACKEND_REQUESTS = REGISTRY.counter(
+    "media_analysis_llm_backend_requests_total", "Ollama requests per backend host by outcome", ("backend", "outcome"))
+LLM_BACKEND_SECONDS = REGISTRY.histogram(
+    "media_analysis_llm_backend_request_seconds", "Wall time of Ollama requests per backend host", ("backend",))
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """
+    Time a pipeline stage into ``media_analysis_stage_seconds``.
+
+    The span is also logged as one JSON line at DEBUG level, with ``attributes``
+    (which the body may extend through the yielded dict).
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield attributes
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        STAGE_SECONDS.observe(duration, stage=stage)
+        STAGE_TOTAL.inc(stage=stage, outcome=outcome)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({"span": stage, "seconds": duration, "outcome": outcome, **attributes}, default=str))
+
+
+def record_llm_call(stage: str, seconds: float, response=None, outcome: str = "ok") -> None:
+    """Record one Ollama chat request and the token counts and timings Ollama reports with it."""
+    LLM_REQUESTS.inc(stage=stage, outcome=outcome)
+    LLM_REQUEST_SECONDS.observe(seconds, stage=stage)
+    if response is None:
+        return
+    prompt_tokens = response.get("prompt_eval_count") or 0
+    output_tokens = response.get("eval_count") or 0
+    eval_duration = response.get("eval_duration") or 0
+    LLM_PROMPT_TOKENS.inc(prompt_tokens, stage=stage)
+    LLM_OUTPUT_TOKENS.inc(output_tokens, stage=stage)
+    LLM_EVAL_SECONDS.inc(eval_duration / 1e9, stage=stage)
@@ -0,0 +1,320 @@
+import asyncio
+import logging
+import os
+import time
+from collections.abc import AsyncIterator
+
+import ollama
+
+from .transcriptor import AnalyzeMediaLink
+from .analysis import DEFAULT_MODEL, iterTranscriptFragments, iterQueuedFragmentKeywords, dedupe_keywords
+from . import dedup
+from .fingerprints import STAGES, stage_fingerprints
+from .backends import BackendPool
+from .deadline import Deadline
+from .memo import LLMMemo
+from .prefilter import DEFAULT_THRESHOLD, SentencePrefilter
+from .metrics import STAGE_SECONDS, span
+from .segmentation import segment_transcript
+from .sentiment import analyze_sentiment
+from .store import AnalysisStore
+
+logger = logging.getLogger(__name__)
+
+# Transcript fetches outliving their request's deadline, kept referenced until they finish
+_background: set[asyncio.Task] = set()
+
+# Fragments buffered between the fragment and keyword stages
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))
+
+
+async def streamAnalysis(
+    link: str,
+    media: AnalyzeMediaLink,
+    batch_size: int | None = None,
+    batch_token_budget: int | None = None,
+    memo: LLMMemo | None = None,
+    prefilter_threshold: float | None = None,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    store: AnalysisStore | None = None,
+    model_name: str = DEFAULT_MODEL,
+    refresh: bool = False,
+    reuse: dict | None = None,
+    client: ollama.AsyncClient | BackendPool | None = None,
+    dedup_threshold: float | None = None,
+    budget_seconds: float | None = None,
+) -> AsyncIterator[dict]:
+    """
+    Run the transcript -> fragments -> keywords pipeline and stream its progress.
+
+    The keyword stage starts on each fragment as soon as it is produced, so both
+    LLM stages run at the same time; keywords are still deduplicated in fragment order.
+    Near-duplicate fragments are clustered on the way, and only the first fragment
+    of each cluster (its representative) goes to keyword extraction.
+
+    Args:
+        link: Media link to analyze
+        media: Transcript provider
+        batch_size: Maximum number of sentences per batched fragment prompt
+        batch_token_budget: Maximum estimated tokens of sentences per batched fragment prompt
+        memo: Memo of parsed LLM results
+        prefilter_threshold: Minimum pre-filter score of the sentences sent to the LLM,
+            PREFILTER_THRESHOLD if unset; no pre-filter when neither is set
+        queue_size: Fragments buffered between the fragment and keyword stages
+        store: Store the finished analysis is saved and indexed in, along with the
+            output and version fingerprint of every stage
+        model_name: Ollama model of both LLM stages
+        refresh: Fetch the transcript again instead of reading it from the cache
+        reuse: Outputs of the ``transcript``, ``segmentation`` and ``fragments`` stages
+            from a stored analysis, used instead of running those stages again
+        client: Ollama client or backend pool shared across requests, the process-wide default pool when None
+        dedup_threshold: Cosine similarity from which fragments are collapsed into one cluster,
+            FRAGMENT_DEDUP_THRESHOLD if unset; every fragment is kept when neither is set
+        budget_seconds: Latency budget of the run; when it runs out the pending LLM calls
+            are cancelled, the summary holds the partial fragments and keywords with
+            their ``coverage``, and the analysis is not stored
+
+    Yields:
+        dict: ``started``, ``transcript``, then interleaved as the stages progress one
+        ``fragments`` event per sentence or batch, ``fragments_done`` and one
+        ``keywords`` event per representative fragment holding its new keywords, and a final
+        ``summary`` event holding the same details as /transcription_analyzer, including
+        the sentiment of every fragment, of the video and of every keyword
+    """
+    started = time.perf_counter()
+    reuse = reuse or {}
+    deadline = Deadline(budget_seconds) if budget_seconds is not None else None
+    yield {"event": "started", "hyperlink": link}
+
+    if "transcript" in reuse:
+        fetched = reuse["transcript"]
+    else:
+        with span("transcript", link=link):
+            if deadline is None:
+                fetched = await media.fetch(link, refresh=refresh)
+            else:
+                fetch = asyncio.ensure_future(media.fetch(link, refresh=refresh))
+                try:
+                    fetched = await deadline.wait(fetch, "fragments")
+                except asyncio.TimeoutError:
+                    # Left to finish, so a retry finds the transcript in the cache
+                    logger.warning(f"Transcript of {link} not fetched within the budget")
+                    _background.add(fetch)
+                    fetch.add_done_callback(_background.discard)
+                    fetch.add_done_callback(lambda task: task.cancelled() or task.exception())
+                    deadline.transcript_cut = True
+                    fetched = {"text": "", "entries": [], "source": "unknown"}
+                except BaseException:
+                    fetch.cancel()
+                    raise
+    transcript = fetched["text"]
+    yield {"event": "transcript", "transcript": transcript}
+
+    threshold = prefilter_threshold if prefilter_threshold is not None else DEFAULT_THRESHOLD
+    prefilter = SentencePrefilter(threshold=threshold) if threshold is not None else None
+
+    # Fragments flow to the keyword stage as they are produced, through a bounded queue
+    fragment_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+    events: asyncio.Queue = asyncio.Queue()
+    similarity = dedup_threshold if dedup_threshold is not None else dedup.DEFAULT_THRESHOLD
+    deduplicator = dedup.FragmentDeduplicator(similarity) if similarity is not None else None
+    fragments = []
+    keywords = []
+    segments = []
+
+    async def queue_fragment(fragment: str) -> None:
+        # Duplicates only join their cluster, their keywords would repeat the representative's
+        if deduplicator is not None and deduplicator.add(fragment) is not None:
+            return
+        if deadline is None:
+            await fragment_queue.put(fragment)
+            return
+        try:
+            await deadline.wait(fragment_queue.put(fragment), "keywords")
+        except asyncio.TimeoutError:
+            deadline.fragments_cut += 1
+
+    def fragments_done() -> dict:
+        event = {"event": "fragments_done", "fragments_total": len(fragments)}
+        if deduplicator is not None:
+            event["representatives"] = len(deduplicator.clusters)
+        return event
+
+    async def produce_fragments():
+        try:
+            if "segmentation" in reuse:
+                segments.extend(reuse["segmentation"])
+            else:
+                try:
+                    segments.extend(segment_transcript(transcript, fetched["entries"]))
+                except Exception as e:
+                    logger.error(f"Failed to segment transcript: {e}")
+            if "fragments" in reuse:
+                fragments.extend(reuse["fragments"])
+                await events.put({"event": "fragments", "sentences": [], "fragments": list(fragments), "reused": True})
+                for fragment in fragments:
+                    await queue_fragment(fragment)
+                await events.put(fragments_done())
+                return
+            with span("fragments", link=link) as attributes:
+                async for fragments_by_index in iterTranscriptFragments(
+                    transcript,
+                    model_name=model_name,
+                    client=client,
+                    batch_size=batch_size,
+                    batch_token_budget=batch_token_budget,
+                    memo=memo,
+                    prefilter=prefilter,
+                    segments=segments,
+                    deadline=deadline,
+                ):
+                    indexes = sorted(fragments_by_index)
+                    new_fragments = [fragment for i in indexes for fragment in fragments_by_index[i]]
+                    fragments.extend(new_fragments)
+                    event = {"event": "fragments", "sentences": indexes, "fragments": new_fragments}
+                    timed = [
+                        {"index": i, "start": segments[i]["start"], "end": segments[i]["end"]}
+                        for i in indexes if "start" in segments[i]
+                    ]
+                    if timed:
+                        event["segments"] = timed
+                    await events.put(event)
+                    for fragment in new_fragments:
+                        await queue_fragment(fragment)
+                attributes["fragments"] = len(fragments)
+            await events.put(fragments_done())
+        finally:
+            if deadline is None:
+                await fragment_queue.put(None)
+            else:
+                # The keyword stage stops reading at its deadline, the sentinel is then moot
+                try:
+                    await deadline.wait(fragment_queue.put(None), "keywords")
+                except asyncio.TimeoutError:
+                    pass
+
+    async def extract_keywords():
+        seen = set()
+        done = 0
+        with span("keywords", link=link) as attributes:
+            async for fragment_keywords in iterQueuedFragmentKeywords(
+                fragment_queue, model_name=model_name, client=client, memo=memo, deadline=deadline
+            ):
+                new_keywords = dedupe_keywords(fragment_keywords, seen)
+                keywords.extend(new_keywords)
+                done += 1
+                await events.put({"event": "keywords", "keywords": new_keywords, "fragments_done": done})
+            attributes["keywords"] = len(keywords)
+
+    stages = [asyncio.create_task(produce_fragments()), asyncio.create_task(extract_keywords())]
+    for stage in stages:
+        stage.add_done_callback(lambda _: events.put_nowait(None))
+    try:
+        finished = 0
+        while finished < len(stages):
+            event = await events.get()
+            if event is None:
+                finished += 1
+                # A failed stage ends the run instead of leaving the other one waiting
+                for stage in stages:
+                    if stage.done() and not stage.cancelled() and stage.exception() is not None:
+                        raise stage.exception()
+                continue
+            yield event
+    finally:
+        for stage in stages:
+            stage.cancel()
+        await asyncio.gather(*stages, return_exceptions=True)
+
+    if deadline is not None:
+        # Fragments queued after the keyword stage ran out of time
+        while not fragment_queue.empty():
+            if fragment_queue.get_nowait() is not None:
+                deadline.fragments_cut += 1
+
+    details = {
+        "hyperlink": link,
+        "transcript": transcript,
+        "important frags": {"fragments": fragments},
+        "keywords": {"keywords": keywords},
+    }
+    if deduplicator is not None:
+        details["fragment clusters"] = {"clusters": deduplicator.clusters}
+    if deadline is not None:
+        representatives = len(deduplicator.clusters) if deduplicator is not None else len(fragments)
+        details["coverage"] = deadline.coverage(segments, representatives)
+    # Lexicon scoring on the CPU, milliseconds even for thousands of fragments
+    try:
+        with span("sentiment", link=link):
+            details["sentiment"] = analyze_sentiment(fragments, keywords)
+    except Exception as e:
+        logger.error(f"Failed to score the sentiment of {link}: {e}")
+    # Nothing to index when no fragments came out (e.g. the transcript could not be fetched),
+    # and partial analyses would pass for complete ones when re-analyzing
+    if deadline is not None and deadline.partial:
+        logger.info(f"Not storing the partial analysis of {link}")
+    elif store is not None and fragments:
+        fingerprints = stage_fingerprints(
+            fetched.get("source", "unknown"), model_name, batch_size, batch_token_budget, threshold, similarity
+        )
+        outputs = {
+            "transcript": fetched,
+            "segmentation": segments,
+            "fragments": fragments,
+            "dedup": deduplicator.clusters if deduplicator is not None else None,
+            "keywords": keywords,
+        }
+        stages = {stage: {"fingerprint": fingerprints[stage], "output": outputs[stage]} for stage in STAGES}
+        try:
+            with span("store", link=link):
+                await asyncio.to_thread(store.save, link, details, stages)
+        except Exception as e:
+            logger.error(f"Failed to store analysis of {link}: {e}")
+
+    elapsed = time.perf_counter() - started
+    STAGE_SECONDS.observe(elapsed, stage="pipeline")
+    yield {"event": "summary", "success": True, "elapsed": elapsed, "details": details}
+
+
+async def runAnalysis(link: str, media: AnalyzeMediaLink, **options) -> dict:
+    """Run the whole pipeline and return the details of its summary event."""
+    details = {}
+    async for event in streamAnalysis(link, media, **options):
+        if event["event"] == "summary":
+            details = event["details"]
+    return details
+
+
+async def with_heartbeats(events: AsyncIterator[dict], interval: float) -> AsyncIterator[dict]:
+    """
+    Forward pipeline events, adding a ``heartbeat`` event whenever none was sent for ``interval`` seconds.
+
+    Keeps idle proxies from closing the stream while a slow stage (download,
+    Whisper, a long LLM call) is running.
+    """
+    iterator = events.__aiter__()
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=interval)
+            if not done:
+                yield {"event": "heartbeat"}
+                continue
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                return
+            finally:
+                pending = None
+            yield event
+    finally:
+        if pending is not None:
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, StopAsyncIteration):
+                pass
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
@@ -0,0 +1,229 @@
+import abc
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Process-wide counts of sentences seen by the pre-filter and sentences it kept from the LLM.
+# With batching several sentences share a prompt, so skipped sentences are not LLM calls saved
+PREFILTER_STATS = {"sentences": 0, "skipped": 0}
+
+# Default threshold; unset keeps the pre-filter off unless a request asks for it
+DEFAULT_THRESHOLD = float(os.environ["PREFILTER_THRESHOLD"]) if os.getenv("PREFILTER_THRESHOLD") else None
+
+_TOKEN = re.compile(r"[a-z0-9$%']+")
+
+DESCRIPTIVE_WORDS = frozenset("""
+    affordable awesome bad beautiful big bright brittle bulky cheap cheaply clean clunky comfortable
+    compact convenient cool crisp decent dense durable easy elegant excellent expensive fantastic fast
+    flimsy fragile gorgeous great hard heavy huge impressive intuitive large light lightweight loud
+    nice noisy overpriced perfect poor powerful premium pricey pricy quality quick quiet reliable
+    responsive rough sharp simple sleek slim slow small smooth soft solid stable stiff strong sturdy
+    terrible thick thin tight tiny ugly uncomfortable unstable useful vibrant warm weak wobbly
+""".split())
+
+ADJECTIVE_SUFFIXES = ("able", "ible", "ful", "less", "ous", "ive", "ish", "ular", "ical")
+
+PRODUCT_NOUNS = frozenset("""
+    armrest armrests battery bluetooth build button buttons cable camera case charger color colors
+    controller cord design desk display fabric finish frame handle height keyboard leg legs material
+    materials mechanism motor motors mount outlet outlets panel plastic port ports price screen seat
+    sensor size speaker speakers steel surface switch top value warranty weight wheels
+""".split())
+
+COMPARATIVES = frozenset("""
+    best better cheaper compared faster heavier least less lighter more most quieter slower
+    stronger than versus vs worse worst
+""".split())
+
+UNITS = frozenset("""
+    $ % cm db ghz gb hours hz in inch inches kg lb lbs mah mm ms pounds tb w watts
+""".split())
+
+FILLER_PATTERNS = re.compile(
+    r"\b(subscribe|like button|smash that|hey guys|what's up guys|welcome back|sponsor(ed)?|"
+    r"link in the description|links? below|patreon|promo code|discount code|"
+    r"thanks for watching|see you (in the )?next|let me know in the comments)\b"
+)
+
+
+class SentenceFilter(abc.ABC):
+    """
+    Interface of CPU-only sentence scorers for the pre-filter.
+
+    Subclasses score how likely each sentence is to contain product-descriptive
+    phrases, from 0 (filler) to 1 (descriptive). A trained classifier can be
+    plugged in by implementing ``score``.
+    """
+
+    name = "base"
+
+    @abc.abstractmethod
+    def score(self, sentences: list[str]) -> list[float]:
+        """Score a batch of sentences, one float per sentence."""
+
+
+class HeuristicSentenceFilter(SentenceFilter):
+    """Scores sentences on descriptive adjectives, product nouns, specs and comparisons, penalizing filler."""
+
+    name = "heuristic"
+
+    def score(self, sentences: list[str]) -> list[float]:
+        return [self._score(sentence) for sentence in sentences]
+
+    def _score(self, sentence: str) -> float:
+        lowered = sentence.lower()
+        tokens = _TOKEN.findall(lowered)
+        if not tokens:
+            return 0.0
+
+        descriptive = sum(
+            1 for token in tokens
+            if token in DESCRIPTIVE_WORDS or (len(token) > 5 and token.endswith(ADJECTIVE_SUFFIXES))
+        )
+        products = sum(1 for token in tokens if token in PRODUCT_NOUNS)
+        comparisons = sum(1 for token in tokens if token in COMPARATIVES)
+        specs = sum(
+            1 for i, token in enumerate(tokens)
+            if token in UNITS or (token[0].isdigit() and i + 1 < len(tokens) and tokens[i + 1] in UNITS)
+        )
+        raw = 0.9 * descriptive + 0.7 * products + 0.6 * specs + 0.5 * comparisons
+        if FILLER_PATTERNS.search(lowered):
+            raw -= 2.5
+        return raw / (raw + 1.5) if raw > 0 else 0.0
+
+
+class SentencePrefilter:
+    """Drops sentences scoring below ``threshold`` before they are sent to the LLM."""
+
+    def __init__(self, scorer: SentenceFilter | None = None, threshold: float = 0.3):
+        self.scorer = scorer or HeuristicSentenceFilter()
+        self.threshold = threshold
+
+    def select(self, indexed_sentences: list[tuple[int, str]]) -> list[tuple[int, str]]:
+        """
+        Keep the sentences likely to be descriptive.
+
+        Args:
+            indexed_sentences: (sentence index, sentence) pairs
+
+        Returns:
+            list: The pairs scoring at least the threshold, in their original order
+        """
+        if not indexed_sentences:
+            return []
+        scores = self.scorer.score([sentence for _, sentence in indexed_sentences])
+        kept = [pair for pair, score in zip(indexed_sentences, scores) if score >= self.threshold]
+        PREFILTER_STATS["sentences"] += len(indexed_sentences)
+        PREFILTER_STATS["skipped"] += len(indexed_sentences) - len(kept)
+        logger.info(
+            f"Pre-filter kept {len(kept)}/{len(indexed_sentences)} sentences "
+            f"({self.scorer.name}, threshold {self.threshold})"
+        )
+        return kept
+
+
+def prefilter_stats() -> dict:
+    """
+    Sentences scored and skipped by the pre-filter in this process.
+
+    Counts are per sentence: in batched mode the prompts avoided are fewer than the sentences skipped.
+    """
+    sentences, skipped = PREFILTER_STATS["sentences"], PREFILTER_STATS["skipped"]
+    return {
+        "sentences": sentences,
+        "skipped": skipped,
+        "skip_rate": skipped / sentences if sentences else 0.0,
+    }
+
+
+def evaluate_recall(
+    records: list[tuple[str, list]],
+    scorer: SentenceFilter | None = None,
+    thresholds: list[float] = (0.1, 0.2, 0.3, 0.4, 0.5),
+) -> list[dict]:
+    """
+    Offline recall check of a scorer against a full-LLM run.
+
+    Args:
+        records: (sentence, fragments the LLM extracted from it without any pre-filter)
+        scorer: Scorer to evaluate
+        thresholds: Thresholds to report
+
+    Returns:
+        list: Per threshold, the share of fragment-bearing sentences (and of fragments)
+        that would still reach the LLM, and the share of sentences skipped
+    """
+    scorer = scorer or HeuristicSentenceFilter()
+    scores = scorer.score([sentence for sentence, _ in records])
+    relevant = [(score, len(fragments)) for score, (_, fragments) in zip(scores, records) if fragments]
+    total_fragments = sum(count for _, count in relevant)
+
+    report = []
+    for threshold in thresholds:
+        kept = sum(1 for score in scores if score >= threshold)
+        kept_relevant = [count for score, count in relevant if score >= threshold]
+        report.append({
+            "threshold": threshold,
+            "sentence_recall": len(kept_relevant) / len(relevant) if relevant else 1.0,
+            "fragment_recall": sum(kept_relevant) / total_fragments if total_fragments else 1.0,
+            "skip_rate": 1 - kept / len(records) if records else 0.0,
+        })
+    return report
+
+
+async def _llm_records(transcripts: list[str]) -> list[tuple[str, list]]:
+    """Run the fragment stage without pre-filter and pair every segment with its fragments."""
+    from .analysis import iterTranscriptFragments
+    from .backends import close_default_pool
+    from .segmentation import segment_transcript
+
+    records = []
+    try:
+        for transcript in transcripts:
+            # The same segments the fragment stage analyzes, so its indexes point at the right text
+            segments = segment_transcript(transcript)
+            fragments_by_index = {}
+            async for batch in iterTranscriptFragments(transcript, segments=segments):
+                fragments_by_index.update(batch)
+            records.extend((segment["text"], fragments_by_index.get(i, [])) for i, segment in enumerate(segments))
+    finally:
+        await close_default_pool()
+    return records
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Check the pre-filter's recall against full-LLM runs.")
+    parser.add_argument(
+        "input",
+        help="JSONL of {\"sentence\": ..., \"fragments\": [...]} records from a full-LLM run, "
+             "or {\"transcript\": ...} records to run through the LLM first",
+    )
+    parser.add_argument("--thresholds", default="0.1,0.2,0.3,0.4,0.5", help="comma-separated thresholds")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    records, transcripts = [], []
+    with open(args.input, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "transcript" in record:
+                transcripts.append(record["transcript"])
+            else:
+                records.append((record["sentence"], record.get("fragments") or []))
+    if transcripts:
+        records.extend(asyncio.run(_llm_records(transcripts)))
+
+    thresholds = [float(value) for value in args.thresholds.split(",")]
+    for row in evaluate_recall(records, thresholds=thresholds):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import ollama
+
+from . import analysis
+from .fingerprints import STAGES, stage_fingerprints, stale_stages
+from .backends import BackendPool
+from . import dedup
+from .memo import LLMMemo
+from .pipeline import runAnalysis
+from .prefilter import DEFAULT_THRESHOLD
+from .store import AnalysisStore
+from .transcriptor import AnalyzeMediaLink
+
+logger = logging.getLogger(__name__)
+
+
+class ReanalysisStats:
+    """Counters of one re-analysis run: stages reused or recomputed, and the LLM calls avoided."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.llm_calls_at_start = analysis.LLM_CALL_STATS["calls"]
+        self.videos = 0
+        self.up_to_date = 0
+        self.reanalyzed = 0
+        self.failed = 0
+        self.stages = {stage: {"reused": 0, "recomputed": 0} for stage in STAGES}
+        # One fragment prompt per recorded segment and one keyword prompt per
+        # recorded cluster representative of the reused stages (fewer when batching)
+        self.llm_calls_skipped = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "videos": self.videos,
+            "up_to_date": self.up_to_date,
+            "reanalyzed": self.reanalyzed,
+            "failed": self.failed,
+            "stages": self.stages,
+            "llm_calls": analysis.LLM_CALL_STATS["calls"] - self.llm_calls_at_start,
+            "llm_calls_skipped": self.llm_calls_skipped,
+            "elapsed": time.perf_counter() - self.started,
+        }
+
+
+def plan_reanalysis(
+    recorded: dict[str, dict],
+    media: AnalyzeMediaLink,
+    model_name: str = analysis.DEFAULT_MODEL,
+    batch_size: int | None = None,
+    batch_token_budget: int | None = None,
+    prefilter_threshold: float | None = None,
+    dedup_threshold: float | None = None,
+) -> list[str]:
+    """
+    Stages of a stored analysis to run again with the current models, prompts and options.
+
+    Args:
+        recorded: Stage records of the video, as returned by ``AnalysisStore.stages``
+        media: Transcript provider; Whisper transcripts are redone when its model changed
+
+    Returns:
+        list: Stale stages in pipeline order, empty when the analysis is up to date
+    """
+    source = recorded.get("transcript", {}).get("output", {}).get("source", "unknown")
+    if source.startswith("whisper"):
+        source = media.asr_source()
+    threshold = prefilter_threshold if prefilter_threshold is not None else DEFAULT_THRESHOLD
+    similarity = dedup_threshold if dedup_threshold is not None else dedup.DEFAULT_THRESHOLD
+    current = stage_fingerprints(source, model_name, batch_size, batch_token_budget, threshold, similarity)
+    return stale_stages({stage: run["fingerprint"] for stage, run in recorded.items()}, current)
+
+
+async def reanalyzeStored(
+    store: AnalysisStore,
+    media: AnalyzeMediaLink,
+    videos: list[str] | None = None,
+    concurrency: int = 2,
+    dry_run: bool = False,
+    memo: LLMMemo | None = None,
+    model_name: str = analysis.DEFAULT_MODEL,
+    batch_size: int | None = None,
+    batch_token_budget: int | None = None,
+    prefilter_threshold: float | None = None,
+    dedup_threshold: float | None = None,
+    client: ollama.AsyncClient | BackendPool | None = None,
+) -> dict:
+    """
+    Bring stored analyses up to date, running only the stages whose fingerprint changed and those downstream.
+
+    Upstream stage outputs are taken from the store, and recomputed stages still
+    go through the LLM memo, so unchanged inputs cost no LLM call.
+
+    Args:
+        store: Store holding the analyses and their stage records
+        media: Transcript provider
+        videos: Links or video keys to check, every stored video when None
+        concurrency: Maximum number of videos analyzed at the same time
+        dry_run: Only report what would be recomputed
+        client: Ollama client or backend pool shared by every video
+
+    Returns:
+        dict: ``ReanalysisStats`` of the run
+    """
+    stored = await asyncio.to_thread(store.videos)
+    if videos is not None:
+        wanted = {store.key(video) for video in videos}
+        stored = [(key, link) for key, link in stored if key in wanted]
+
+    stats = ReanalysisStats()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def reanalyze(key: str, link: str) -> None:
+        stats.videos += 1
+        # An unreadable or partial stored record fails its own video only, not the whole run
+        try:
+            recorded = await asyncio.to_thread(store.stages, key)
+            stale = plan_reanalysis(
+                recorded, media, model_name, batch_size, batch_token_budget, prefilter_threshold, dedup_threshold
+            )
+            skipped = 0
+            if "fragments" not in stale:
+                skipped += len(recorded["segmentation"]["output"])
+            if not stale:
+                # Keyword prompts only went to the cluster representatives
+                skipped += len(recorded["dedup"]["output"] or recorded["fragments"]["output"])
+            reuse = {stage: recorded[stage]["output"] for stage in STAGES if stage not in stale}
+        except Exception as e:
+            logger.error(f"Failed to read the stored analysis of {key}: {e}")
+            stats.failed += 1
+            return
+
+        for stage in STAGES:
+            stats.stages[stage]["recomputed" if stage in stale else "reused"] += 1
+        stats.llm_calls_skipped += skipped
+        if not stale:
+            stats.up_to_date += 1
+            return
+        logger.info(f"Re-analyzing {key} from the {stale[0]} stage")
+        if dry_run:
+            return
+
+        async with semaphore:
+            try:
+                await runAnalysis(
+                    link,
+                    media,
+                    memo=memo,
+                    store=store,
+                    model_name=model_name,
+                    batch_size=batch_size,
+                    batch_token_budget=batch_token_budget,
+                    prefilter_threshold=prefilter_threshold,
+                    dedup_threshold=dedup_threshold,
+                    # A changed transcript source must not be served from the transcript cache
+                    refresh="transcript" in stale and "transcript" in recorded,
+                    reuse=reuse,
+                    client=client,
+                )
+                stats.reanalyzed += 1
+            except Exception as e:
+                logger.error(f"Failed to re-analyze {key}: {e}")
+                stats.failed += 1
+
+    await asyncio.gather(*(reanalyze(key, link) for key, link in stored))
+    summary = stats.to_dict()
+    logger.info(f"Re-analysis complete: {summary}")
+    return summary
+
+
+async def _run_cli(args: argparse.Namespace) -> dict:
+    from .asr import ASREngine
+    from .cache import TranscriptCache
+    from .clients import SharedClients
+
+    store = AnalysisStore.from_env()
+    if store is None:
+        raise SystemExit("The analysis store is disabled (ANALYSIS_STORE_PATH is empty)")
+
+    asr_engine = ASREngine.from_env()
+    asr_engine.preload = False
+    await asr_engine.start()
+    clients = SharedClients.from_env()
+    await clients.start()
+    media = AnalyzeMediaLink(cache=TranscriptCache.from_env(), asr_engine=asr_engine, clients=clients)
+    memo = LLMMemo.from_env()
+    await memo.prune(analysis.STAGE_TEMPLATES)
+    try:
+        return await reanalyzeStored(
+            store,
+            media,
+            videos=args.video,
+            concurrency=args.concurrency,
+            dry_run=args.dry_run,
+            memo=memo,
+            model_name=args.model,
+            batch_size=args.batch_size,
+            batch_token_budget=args.batch_token_budget,
+            prefilter_threshold=args.prefilter_threshold,
+            dedup_threshold=args.dedup_threshold,
+            client=clients.ollama,
+        )
+    finally:
+        await clients.close()
+        await asr_engine.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Re-run the stages of stored analyses whose model, prompt or settings changed."
+    )
+    parser.add_argument("--video", action="append", help="link or video key to check (repeatable, default: all)")
+    parser.add_argument("--concurrency", type=int, default=2, help="number of videos analyzed at the same time")
+    parser.add_argument("--dry-run", action="store_true", help="only report the stages that would be recomputed")
+    parser.add_argument("--model", default=analysis.DEFAULT_MODEL, help="Ollama model of the LLM stages")
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--batch-token-budget", type=int)
+    parser.add_argument("--prefilter-threshold", type=float)
+    parser.add_argument("--dedup-threshold", type=float)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(json.dumps(asyncio.run(_run_cli(args))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Download missing NLTK data when the server starts; best done once when the image is built instead
+NLTK_DOWNLOAD = os.getenv("NLTK_DOWNLOAD", "0").lower() in ("1", "true", "yes")
+
+# Set once the tokenizer data was found, so requests never look it up again
+_nltk_ready = False
+
+
+def _punkt_resource() -> str:
+    """Name of the sentence tokenizer data used by the installed NLTK version."""
+    from nltk.tokenize import punkt
+    # NLTK 3.8.2 replaced the pickled punkt models with punkt_tab
+    return "punkt_tab" if hasattr(punkt, "PunktTokenizer") else "punkt"
+
+
+def ensure_nltk_resources(download: bool = NLTK_DOWNLOAD) -> bool:
+    """
+    Check, once per process, that the NLTK sentence tokenizer data is installed.
+
+    Args:
+        download: Download the data if it is missing
+
+    Returns:
+        bool: Whether the data is available
+    """
+    global _nltk_ready
+    if _nltk_ready:
+        return True
+
+    import nltk
+    resource = _punkt_resource()
+    try:
+        nltk.data.find(f"tokenizers/{resource}")
+    except LookupError:
+        if not download:
+            logger.error(
+                f"NLTK '{resource}' data is missing, install it with "
+                f"python -m <package>.Transcription.resources or set NLTK_DOWNLOAD=1"
+            )
+            return False
+        logger.info(f"Downloading NLTK {resource} tokenizer...")
+        if not nltk.download(resource, quiet=True):
+            logger.error(f"Failed to download NLTK '{resource}' data")
+            return False
+    _nltk_ready = True
+    return True
+
+
+def sent_tokenize(text: str) -> list[str]:
+    """
+    Split text into sentences with NLTK, which is only imported on first use.
+
+    Raises:
+        LookupError: If the tokenizer data is not installed
+    """
+    if not ensure_nltk_resources(download=False):
+        raise LookupError(f"NLTK '{_punkt_resource()}' data is not installed")
+    from nltk.tokenize import sent_tokenize as nltk_sent_tokenize
+    return nltk_sent_tokenize(text)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Install the NLTK data the pipeline needs, e.g. when building the image.")
+    parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    raise SystemExit(0 if ensure_nltk_resources(download=True) else 1)
+
+
+if __name__ == "__main__":
+    main()
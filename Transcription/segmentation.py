@@ -0,0 +1,190 @@
+import logging
+import os
+
+from ..models.general_utils import estimate_tokens
+from .metrics import span
+from .resources import sent_tokenize
+
+logger = logging.getLogger(__name__)
+
+# Estimated tokens of transcript text per window sent to the fragment stage
+DEFAULT_WINDOW_TOKENS = int(os.getenv("SEGMENT_WINDOW_TOKENS", "200"))
+
+# Estimated tokens repeated at the start of each window from the end of the previous one
+DEFAULT_OVERLAP_TOKENS = int(os.getenv("SEGMENT_OVERLAP_TOKENS", "24"))
+
+# Silence between caption entries treated as a natural boundary
+DEFAULT_PAUSE_SECONDS = float(os.getenv("SEGMENT_PAUSE_SECONDS", "1.0"))
+
+# Bump whenever the splitting logic changes, stored analyses are then re-segmented
+SEGMENTATION_VERSION = 2
+
+
+def segment_transcript(
+    transcript: str,
+    entries: list[dict] | None = None,
+    window_tokens: int = DEFAULT_WINDOW_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+    pause_seconds: float = DEFAULT_PAUSE_SECONDS,
+) -> list[dict]:
+    """
+    Split a transcript into the units sent to the fragment stage.
+
+    Punctuated transcripts are split into sentences. A sentence longer than
+    ``window_tokens`` (unpunctuated auto-captions come back as one giant
+    sentence) is packed into token-budgeted windows instead, cut at the
+    boundaries of the caption entries it spans and preferably at pauses; the
+    other sentences are kept as they are.
+
+    Args:
+        transcript: Transcript text
+        entries: Timestamped caption entries (``text``, ``start``, ``end``) the text was built from
+        window_tokens: Estimated token budget of one window
+        overlap_tokens: Estimated tokens repeated from the end of the previous window
+        pause_seconds: Gap between entries preferred as a window boundary
+
+    Returns:
+        list: Units with ``text`` and, when entries are known for a window, ``start`` and ``end`` seconds
+    """
+    with span("tokenize"):
+        sentences = sent_tokenize(transcript)
+    if all(estimate_tokens(sentence) <= window_tokens for sentence in sentences):
+        return [{"text": sentence} for sentence in sentences]
+
+    located = _locate(transcript, entries or [])
+    segments = []
+    windowed = 0
+    cursor = 0
+    for sentence in sentences:
+        start = transcript.find(sentence, cursor)
+        if start == -1:
+            start = cursor
+        end = start + len(sentence)
+        cursor = end
+        if estimate_tokens(sentence) <= window_tokens:
+            segments.append({"text": sentence})
+            continue
+
+        sentence_entries = _clip_entries(transcript, located, start, end)
+        if not sentence_entries:
+            # No caption boundaries (e.g. an old cache entry), cut between words instead
+            sentence_entries = [{"text": word} for word in sentence.split()]
+        windows = segment_entries(sentence_entries, window_tokens, overlap_tokens, pause_seconds)
+        segments.extend(windows)
+        windowed += len(windows)
+    logger.info(f"Split the sentences longer than {window_tokens} tokens into {windowed} windows")
+    return segments
+
+
+def _locate(transcript: str, entries: list[dict]) -> list[tuple[int, int, dict]]:
+    """Character span of each caption entry in the transcript joined from them, skipping those not found."""
+    located = []
+    cursor = 0
+    for entry in entries:
+        text = entry["text"].strip()
+        if not text:
+            continue
+        start = transcript.find(text, cursor)
+        if start == -1:
+            continue
+        cursor = start + len(text)
+        located.append((start, cursor, entry))
+    return located
+
+
+def _clip_entries(transcript: str, located: list[tuple[int, int, dict]], start: int, end: int) -> list[dict]:
+    """Entries overlapping ``start:end`` of the transcript, with their text cut to that span."""
+    clipped = []
+    for entry_start, entry_end, entry in located:
+        if entry_end <= start or entry_start >= end:
+            continue
+        text = transcript[max(entry_start, start):min(entry_end, end)].strip()
+        if text:
+            clipped.append({**entry, "text": text})
+    return clipped
+
+
+def segment_entries(
+    entries: list[dict],
+    window_tokens: int = DEFAULT_WINDOW_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+    pause_seconds: float = DEFAULT_PAUSE_SECONDS,
+) -> list[dict]:
+    """
+    Pack caption entries into windows of about ``window_tokens`` estimated tokens.
+
+    A window is closed early, once at least half full, at a pause of
+    ``pause_seconds`` or more before the next entry. Each window after the first
+    starts with the last entries of the previous one, up to ``overlap_tokens``,
+    so a phrase cut at the boundary is seen whole by one of the two.
+
+    Returns:
+        list: Windows with ``text`` and, when the entries carry timestamps, ``start`` and ``end``
+    """
+    entries = [piece for entry in entries for piece in _split_long_entry(entry, window_tokens)]
+    windows = []
+    current: list[dict] = []
+    tokens = 0
+    # Entries of the current window not already sent as the previous window's tail
+    fresh = 0
+    for index, entry in enumerate(entries):
+        entry_tokens = estimate_tokens(entry["text"])
+        if fresh and tokens + entry_tokens > window_tokens:
+            windows.append(_window(current))
+            current = _overlap(current, overlap_tokens)
+            tokens = sum(estimate_tokens(item["text"]) for item in current)
+            fresh = 0
+        current.append(entry)
+        tokens += entry_tokens
+        fresh += 1
+
+        following = entries[index + 1] if index + 1 < len(entries) else None
+        if following is not None and tokens >= window_tokens / 2 and _gap(entry, following) >= pause_seconds:
+            # Natural pause: cut here without overlap, nothing is spoken across it
+            windows.append(_window(current))
+            current, tokens, fresh = [], 0, 0
+    if fresh:
+        windows.append(_window(current))
+    return windows
+
+
+def _split_long_entry(entry: dict, window_tokens: int) -> list[dict]:
+    """Split a single entry larger than a window into word groups sharing its timestamps."""
+    if estimate_tokens(entry["text"]) <= window_tokens:
+        return [entry]
+    pieces, words = [], []
+    for word in entry["text"].split():
+        if words and estimate_tokens(" ".join(words + [word])) > window_tokens:
+            pieces.append({**entry, "text": " ".join(words)})
+            words = []
+        words.append(word)
+    if words:
+        pieces.append({**entry, "text": " ".join(words)})
+    return pieces
+
+
+def _overlap(window: list[dict], overlap_tokens: int) -> list[dict]:
+    """Trailing entries of a window fitting in ``overlap_tokens``, never the whole window."""
+    carried, tokens = [], 0
+    for entry in reversed(window[1:]):
+        tokens += estimate_tokens(entry["text"])
+        if tokens > overlap_tokens:
+            break
+        carried.insert(0, entry)
+    return carried
+
+
+def _gap(entry: dict, following: dict) -> float:
+    if entry.get("end") is None or following.get("start") is None:
+        return 0.0
+    return following["start"] - entry["end"]
+
+
+def _window(entries: list[dict]) -> dict:
+    window = {"text": " ".join(entry["text"].strip() for entry in entries if entry["text"].strip())}
+    starts = [entry["start"] for entry in entries if entry.get("start") is not None]
+    ends = [entry["end"] for entry in entries if entry.get("end") is not None]
+    if starts and ends:
+        window["start"] = min(starts)
+        window["end"] = max(ends)
+    return window
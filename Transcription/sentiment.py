@@ -0,0 +1,263 @@
+import abc
+import logging
+import os
+
+from ..models.general_utils import words
+
+logger = logging.getLogger(__name__)
+
+# Optional lexicon file replacing the built-in one: one "word<TAB>valence" per line
+# (extra columns are ignored, so VADER's vader_lexicon.txt can be used as is)
+LEXICON_PATH = os.getenv("SENTIMENT_LEXICON_PATH") or None
+
+# Polarity below which a fragment counts as neutral, in either direction
+NEUTRAL_BAND = 0.05
+
+# Word valences from -4 to 4, leaning towards product reviews
+_VALENCES = {
+    3.0: """
+        amazing awesome brilliant excellent exceptional fantastic flawless incredible love loved
+        loves outstanding perfect perfectly phenomenal superb wonderful
+    """,
+    2.0: """
+        beautiful best comfortable durable effortless enjoy enjoyed favorite fun glad gorgeous great
+        happy impressed impressive intuitive like liked premium recommend recommended reliable
+        responsive sleek smooth stunning sturdy vibrant
+    """,
+    1.0: """
+        affordable better bright clean compact convenient cool crisp decent easy elegant fast fine
+        good helpful nice okay pleasant powerful pretty quick quiet robust simple solid stable
+        strong upgrade useful worth
+    """,
+    -1.0: """
+        awkward bulky clunky confusing cramped dim expensive fiddly hard issue issues lacking loud
+        meh noisy overpriced pricey pricy problem problems slow stiff tight uncomfortable unstable
+        weak wobbly worse
+    """,
+    -2.0: """
+        annoying bad cheaply defective difficult disappointed disappointing fail failed fails flimsy
+        fragile frustrating hate hated mediocre poor poorly rattles rough ugly unreliable wobbles
+    """,
+    -3.0: """
+        awful broke broken dangerous garbage horrible junk nightmare terrible trash useless waste
+        worst
+    """,
+}
+
+NEGATORS = frozenset("""
+    ain't aren't can't cannot couldn't didn't doesn't don't hadn't hasn't haven't isn't lack lacks
+    neither never no nobody none nor not nothing nowhere shouldn't wasn't weren't without won't wouldn't
+""".split())
+
+# Added to the magnitude of the next sentiment word (VADER's booster increments)
+INTENSIFIERS = {
+    **dict.fromkeys("""
+        absolutely completely especially exceptionally extremely highly incredibly insanely really
+        remarkably ridiculously so super seriously too totally truly very
+    """.split(), 0.293),
+    **dict.fromkeys("""
+        barely kinda marginally partly slightly somewhat
+    """.split(), -0.293),
+}
+
+# Contrast words: the clause after them outweighs the one before
+CONTRASTS = frozenset(("but", "however", "although", "though"))
+
+# Scale of a negated valence, and of an intensifier one and two words further back
+_NEGATION_SCALE = -0.74
+_INTENSIFIER_DECAY = (1.0, 0.95, 0.9)
+# Normalization of summed valences into -1..1, as in VADER
+_ALPHA = 15.0
+
+
+def load_lexicon(path: str) -> dict[str, float]:
+    """Read a "word<TAB>valence" lexicon file, skipping comments and malformed lines."""
+    lexicon = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) < 2 or line.startswith("#"):
+                continue
+            try:
+                lexicon[parts[0].strip().lower()] = float(parts[1])
+            except ValueError:
+                continue
+    return lexicon
+
+
+class SentimentScorer(abc.ABC):
+    """
+    Interface of CPU-only sentiment scorers.
+
+    Subclasses score a batch of texts at once, from -1 (negative) to 1 (positive).
+    A small linear model can be plugged in by implementing ``score``.
+    """
+
+    name = "base"
+
+    @abc.abstractmethod
+    def score(self, texts: list[str]):
+        """
+        Returns:
+            numpy.ndarray: One float32 polarity per text
+        """
+
+    def score_words(self, tokenized: list[list[str]]):
+        """Score texts already split by ``words``."""
+        return self.score([" ".join(tokens) for tokens in tokenized])
+
+
+class LexiconSentimentScorer(SentimentScorer):
+    """
+    Lexicon scorer handling negations, intensifiers and contrasts.
+
+    Every text of a batch is flattened into one token array, and the word
+    valences, the negators and intensifiers up to three words back and the
+    contrast weights are all applied as NumPy array operations over it, so a
+    batch costs one dictionary lookup per distinct word plus a few array passes.
+    """
+
+    name = "lexicon"
+
+    def __init__(self, lexicon: dict[str, float] | None = None):
+        if lexicon is None:
+            lexicon = {word: valence for valence, text in _VALENCES.items() for word in text.split()}
+        self.lexicon = lexicon
+
+    @classmethod
+    def from_env(cls) -> "LexiconSentimentScorer":
+        """Scorer with the SENTIMENT_LEXICON_PATH lexicon, or the built-in one."""
+        return cls(load_lexicon(LEXICON_PATH) if LEXICON_PATH else None)
+
+    def score(self, texts: list[str]):
+        return self.score_words([words(text) for text in texts])
+
+    def score_words(self, tokenized: list[list[str]]):
+        import numpy as np
+
+        count = len(tokenized)
+        lengths = np.fromiter((len(tokens) for tokens in tokenized), dtype=np.intp, count=count)
+        if not lengths.sum():
+            return np.zeros(count, dtype=np.float32)
+
+        # Look each distinct word up once, then spread its properties over the tokens
+        vocabulary: dict[str, int] = {}
+        ids = np.fromiter(
+            (vocabulary.setdefault(token, len(vocabulary)) for tokens in tokenized for token in tokens),
+            dtype=np.intp,
+        )
+        distinct = list(vocabulary)
+        valence = np.array([self.lexicon.get(word, 0.0) for word in distinct], dtype=np.float32)[ids]
+        negator = np.array([word in NEGATORS or word.endswith("n't") for word in distinct], dtype=bool)[ids]
+        boost = np.array([INTENSIFIERS.get(word, 0.0) for word in distinct], dtype=np.float32)[ids]
+        contrast = np.array([word in CONTRASTS for word in distinct], dtype=bool)[ids]
+
+        owner = np.repeat(np.arange(count), lengths)
+        starts = np.cumsum(lengths) - lengths
+        position = np.arange(len(ids)) - starts[owner]
+
+        # Intensifiers and negators up to three words before a sentiment word, within the same text
+        negated = np.zeros(len(ids), dtype=bool)
+        boosted = np.zeros(len(ids), dtype=np.float32)
+        for back, decay in enumerate(_INTENSIFIER_DECAY, start=1):
+            within = position >= back
+            negated[back:] |= negator[:-back] & within[back:]
+            boosted[back:] += boost[:-back] * decay * within[back:]
+        valence = np.where(valence != 0, valence + np.sign(valence) * boosted, 0.0)
+        valence = np.where(negated, valence * _NEGATION_SCALE, valence)
+
+        # In texts with a contrast word, words before it weigh half and words after it one and a half
+        contrasts = np.cumsum(contrast)
+        # Contrast words seen before each text starts (empty texts start past the last token)
+        before = np.concatenate(([0], contrasts))[starts]
+        after = contrasts - before[owner]
+        has_contrast = np.bincount(owner, weights=contrast, minlength=count) > 0
+        weight = np.where(has_contrast[owner], np.where(after > 0, 1.5, 0.5), 1.0)
+
+        total = np.bincount(owner, weights=valence * weight, minlength=count)
+        return (total / np.sqrt(total * total + _ALPHA)).astype(np.float32)
+
+
+def _keyword_mentions(keywords: list[str], fragment_words: list[list[str]]) -> list[list[int]]:
+    """Indexes of the fragments containing each keyword as a phrase."""
+    keyword_words = [words(keyword) for keyword in keywords]
+    # Postings of the keyword words only, phrases are then checked on the fragments holding all their words
+    postings: dict[str, set[int]] = {word: set() for tokens in keyword_words for word in tokens}
+    for i, tokens in enumerate(fragment_words):
+        for token in tokens:
+            if token in postings:
+                postings[token].add(i)
+
+    mentions = []
+    for tokens in keyword_words:
+        if len(tokens) < 2:
+            mentions.append(sorted(postings[tokens[0]]) if tokens else [])
+            continue
+        phrase = f" {' '.join(tokens)} "
+        candidates = set.intersection(*(postings[word] for word in tokens))
+        mentions.append(sorted(i for i in candidates if phrase in f" {' '.join(fragment_words[i])} "))
+    return mentions
+
+
+def analyze_sentiment(
+    fragments: list[str],
+    keywords: list[str],
+    scorer: SentimentScorer | None = None,
+) -> dict:
+    """
+    Score the fragments of an analysis and aggregate them per video and per keyword.
+
+    A keyword scores the mean polarity of the fragments mentioning it, so a
+    keyword is as positive as what is said about it; a keyword no fragment
+    mentions word for word is scored on its own text.
+
+    Args:
+        fragments: Fragments, as returned by analyzeTranscript
+        keywords: Deduplicated keywords of the same analysis
+        scorer: Sentiment scorer, the default lexicon scorer when None
+
+    Returns:
+        dict: ``fragments`` (one polarity per fragment, in order), ``video``
+        (mean polarity and counts of positive, negative and neutral fragments)
+        and ``keywords`` (``{"keyword", "score", "mentions"}`` per keyword)
+    """
+    import numpy as np
+
+    scorer = scorer or default_scorer()
+    fragment_words = [words(fragment) for fragment in fragments]
+    fragment_scores = scorer.score_words(fragment_words)
+
+    mentions = _keyword_mentions(keywords, fragment_words)
+    counts = np.fromiter((len(indexes) for indexes in mentions), dtype=np.intp, count=len(keywords))
+    keyword_of = np.repeat(np.arange(len(keywords)), counts)
+    mentioned = np.fromiter((i for indexes in mentions for i in indexes), dtype=np.intp, count=int(counts.sum()))
+    totals = np.bincount(keyword_of, weights=fragment_scores[mentioned], minlength=len(keywords))
+    keyword_scores = np.divide(totals, counts, out=np.zeros(len(keywords)), where=counts > 0)
+    unmentioned = np.flatnonzero(counts == 0)
+    if len(unmentioned):
+        keyword_scores[unmentioned] = scorer.score([keywords[i] for i in unmentioned])
+
+    return {
+        "fragments": [round(float(score), 4) for score in fragment_scores],
+        "video": {
+            "score": round(float(fragment_scores.mean()), 4) if len(fragments) else 0.0,
+            "positive": int((fragment_scores > NEUTRAL_BAND).sum()),
+            "negative": int((fragment_scores < -NEUTRAL_BAND).sum()),
+            "neutral": int((np.abs(fragment_scores) <= NEUTRAL_BAND).sum()),
+        },
+        "keywords": [
+            {"keyword": keyword, "score": round(float(score), 4), "mentions": int(count)}
+            for keyword, score, count in zip(keywords, keyword_scores, counts)
+        ],
+    }
+
+
+_default_scorer: SentimentScorer | None = None
+
+
+def default_scorer() -> SentimentScorer:
+    """Process-wide lexicon scorer, loaded on first use."""
+    global _default_scorer
+    if _default_scorer is None:
+        _default_scorer = LexiconSentimentScorer.from_env()
+    return _default_scorer
@@ -0,0 +1,216 @@
+import json
+import logging
+import os
+import time
+from collections import Counter
+
+from ..models.general_utils import STOPWORDS, words
+from .cache import SqliteStore
+from .transcriptor import video_key
+
+logger = logging.getLogger(__name__)
+
+# Upper bound of the term range matched by a prefix lookup
+_PREFIX_END = "\U0010ffff"
+
+
+def normalize_term(text: str) -> str:
+    """Lowercase a keyword or query and reduce it to space-separated words."""
+    return " ".join(words(text))
+
+
+def fragment_terms(fragment: str) -> list[str]:
+    """Words and two-word phrases of a fragment, without stopwords."""
+    fragment_words = words(fragment)
+    terms = [word for word in fragment_words if word not in STOPWORDS]
+    terms.extend(
+        f"{first} {second}" for first, second in zip(fragment_words, fragment_words[1:])
+        if first not in STOPWORDS and second not in STOPWORDS
+    )
+    return terms
+
+
+def index_terms(details: dict) -> list[tuple[str, str, int]]:
+    """
+    (term, kind, frequency) postings of one analysis.
+
+    Keywords are indexed as whole phrases, their frequency being how many of the
+    video's fragments mention them (at least 1); fragments are indexed by words
+    and two-word phrases.
+    """
+    fragments = details.get("important frags", {}).get("fragments", [])
+    keywords = details.get("keywords", {}).get("keywords", [])
+
+    fragment_counts = Counter(term for fragment in fragments for term in fragment_terms(fragment))
+    normalized_fragments = [f" {normalize_term(fragment)} " for fragment in fragments]
+    keyword_counts = {}
+    for keyword in keywords:
+        term = normalize_term(keyword)
+        if term and term not in keyword_counts:
+            keyword_counts[term] = max(1, sum(f" {term} " in fragment for fragment in normalized_fragments))
+
+    postings = [(term, "keyword", count) for term, count in keyword_counts.items()]
+    postings.extend((term, "fragment", count) for term, count in fragment_counts.items())
+    return postings
+
+
+class AnalysisStore(SqliteStore):
+    """
+    Analysis results keyed by video, with an inverted index from keyword and fragment terms to videos.
+
+    Saving a video again replaces its previous analysis and postings, so the
+    index is updated incrementally as videos are (re)analyzed. The output and
+    version fingerprint of every pipeline stage are kept alongside, so a
+    re-analysis can reuse the stages that did not change.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS analyses (
+            video_key TEXT PRIMARY KEY,
+            link TEXT NOT NULL,
+            analyzed_at REAL NOT NULL,
+            details TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS postings (
+            term TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            video_key TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (term, kind, video_key)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS postings_video ON postings (video_key, count);
+        CREATE TABLE IF NOT EXISTS stages (
+            video_key TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            output TEXT NOT NULL,
+            PRIMARY KEY (video_key, stage)
+        ) WITHOUT ROWID;
+    """
+
+    @classmethod
+    def from_env(cls) -> "AnalysisStore | None":
+        """Build the store from ANALYSIS_STORE_PATH, None when it is set empty."""
+        path = os.getenv("ANALYSIS_STORE_PATH", os.path.join(".cache", "analyses.sqlite3"))
+        return cls(path) if path else None
+
+    def save(self, link: str, details: dict, stages: dict[str, dict] | None = None) -> str:
+        """
+        Store the analysis of a link and replace its postings.
+
+        Args:
+            link: Analyzed link
+            details: Analysis details, as returned by /transcription_analyzer
+            stages: ``fingerprint`` and ``output`` of each pipeline stage, replacing the recorded ones
+
+        Returns:
+            str: Key the video is stored under (platform and video ID when known)
+        """
+        key = video_key(link)
+        postings = index_terms(details)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (video_key, link, analyzed_at, details) VALUES (?, ?, ?, ?)",
+                (key, link, time.time(), json.dumps(details)),
+            )
+            conn.execute("DELETE FROM postings WHERE video_key = ?", (key,))
+            conn.executemany(
+                "INSERT INTO postings (term, kind, video_key, count) VALUES (?, ?, ?, ?)",
+                [(term, kind, key, count) for term, kind, count in postings],
+            )
+            if stages is not None:
+                conn.execute("DELETE FROM stages WHERE video_key = ?", (key,))
+                conn.executemany(
+                    "INSERT INTO stages (video_key, stage, fingerprint, output) VALUES (?, ?, ?, ?)",
+                    [(key, stage, run["fingerprint"], json.dumps(run["output"])) for stage, run in stages.items()],
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info(f"Stored analysis of {key} with {len(postings)} index terms")
+        return key
+
+    def get(self, video: str) -> dict | None:
+        """Stored analysis of a video, by link or video key."""
+        row = self._connection().execute(
+            "SELECT link, analyzed_at, details FROM analyses WHERE video_key = ?", (self.key(video),)
+        ).fetchone()
+        if row is None:
+            return None
+        link, analyzed_at, details = row
+        return {"video_key": self.key(video), "link": link, "analyzed_at": analyzed_at, "details": json.loads(details)}
+
+    def stages(self, video: str) -> dict[str, dict]:
+        """Recorded ``fingerprint`` and ``output`` of each pipeline stage of a video."""
+        rows = self._connection().execute(
+            "SELECT stage, fingerprint, output FROM stages WHERE video_key = ?", (self.key(video),)
+        )
+        return {stage: {"fingerprint": fingerprint, "output": json.loads(output)} for stage, fingerprint, output in rows}
+
+    def videos(self) -> list[tuple[str, str]]:
+        """(video key, link) of every stored analysis."""
+        return self._connection().execute("SELECT video_key, link FROM analyses ORDER BY analyzed_at").fetchall()
+
+    def search(self, term: str, kind: str | None = None, limit: int = 50) -> list[dict]:
+        """
+        Videos mentioning a term, most frequent first.
+
+        Args:
+            term: Keyword or fragment word/phrase, normalized before lookup
+            kind: ``keyword`` or ``fragment`` to search one kind of term only
+            limit: Maximum number of videos
+        """
+        query = (
+            "SELECT p.video_key, a.link, SUM(p.count) AS total, GROUP_CONCAT(p.kind) "
+            "FROM postings p JOIN analyses a ON a.video_key = p.video_key "
+            "WHERE p.term = ?" + (" AND p.kind = ?" if kind else "") + " "
+            "GROUP BY p.video_key ORDER BY total DESC LIMIT ?"
+        )
+        params = (normalize_term(term),) + ((kind,) if kind else ()) + (limit,)
+        return [
+            {"video_key": key, "link": link, "count": total, "kinds": sorted(kinds.split(","))}
+            for key, link, total, kinds in self._connection().execute(query, params)
+        ]
+
+    def prefix(self, prefix: str, kind: str | None = None, limit: int = 20) -> list[dict]:
+        """Indexed terms starting with ``prefix``, with the number of videos and total frequency."""
+        normalized = normalize_term(prefix)
+        if prefix[-1:].isspace() and normalized:
+            normalized += " "
+        query = (
+            "SELECT term, COUNT(DISTINCT video_key), SUM(count) AS total FROM postings "
+            "WHERE term >= ? AND term < ?" + (" AND kind = ?" if kind else "") + " "
+            "GROUP BY term ORDER BY total DESC LIMIT ?"
+        )
+        params = (normalized, normalized + _PREFIX_END) + ((kind,) if kind else ()) + (limit,)
+        return [
+            {"term": term, "videos": videos, "count": total}
+            for term, videos, total in self._connection().execute(query, params)
+        ]
+
+    def top_terms(self, video: str, n: int = 10, kind: str | None = None) -> list[dict]:
+        """Most frequent terms of one video, by link or video key."""
+        query = (
+            "SELECT term, kind, count FROM postings WHERE video_key = ?"
+            + (" AND kind = ?" if kind else "")
+            + " ORDER BY count DESC, term LIMIT ?"
+        )
+        params = (self.key(video),) + ((kind,) if kind else ()) + (n,)
+        return [
+            {"term": term, "kind": term_kind, "count": count}
+            for term, term_kind, count in self._connection().execute(query, params)
+        ]
+
+    def stats(self) -> dict:
+        conn = self._connection()
+        videos = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        terms, postings = conn.execute("SELECT COUNT(DISTINCT term), COUNT(*) FROM postings").fetchone()
+        return {"videos": videos, "terms": terms, "postings": postings}
+
+    @staticmethod
+    def key(video: str) -> str:
+        # Links are mapped to their key, keys ("youtube:abc") are used as given
+        return video_key(video) if "://" in video else video
@@ -1,14 +1,26 @@
 from urllib.parse import urlparse
 from youtube_transcript_api import YouTubeTranscriptApi
 import re
-import os
-import aiohttp
-from moviepy.editor import VideoFileClip
-import whisper
+import asyncio
 import logging
+from contextlib import asynccontextmanager
+from .cache import TranscriptCache
+from .asr import ASREngine
+from .clients import SharedClients
+from .metrics import span
 
 logger = logging.getLogger(__name__)
 
+# Size of the HTTP body chunks fed to ffmpeg
+AUDIO_CHUNK_SIZE = 64 * 1024
+
+# Source recorded for transcripts built from platform captions
+CAPTIONS_SOURCE = "captions"
+
+
+class TranscriptError(Exception):
+    """Raised when no transcript can be produced for a link; the message is returned to the caller."""
+
 
 
 def detect_platform(link:str) -> str:
@@ -26,117 +38,212 @@ def detect_platform(link:str) -> str:
         return "unknown"
    
 def vid_id(url: str) -> str | None:
-    match = re.search(r"v=([a-zA-Z0-9_-]{11})", url) or re.search(r"youtu\.be/([a-zA-Z0-9_-]{11})", url)
+    match = (
+        re.search(r"v=([a-zA-Z0-9_-]{11})", url)
+        or re.search(r"youtu\.be/([a-zA-Z0-9_-]{11})", url)
+        or re.search(r"/shorts/([a-zA-Z0-9_-]{11})", url)
+    )
     return match.group(1) if match else None
+
+def media_id(link: str, platform: str) -> str | None:
+    """Stable video ID of a link on its platform, None if it can't be determined."""
+    if platform in ("youtube", "youtube-shorts"):
+        return vid_id(link)
+    if platform == "tiktok":
+        match = re.search(r"/video/(\d+)", link)
+    elif platform == "twitch":
+        match = re.search(r"/videos?/(\d+)", link)
+    else:
+        match = None
+    return match.group(1) if match else None
+
+def video_key(link: str) -> str:
+    """Key identifying the video of a link across link variants: platform and video ID when known."""
+    platform = detect_platform(link)
+    video_id = media_id(link, platform)
+    return f"{platform}:{video_id}" if video_id else link.strip()
    
 
+def _caption_entries(transcript: list[dict]) -> list[dict]:
+    """Caption entries as returned by YouTubeTranscriptApi, with their end time instead of duration."""
+    return [
+        {"text": entry["text"], "start": entry["start"], "end": entry["start"] + entry.get("duration", 0.0)}
+        for entry in transcript
+    ]
+
+
+def _join_entries(entries: list[dict]) -> str:
+    return " ".join(entry["text"] for entry in entries).strip()
+
+
 class AnalyzeMediaLink:
     def __init__(
             self,
-
+            cache: TranscriptCache | None = None,
+            asr_engine: ASREngine | None = None,
+            clients: SharedClients | None = None,
     ):
-     pass
+     self.cache = cache
+     self.asr_engine = asr_engine
+     self.clients = clients
     
     async def transcript(self, link: str) -> str:
+        return (await self.fetch(link))["text"]
+
+    def asr_source(self) -> str:
+        """Source recorded for transcripts produced by speech recognition, changes with the Whisper model."""
+        return f"whisper:{self.asr_engine.model_size}" if self.asr_engine is not None else "whisper"
+
+    async def fetch(self, link: str, refresh: bool = False) -> dict:
+        """
+        Fetch the transcript of a link along with its timestamped caption entries.
+
+        Args:
+            link: Media link
+            refresh: Ignore the cached transcript and fetch it again
+
+        Returns:
+            dict: ``text``, ``entries`` with the ``text``, ``start`` and ``end``
+            seconds of every caption entry or speech segment (empty when unknown),
+            and ``source``: ``captions``, ``whisper:<model>`` or ``unknown``
+        """
         domain = detect_platform(link=link)
         logger.info(f"Processing link: {link} (platform: {domain})")
 
-        if domain == "youtube":
-            transcript = await self.youtube_transcript(link)
-        elif domain == "tiktok":
-            transcript = await self.tiktok_transcript(link)
-        elif domain == "twitch":
-            transcript = await self.twitch_transcript(link)
-        elif domain == "youtube-shorts":
-            transcript = await self.youtube_shorts_transcript(link)
-        else:
-            transcript = ""
-        print(domain)
+        video_id = media_id(link, domain)
+        cache_key = TranscriptCache.key(domain, video_id) if self.cache and video_id else None
+        if cache_key and not refresh:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                logger.info(f"Transcript cache hit for {cache_key}")
+                return {
+                    "text": cached["text"],
+                    "entries": cached.get("entries", []),
+                    "source": cached.get("source", "unknown"),
+                }
+
+        try:
+            if domain == "youtube":
+                entries, source = await self.youtube_entries(link), CAPTIONS_SOURCE
+            elif domain == "tiktok":
+                entries, source = await self._download_and_extract_audio(link, "tiktok"), self.asr_source()
+            elif domain == "twitch":
+                entries, source = await self._download_and_extract_audio(link, "twitch"), self.asr_source()
+            elif domain == "youtube-shorts":
+                entries, source = await self.youtube_shorts_entries(link)
+            else:
+                entries, source = [], "unknown"
+        except TranscriptError as e:
+            return {"text": str(e), "entries": [], "source": "unknown"}
+        logger.debug(f"Fetched {domain} transcript for {link}")
+        transcript = _join_entries(entries)
+
+        # Only real transcripts are cached, failures are retried on the next call
+        if cache_key and transcript:
+            await asyncio.to_thread(
+                self.cache.set, cache_key, {"text": transcript, "entries": entries, "source": source}
+            )
+
+        return {"text": transcript or "No transcript available", "entries": entries, "source": source}
 
-        return transcript or "No transcript available"
-    
     async def youtube_transcript(self, link: str) -> str:
+        return _join_entries(await self.youtube_entries(link))
+
+    async def youtube_entries(self, link: str) -> list[dict]:
         video_id = vid_id(link)
         if not video_id:
-            return "Invalid YouTube URL"
+            raise TranscriptError("Invalid YouTube URL")
         try:
-            transcript = YouTubeTranscriptApi.get_transcript(video_id)
-            return " ".join([entry["text"] for entry in transcript])
+            transcript = await asyncio.to_thread(YouTubeTranscriptApi.get_transcript, video_id)
+            return _caption_entries(transcript)
         except Exception as e:
-            return f"Error fetching YouTube transcript: {str(e)}"
+            raise TranscriptError(f"Error fetching YouTube transcript: {str(e)}") from e
         
     async def tiktok_transcript(self, link: str) -> str:
-        return await self._download_and_extract_audio(link, "tiktok")
+        return _join_entries(await self._download_and_extract_audio(link, "tiktok"))
 
     async def twitch_transcript(self, link: str) -> str:
-        return await self._download_and_extract_audio(link, "twitch")
+        return _join_entries(await self._download_and_extract_audio(link, "twitch"))
 
     async def youtube_shorts_transcript(self, link: str) -> str:
+        entries, _ = await self.youtube_shorts_entries(link)
+        return _join_entries(entries)
+
+    async def youtube_shorts_entries(self, link: str) -> tuple[list[dict], str]:
+        """Caption entries of a Short when it has captions, Whisper segments otherwise, with their source."""
         video_id = vid_id(link)
         if not video_id:
-            return "Invalid YouTube Shorts URL"
+            raise TranscriptError("Invalid YouTube Shorts URL")
         try:
             # Try YouTubeTranscriptApi first (some Shorts have captions)
-            transcript = YouTubeTranscriptApi.get_transcript(video_id)
-            return " ".join([entry["text"] for entry in transcript])
+            transcript = await asyncio.to_thread(YouTubeTranscriptApi.get_transcript, video_id)
+            return _caption_entries(transcript), CAPTIONS_SOURCE
         except Exception:
             # Fallback to Whisper if no captions available
-            return await self._download_and_extract_audio(link, "youtube-shorts")
+            return await self._download_and_extract_audio(link, "youtube-shorts"), self.asr_source()
     
-    async def _download_and_extract_audio(self, link: str, platform: str) -> str:
-        """Helper method to download video and extract audio for transcription."""
-        temp_video_path = f"temp_{platform}_video.mp4"
-        temp_audio_path = f"temp_{platform}_audio.wav"
+    @asynccontextmanager
+    async def _http_session(self):
+        """The shared HTTP session when clients were injected, a session of its own otherwise."""
+        if self.clients is not None:
+            yield await self.clients.session()
+            return
+        # Only needed for platforms without captions, kept out of caption-only workers
+        import aiohttp
+
+        async with aiohttp.ClientSession() as session:
+            yield session
+
+    async def _download_and_extract_audio(self, link: str, platform: str) -> list[dict]:
+        """Helper method to stream the video through ffmpeg and transcribe its audio into timestamped segments."""
+        from .audio import SAMPLE_RATE, AudioDecodeError, decode_audio_stream, decode_audio_url
 
         try:
+            if self.asr_engine is None:
+                raise TranscriptError(f"No ASR engine configured to transcribe {platform} audio")
+
             # Download video (using TikMate for TikTok, placeholder for others)
             if platform == "tiktok":
-                async with aiohttp.ClientSession() as session:
+                async with self._http_session() as session:
                     api_url = f"https://tikmate.online/api/?url={link}"
                     async with session.get(api_url) as response:
                         if response.status != 200:
-                            return f"Failed to download {platform} video: HTTP {response.status}"
+                            raise TranscriptError(f"Failed to download {platform} video: HTTP {response.status}")
                         data = await response.json()
                         video_url = data.get("url")
                         if not video_url:
-                            return f"No video URL found for {platform}"
+                            raise TranscriptError(f"No video URL found for {platform}")
                         async with session.get(video_url) as video_response:
-                            if video_response.status == 200:
-                                with open(temp_video_path, "wb") as f:
-                                    f.write(await video_response.read())
-                            else:
-                                return f"Failed to download {platform} video: HTTP {video_response.status}"
+                            if video_response.status != 200:
+                                raise TranscriptError(f"Failed to download {platform} video: HTTP {video_response.status}")
+                            # The body goes to ffmpeg chunk by chunk, nothing touches the disk
+                            with span("audio_decode", platform=platform):
+                                try:
+                                    audio = await decode_audio_stream(video_response.content.iter_chunked(AUDIO_CHUNK_SIZE))
+                                except AudioDecodeError as e:
+                                    # MP4s with their index at the end can't be demuxed from a pipe
+                                    logger.info(f"Decoding the {platform} stream failed ({e}), letting ffmpeg fetch it")
+                                    audio = await decode_audio_url(video_url)
             else:
                 # Placeholder for Twitch/YouTube Shorts (replace with actual download logic)
-                return f"{platform.capitalize()} video download not implemented"
+                raise TranscriptError(f"{platform.capitalize()} video download not implemented")
 
-            # Extract audio
-            logger.info(f"Extracting audio from {temp_video_path}")
-            video = VideoFileClip(temp_video_path)
-            video.audio.write_audiofile(temp_audio_path)
-            video.close()
-            logger.info(f"Extracted audio to {temp_audio_path}")
+            logger.info(f"Decoded {len(audio) / SAMPLE_RATE:.1f}s of audio for {platform}")
 
             # Transcribe with Whisper
             logger.info(f"Transcribing audio with Whisper for {platform}")
-            result = self.whisper_model.transcribe(temp_audio_path, language="en")
-            transcript = result["text"].strip()
-            if not transcript:
-                return f"No speech detected in {platform} video"
-            return transcript
-
+            with span("asr", platform=platform, audio_seconds=len(audio) / SAMPLE_RATE):
+                result = await self.asr_engine.transcribe_long(audio, language="en")
+            if not result["text"].strip():
+                raise TranscriptError(f"No speech detected in {platform} video")
+            return [
+                {"text": segment["text"].strip(), "start": segment["start"], "end": segment["end"]}
+                for segment in result["segments"]
+                if segment["text"].strip()
+            ]
+
+        except TranscriptError:
+            raise
         except Exception as e:
             logger.error(f"Error processing {platform} transcript: {str(e)}")
-            return f"Error processing {platform} transcript: {str(e)}"
-        finally:
-            # Clean up temporary files
-            for path in (temp_video_path, temp_audio_path):
-                if os.path.exists(path):
-                    try:
-                        os.remove(path)
-                        logger.info(f"Removed temporary file: {path}")
-                    except Exception as e:
-                        logger.warning(f"Failed to remove {path}: {str(e)}")
-
-
-    
\ No newline at end of file
+            raise TranscriptError(f"Error processing {platform} transcript: {str(e)}") from e
@@ -0,0 +1,172 @@
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+
+from aiohttp import web
+
+_NUMBERED = re.compile(r"^\s*\[(\d+)\]\s*(.+)$", re.MULTILINE)
+_WORD = re.compile(r"[A-Za-z][A-Za-z'-]+")
+
+
+def _section(prompt: str, header: str) -> str | None:
+    """Text between a prompt's ``header:`` line and its trailing ``JSON:`` line."""
+    match = re.search(rf"\n\s*{header}:\n(.*)\n\s*JSON:", prompt, re.DOTALL)
+    return match.group(1).strip() if match else None
+
+
+def _fragments_of(sentence: str) -> list[str]:
+    # Deterministic stand-in for the model: sentences of six words or more yield one fragment
+    words = sentence.split()
+    return [" ".join(words[:6]).strip(".,!?")] if len(words) >= 6 else []
+
+
+def _keywords_of(fragment: str) -> list[str]:
+    return [word.lower() for word in _WORD.findall(fragment) if len(word) > 4][:3]
+
+
+def canned_reply(prompt: str) -> dict:
+    """The JSON object a well-behaved model would return for one of the pipeline's prompts."""
+    batched = _section(prompt, "Sentences")
+    if batched is not None:
+        return {
+            "sentences": [
+                {"index": int(index), "fragments": _fragments_of(sentence)}
+                for index, sentence in _NUMBERED.findall(batched)
+            ]
+        }
+    sentence = _section(prompt, "Sentence")
+    if sentence is not None:
+        return {"fragments": _fragments_of(sentence)}
+    fragment = _section(prompt, "Fragment")
+    if fragment is not None:
+        return {"keywords": _keywords_of(fragment)}
+    return {}
+
+
+class FakeOllama:
+    """
+    Stand-in for the Ollama HTTP API answering /api/chat with canned JSON.
+
+    Every reply takes ``latency`` seconds plus its output tokens at ``token_rate``
+    tokens per second, and at most ``parallel`` requests are generated at the same
+    time, like a single Ollama server with OLLAMA_NUM_PARALLEL. A share
+    ``error_rate`` of the requests fails with HTTP 500, to exercise retries.
+    Replies longer than the request's ``num_predict`` option are cut like a real
+    model's, with ``done_reason`` "length".
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        token_rate: float = 200.0,
+        parallel: int = 4,
+        jitter: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        error_rate: float = 0.0,
+    ):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.parallel = max(1, parallel)
+        self.jitter = jitter
+        self.host = host
+        self.port = port
+        self.error_rate = error_rate
+        self.calls = 0
+        self._slots: asyncio.Semaphore | None = None
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        self._slots = asyncio.Semaphore(self.parallel)
+        app = web.Application()
+        app.router.add_post("/api/chat", self._chat)
+        # Listed models, used by health checks
+        app.router.add_get("/api/tags", self._tags)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Pick up the port chosen by the OS when started with port 0
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _tags(self, request: web.Request) -> web.Response:
+        return web.json_response({"models": []})
+
+    async def _chat(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if self.error_rate and random.random() < self.error_rate:
+            self.calls += 1
+            return web.json_response({"error": "simulated failure"}, status=500)
+        prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+        content = json.dumps(canned_reply(prompt))
+        prompt_tokens = max(1, len(prompt) // 4)
+        output_tokens = max(1, len(content) // 4)
+        done_reason = "stop"
+        num_predict = (body.get("options") or {}).get("num_predict")
+        if num_predict and output_tokens > num_predict:
+            content, output_tokens, done_reason = content[:num_predict * 4], num_predict, "length"
+
+        self.calls += 1
+        async with self._slots:
+            started = time.perf_counter()
+            delay = self.latency + output_tokens / self.token_rate
+            if self.jitter:
+                delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+            await asyncio.sleep(delay)
+            duration = time.perf_counter() - started
+
+        return web.json_response({
+            "model": body.get("model", ""),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": done_reason,
+            "total_duration": int(duration * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": output_tokens,
+            "eval_duration": int(duration * 1e9),
+        })
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = FakeOllama(
+        args.latency, args.token_rate, args.parallel, args.jitter, args.host, args.port, args.error_rate
+    )
+    await server.start()
+    print(f"Fake Ollama listening on {server.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve a fake Ollama /api/chat with canned JSON replies.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every reply")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="output tokens per second")
+    parser.add_argument("--parallel", type=int, default=4, help="replies generated at the same time")
+    parser.add_argument("--jitter", type=float, default=0.0, help="relative random variation of reply times")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with HTTP 500")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import asyncio
+import os
+
+from ..Transcription.transcriptor import AnalyzeMediaLink
+
+TRANSCRIPTS_DIR = os.path.join(os.path.dirname(__file__), "transcripts")
+
+# Links of the recorded transcripts look like https://bench.local/<name>
+BENCH_LINK_PREFIX = "https://bench.local/"
+
+
+def recorded_transcripts() -> dict[str, str]:
+    """Recorded transcripts shipped with the benchmarks, keyed by name (short, medium, long)."""
+    transcripts = {}
+    for filename in sorted(os.listdir(TRANSCRIPTS_DIR)):
+        name, ext = os.path.splitext(filename)
+        if ext == ".txt":
+            with open(os.path.join(TRANSCRIPTS_DIR, filename), "r", encoding="utf-8") as f:
+                transcripts[name] = f.read().strip()
+    return transcripts
+
+
+def bench_link(name: str) -> str:
+    return BENCH_LINK_PREFIX + name
+
+
+class FakeTranscriptProvider(AnalyzeMediaLink):
+    """
+    Transcript provider serving recorded transcripts instead of fetching them.
+
+    ``latency`` simulates the time spent fetching a transcript.
+    """
+
+    def __init__(self, *args, latency: float = 0.0, transcripts: dict[str, str] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latency = latency
+        self.transcripts = transcripts if transcripts is not None else recorded_transcripts()
+
+    async def fetch(self, link, refresh=False):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        name = link.rsplit("/", 1)[-1]
+        if name not in self.transcripts:
+            return {"text": f"Unknown benchmark transcript: {name}", "entries": [], "source": "unknown"}
+        return {"text": self.transcripts[name], "entries": [], "source": "recorded"}
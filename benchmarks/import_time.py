@@ -0,0 +1,78 @@
+import argparse
+import json
+import re
+import subprocess
+import sys
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+# Heavy dependencies that caption-only workers should never import
+WATCHED = ("torch", "whisper", "moviepy", "numpy", "nltk", "aiohttp")
+
+
+def _import_times(statement: str) -> list[tuple[int, str, float]]:
+    """(nesting depth, module, cumulative milliseconds) of every import made by ``statement``."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "import failed")
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            entries.append((len(indent) // 2, name, int(cumulative) / 1000))
+    return entries
+
+
+def import_report(module: str, top: int = 15) -> dict:
+    """
+    Import ``module`` in a fresh interpreter under ``-X importtime`` and summarize the cost.
+
+    Returns:
+        dict: Total import time, the slowest direct imports (cumulative, in
+        milliseconds) and which watched heavy dependencies got imported
+    """
+    package = __package__.rsplit(".", 1)[0]
+    # Modules the interpreter imports on its own (site, encodings...) are not counted
+    startup = {name for _, name, _ in _import_times("pass")}
+    entries = _import_times(f"import {package}.{module}")
+
+    # Top-level entries are imported by the statement itself, their times add up to the total
+    roots = [ms for depth, name, ms in entries if depth == 0 and name not in startup]
+    # Their direct imports show where the time goes
+    children = [(name, ms) for depth, name, ms in entries if depth == 1]
+    imported = {name for _, name, _ in entries}
+    return {
+        "module": f"{package}.{module}",
+        "total_ms": sum(roots),
+        "slowest": [
+            {"module": name, "cumulative_ms": ms}
+            for name, ms in sorted(children, key=lambda child: child[1], reverse=True)[:top]
+        ],
+        "heavy_imports": sorted(name for name in WATCHED if name in imported),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Report the import time of a module of this package.")
+    parser.add_argument("module", nargs="?", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list")
+    parser.add_argument("--budget-ms", type=float, help="exit with status 1 when the import takes longer")
+    args = parser.parse_args(argv)
+
+    report = import_report(args.module, args.top)
+    if args.budget_ms is not None:
+        report["budget_ms"] = args.budget_ms
+        report["within_budget"] = report["total_ms"] <= args.budget_ms
+    print(json.dumps(report, indent=2))
+    if report.get("within_budget") is False:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
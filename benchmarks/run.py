@@ -0,0 +1,206 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+
+import numpy as np
+
+from .fake_ollama import FakeOllama
+from .fake_transcripts import FakeTranscriptProvider, bench_link, recorded_transcripts
+
+logger = logging.getLogger(__name__)
+
+TARGETS = ("analyzeTranscript", "keywordExtractor", "/transcription_analyzer")
+
+
+async def measure(call: Callable[[int], Awaitable], requests: int, concurrency: int) -> dict:
+    """
+    Issue ``requests`` calls with ``concurrency`` of them in flight, and time each one.
+
+    Returns:
+        dict: Latency percentiles in seconds, requests per second and error count
+    """
+    latencies = []
+    errors = 0
+    next_request = 0
+
+    async def client():
+        nonlocal next_request, errors
+        while next_request < requests:
+            i = next_request
+            next_request += 1
+            started = time.perf_counter()
+            try:
+                await call(i)
+            except Exception as e:
+                logger.error(f"Benchmark request {i} failed: {e}")
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(max(1, concurrency))))
+    elapsed = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies else (None, None, None)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "elapsed": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": float(p50) if p50 is not None else None,
+        "p95": float(p95) if p95 is not None else None,
+        "p99": float(p99) if p99 is not None else None,
+    }
+
+
+async def _run(args: argparse.Namespace) -> dict:
+    fake = FakeOllama(args.latency, args.token_rate, args.parallel, args.jitter)
+    await fake.start()
+    # Clients created without an explicit host (the endpoint's) go to the fake server
+    os.environ["OLLAMA_HOST"] = fake.url
+
+    import ollama
+    from ..Transcription.analysis import analyzeTranscript, keywordExtractor, llm_output_stats
+    from ..Transcription.prefilter import SentencePrefilter
+
+    transcripts = recorded_transcripts()
+    names = args.transcripts.split(",") if args.transcripts else list(transcripts)
+    targets = args.targets.split(",") if args.targets else list(TARGETS)
+    concurrencies = [int(value) for value in args.concurrency.split(",")]
+    options = {
+        key: value for key, value in {
+            "batch_size": args.batch_size,
+            "batch_token_budget": args.batch_token_budget,
+            "prefilter_threshold": args.prefilter_threshold,
+        }.items() if value is not None
+    }
+    fragment_options = {key: value for key, value in options.items() if key != "prefilter_threshold"}
+    if args.prefilter_threshold is not None:
+        fragment_options["prefilter"] = SentencePrefilter(threshold=args.prefilter_threshold)
+
+    results = []
+    failures = []
+
+    async def record(
+        target: str, name: str, concurrency: int, call: Callable[[int], Awaitable], expect_llm_calls: bool = True
+    ) -> None:
+        calls_before = fake.calls
+        result = await measure(call, args.requests, concurrency)
+        result.update({
+            "target": target,
+            "transcript": name,
+            "concurrency": concurrency,
+            "llm_calls_per_request": (fake.calls - calls_before) / args.requests,
+        })
+        logger.info(f"{target} {name} x{concurrency}: p50 {result['p50']}s, {result['rps']:.2f} req/s")
+        results.append(result)
+        # A pipeline that skipped the LLM (e.g. missing tokenizer data) would otherwise look like a speedup
+        if expect_llm_calls and result["llm_calls_per_request"] == 0:
+            logger.error(f"{target} {name} x{concurrency} made no LLM calls")
+            failures.append(f"{target} {name} x{concurrency}: no LLM calls")
+
+    try:
+        client = ollama.AsyncClient(host=fake.url)
+        for name in names:
+            transcript = transcripts[name]
+            if "analyzeTranscript" in targets:
+                for concurrency in concurrencies:
+                    await record("analyzeTranscript", name, concurrency,
+                                 lambda i: analyzeTranscript(transcript, client=client, **fragment_options),
+                                 expect_llm_calls=bool(transcript.strip()))
+            if "keywordExtractor" in targets:
+                fragments = await analyzeTranscript(transcript, client=client, **fragment_options)
+                for concurrency in concurrencies:
+                    await record("keywordExtractor", name, concurrency,
+                                 lambda i: keywordExtractor(fragments, client=client),
+                                 expect_llm_calls=bool(fragments["fragments"]))
+
+        if "/transcription_analyzer" in targets:
+            await _run_endpoint(args, names, concurrencies, options, record)
+    finally:
+        await fake.close()
+
+    return {
+        "timestamp": time.time(),
+        "config": {
+            "requests": args.requests,
+            "latency": args.latency,
+            "token_rate": args.token_rate,
+            "parallel": args.parallel,
+            "jitter": args.jitter,
+            "memo": args.memo,
+            "options": options,
+        },
+        "results": results,
+        # Runs that can't be compared, the command exits with status 1 when there are any
+        "failures": failures,
+        # Malformed replies and average output tokens per stage over the whole run
+        "llm_output": llm_output_stats(),
+    }
+
+
+async def _run_endpoint(args, names, concurrencies, options, record) -> None:
+    """Drive /transcription_analyzer in-process, with recorded transcripts instead of real links."""
+    import httpx
+
+    cache_dir = tempfile.mkdtemp(prefix="bench-")
+    os.environ.setdefault("TRANSCRIPT_CACHE_PATH", os.path.join(cache_dir, "transcripts.sqlite3"))
+    os.environ.setdefault("ASR_PRELOAD", "0")
+    os.environ.setdefault("LLM_MEMO_PATH", "")
+    os.environ.setdefault("ANALYSIS_STORE_PATH", "")
+
+    from .. import main as server
+    server.AnalyzeMediaLink = FakeTranscriptProvider
+    if not args.memo:
+        server.llm_memo = None
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            async def post(name: str):
+                response = await http.post("/transcription_analyzer", json={"link": bench_link(name), **options})
+                response.raise_for_status()
+
+            transcripts = recorded_transcripts()
+            for name in names:
+                for concurrency in concurrencies:
+                    # With the memo kept, repeated requests are served without LLM calls
+                    await record("/transcription_analyzer", name, concurrency, lambda i: post(name),
+                                 expect_llm_calls=not args.memo and bool(transcripts[name].strip()))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline against a fake Ollama server.")
+    parser.add_argument("--targets", help=f"comma-separated subset of {', '.join(TARGETS)}")
+    parser.add_argument("--transcripts", help="comma-separated recorded transcripts (default: all)")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrent request counts")
+    parser.add_argument("--requests", type=int, default=16, help="requests per target, transcript and concurrency")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake Ollama seconds added to every reply")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="fake Ollama output tokens per second")
+    parser.add_argument("--parallel", type=int, default=4, help="fake Ollama replies generated at the same time")
+    parser.add_argument("--jitter", type=float, default=0.0, help="fake Ollama relative variation of reply times")
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--batch-token-budget", type=int)
+    parser.add_argument("--prefilter-threshold", type=float)
+    parser.add_argument("--memo", action="store_true", help="keep the endpoint's LLM memo (off to measure cold calls)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    report = asyncio.run(_run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if report["failures"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
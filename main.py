@@ -1,19 +1,166 @@
-from fastapi import FastAPI
-from .models.requests import AnalyzeMediaRequest, AnalysisResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from .models.requests import AnalyzeMediaRequest, AnalysisResponse, JobResponse
 from .Transcription.transcriptor import AnalyzeMediaLink
-from .Transcription.analysis import analyzeTranscript, keywordExtractor
+from .Transcription.cache import TranscriptCache
+from .Transcription.memo import LLMMemo
+from .Transcription.store import AnalysisStore
+from .Transcription.admission import AdmissionController, AdmissionRejected
+from .Transcription.asr import ASREngine
+from .Transcription.deadline import DEFAULT_BUDGET_SECONDS
+from .Transcription.clients import SharedClients
+from .Transcription.pipeline import runAnalysis, streamAnalysis, with_heartbeats
+from .Transcription.jobs import JobManager, JobQueueFull
+from .Transcription.bulk import MAX_CONCURRENCY as BULK_MAX_CONCURRENCY, BulkStats, bulkAnalysis, iterLines
+from .Transcription.prefilter import prefilter_stats
+from .Transcription.analysis import STAGE_TEMPLATES, llm_output_stats
+from .Transcription.metrics import REGISTRY
+from .Transcription.resources import ensure_nltk_resources
+import asyncio
+import json
 import logging
+import os
 
-app = FastAPI()
-
+# Configure logging for better debug messages
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+transcript_cache = TranscriptCache.from_env()
+llm_memo = LLMMemo.from_env()
+analysis_store = AnalysisStore.from_env()
+
+# Seconds without output after which streaming endpoints send a heartbeat event
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "10"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Check the tokenizer data once here rather than on every request, every analysis needs it
+    if not await asyncio.to_thread(ensure_nltk_resources):
+        raise RuntimeError("NLTK sentence tokenizer data is missing")
+
+    # Memoized results of edited prompt templates can never hit again
+    if llm_memo is not None:
+        await llm_memo.prune(STAGE_TEMPLATES)
+
+    # Whisper is loaded once per server process, warm before the first request unless ASR_PRELOAD=0, and shared by every request
+    asr_engine = ASREngine.from_env()
+    await asr_engine.start()
+    app.state.asr_engine = asr_engine
+
+    # One HTTP session and Ollama client for the whole process, keeping connections alive across requests
+    clients = SharedClients.from_env()
+    await clients.start()
+    app.state.clients = clients
+    app.state.media = AnalyzeMediaLink(cache=transcript_cache, asr_engine=asr_engine, clients=clients)
+
+    # Caps the pipelines running at once and, through the wrapped client, the LLM calls in flight
+    admission = AdmissionController.from_env()
+    app.state.admission = admission
+    app.state.llm_client = admission.limit(clients.ollama)
+
+    async def job_pipeline(link: str, options: dict):
+        # Jobs are already queued by the job manager, they wait for a slot instead of being rejected
+        async with admission.admit("batch", bounded=False):
+            async for event in streamAnalysis(
+                link, app.state.media, memo=llm_memo, store=analysis_store, client=app.state.llm_client, **options
+            ):
+                yield event
+
+    job_manager = JobManager.from_env(job_pipeline)
+    await job_manager.start()
+    app.state.job_manager = job_manager
+    try:
+        yield
+    finally:
+        await job_manager.close()
+        await clients.close()
+        await asr_engine.close()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 @app.get("/")
 async def root():
     return {"message": "Initial"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    # Both stats run SQLite queries, kept off the event loop; the LLM memo may be disabled
+    return {
+        "transcripts": await asyncio.to_thread(transcript_cache.stats),
+        "llm": await asyncio.to_thread(llm_memo.stats) if llm_memo is not None else None,
+    }
+
+@app.get("/prefilter/stats")
+async def prefilter_statistics():
+    return prefilter_stats()
+
+def _analysis_store() -> AnalysisStore:
+    if analysis_store is None:
+        raise HTTPException(status_code=404, detail="The analysis store is disabled (ANALYSIS_STORE_PATH is empty)")
+    return analysis_store
+
+@app.get("/index/search")
+async def index_search(term: str, kind: str | None = None, limit: int = 50):
+    """Videos whose keywords (kind=keyword) or fragments (kind=fragment) mention a term, most frequent first."""
+    return await asyncio.to_thread(_analysis_store().search, term, kind, limit)
+
+@app.get("/index/prefix")
+async def index_prefix(prefix: str, kind: str | None = None, limit: int = 20):
+    """Indexed terms starting with a prefix, for autocompletion."""
+    return await asyncio.to_thread(_analysis_store().prefix, prefix, kind, limit)
+
+@app.get("/index/top")
+async def index_top(video: str, n: int = 10, kind: str | None = None):
+    """Most frequent terms of one video, given by link or video key."""
+    store = _analysis_store()
+    if await asyncio.to_thread(store.get, video) is None:
+        raise HTTPException(status_code=404, detail="Video not analyzed")
+    return await asyncio.to_thread(store.top_terms, video, n, kind)
+
+@app.get("/index/stats")
+async def index_stats():
+    return await asyncio.to_thread(_analysis_store().stats)
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Per LLM stage: replies, malformed replies by reason and average output tokens."""
+    return llm_output_stats()
+
+@app.get("/llm/backends")
+async def llm_backends(request: Request):
+    """Health, outstanding requests, latency and utilization of every Ollama backend."""
+    return request.app.state.clients.ollama.stats()
+
+@app.get("/admission/stats")
+async def admission_stats(request: Request):
+    """Running and queued pipelines per priority class, admissions, rejections and queue wait times."""
+    return request.app.state.admission.stats()
+
+@app.get("/asr/stats")
+async def asr_stats(request: Request):
+    return request.app.state.asr_engine.stats()
+
+def _remaining_budget(data: AnalyzeMediaRequest, waited: float) -> float | None:
+    """Latency budget left once admitted: the request's (or ANALYSIS_BUDGET_SECONDS) minus the admission wait."""
+    budget = data.budget_seconds if data.budget_seconds is not None else DEFAULT_BUDGET_SECONDS
+    return max(0.0, budget - waited) if budget is not None else None
+
 @app.post("/transcription_analyzer")
-async def transcriptor(data : AnalyzeMediaRequest):
+async def transcriptor(data : AnalyzeMediaRequest, request: Request):
     hyperlink_to_analyze = data.link
 
     logger.info(f"Analyzing the following media link {hyperlink_to_analyze}")
@@ -22,30 +169,113 @@ async def transcriptor(data : AnalyzeMediaRequest):
         logger.warn("No link to analyze")
         response = AnalysisResponse(success=False, details={})
         return response
-    
-    print(hyperlink_to_analyze)
 
-    Link = AnalyzeMediaLink()
 
-    transcript_final = await Link.transcript(hyperlink_to_analyze)
+    async with request.app.state.admission.admit(data.priority) as waited:
+        details = await runAnalysis(
+            hyperlink_to_analyze,
+            request.app.state.media,
+            batch_size=data.batch_size,
+            batch_token_budget=data.batch_token_budget,
+            memo=llm_memo,
+            prefilter_threshold=data.prefilter_threshold,
+            dedup_threshold=data.dedup_threshold,
+            budget_seconds=_remaining_budget(data, waited),
+            store=analysis_store,
+            client=request.app.state.llm_client,
+        )
 
+    response = AnalysisResponse(success=True,details=details)
 
-    keywords = ["Placeholder1","Placeholder2","Placeholder3"]
+    return response
 
-    analysis = await analyzeTranscript(transcript_final)
+@app.post("/transcription_analyzer/stream")
+async def transcriptor_stream(data : AnalyzeMediaRequest, request: Request, format: str = "ndjson"):
+    """Stream the analysis as NDJSON lines, or as Server-Sent Events with ?format=sse or Accept: text/event-stream."""
+    logger.info(f"Streaming analysis of the following media link {data.link}")
 
-    keywords = await keywordExtractor(analysis)
+    # Admitted before the response starts, so a full queue still gets a 429; the slot is held until the stream ends
+    slot = await request.app.state.admission.hold(data.priority)
+    try:
+        events = with_heartbeats(
+            slot.release_after(streamAnalysis(
+                data.link,
+                request.app.state.media,
+                batch_size=data.batch_size,
+                batch_token_budget=data.batch_token_budget,
+                memo=llm_memo,
+                prefilter_threshold=data.prefilter_threshold,
+                dedup_threshold=data.dedup_threshold,
+                budget_seconds=_remaining_budget(data, slot.waited),
+                store=analysis_store,
+                client=request.app.state.llm_client,
+            )),
+            interval=STREAM_HEARTBEAT_SECONDS,
+        )
 
-    
+        # The stream releases the slot when it ends; the background task covers a stream that never started
+        release = BackgroundTask(slot.aclose)
+        if format == "sse" or "text/event-stream" in request.headers.get("accept", ""):
+            async def sse():
+                async for event in events:
+                    yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            return StreamingResponse(
+                sse(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}, background=release
+            )
 
-    details = {
-        "hyperlink": hyperlink_to_analyze,
-        "transcript": transcript_final,
-        "important frags": analysis,
-        "keywords": keywords
+        async def ndjson():
+            async for event in events:
+                yield json.dumps(event) + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson", background=release)
+    except BaseException:
+        slot.release()
+        raise
 
+@app.post("/jobs", response_model=JobResponse)
+async def submit_job(data : AnalyzeMediaRequest, request: Request):
+    options = {
+        "batch_size": data.batch_size,
+        "batch_token_budget": data.batch_token_budget,
+        "prefilter_threshold": data.prefilter_threshold,
+        "dedup_threshold": data.dedup_threshold,
+        "budget_seconds": data.budget_seconds,
     }
+    try:
+        job, deduplicated = request.app.state.job_manager.submit(data.link, options)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return JobResponse(**job.to_dict(include_result=False), deduplicated=deduplicated)
 
-    response = AnalysisResponse(success=True,details=details)
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def job_status(job_id: str, request: Request):
+    job = request.app.state.job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return JobResponse(**job.to_dict())
+
+@app.get("/jobs")
+async def job_stats(request: Request):
+    return request.app.state.job_manager.stats()
+
+@app.post("/bulk_analyzer")
+async def bulk_analyzer(request: Request, concurrency: int = Query(4, ge=1, le=BULK_MAX_CONCURRENCY)):
+    """Analyze the links of a JSONL request body, streaming one NDJSON result per link and a final stats line."""
+    media = request.app.state.media
+    client = request.app.state.llm_client
+    admission = request.app.state.admission
+
+    async def analyze(link: str, options: dict) -> dict:
+        async with admission.admit("batch", bounded=False):
+            return await runAnalysis(link, media, memo=llm_memo, store=analysis_store, client=client, **options)
+
+    # The body is read up front: once the streaming response starts, the server's
+    # disconnect listener competes with request.stream() for the ASGI messages
+    body = await request.body()
+
+    async def results():
+        stats = BulkStats()
+        async for record in bulkAnalysis(iterLines(body.decode("utf-8").splitlines()), analyze, concurrency, stats=stats):
+            yield json.dumps(record) + "\n"
+        yield json.dumps({"stats": stats.to_dict()}) + "\n"
 
-    return response
\ No newline at end of file
+    return StreamingResponse(results(), media_type="application/x-ndjson")
@@ -1,9 +1,11 @@
-from .requests import AnalyzeMediaRequest, AnalysisResponse
-from .prompts import DescriptivePhrasesPrompt, KeywordExtractionPrompt
+from .requests import AnalyzeMediaRequest, AnalysisResponse, JobResponse
+from .prompts import DescriptivePhrasesPrompt, BatchedDescriptivePhrasesPrompt, KeywordExtractionPrompt
 
 __all__ = [
     "AnalyzeMediaRequest",
     "AnalysisResponse",
+    "JobResponse",
     "DescriptivePhrasesPrompt",
+    "BatchedDescriptivePhrasesPrompt",
     "KeywordExtractionPrompt"
 ]
\ No newline at end of file
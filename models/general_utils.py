@@ -1,4 +1,25 @@
 
+import re
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Words carrying no meaning of their own, left out when comparing or indexing text
+STOPWORDS = frozenset("""
+    a an and are as at be but by for from had has have he i if in is it its it's just my of on or our
+    so than that that's the their there they this to too very was we were what when which with you your
+""".split())
+
+
 class BasePrompt:
     template: str
     input_variables: list[str]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting prompts (~4 characters per token)."""
+    return max(1, (len(text) + 3) // 4)
+
+
+def words(text: str) -> list[str]:
+    """Lowercased words of a text, punctuation dropped."""
+    return _WORD.findall(text.lower())
@@ -32,6 +32,13 @@ class DescriptivePhrasesPrompt():
     
     input_variables = ["sentence"]
 
+    # Structured output format of the replies
+    schema = {
+        "type": "object",
+        "properties": {"fragments": {"type": "array", "items": {"type": "string"}}},
+        "required": ["fragments"],
+    }
+
 
 
 class KeywordExtractionPrompt():
@@ -40,7 +47,7 @@ class KeywordExtractionPrompt():
     Output format:
     Your output must be a single valid JSON object containing exactly one list (the number of keywords is variable):
 
-    "key_words": ["key word 1", key word 2"]
+    "keywords": ["keyword 1", "keyword 2"]
 
     Example fragment: "The desk also includes some level of collision avoidance but it's not very sensitive"
 
@@ -56,7 +63,7 @@ class KeywordExtractionPrompt():
      ====== End of Example =====
 
     **
-    IMPORTANT: Make sure to only return in the JSON format with the fragments key as a list of strings. No words or explanations are needed
+    IMPORTANT: Make sure to only return in the JSON format with the keywords key as a list of strings. No words or explanations are needed
     Prioritize finding descriptive keywords from the fragment
     **
 
@@ -68,3 +75,65 @@ class KeywordExtractionPrompt():
 
     input_variables = ["fragment"]
 
+    schema = {
+        "type": "object",
+        "properties": {"keywords": {"type": "array", "items": {"type": "string"}}},
+        "required": ["keywords"],
+    }
+
+
+
+class BatchedDescriptivePhrasesPrompt():
+    template = """For each numbered sentence in the following transcript excerpt your goal is to extract phrases that are being used to describe a product specifically, ignore anything that isn't super descriptive
+
+    Output Format:
+    Your output must be a single valid JSON object containing exactly one list with one entry per numbered sentence (the number of fragments per sentence is variable, use an empty list when a sentence has none):
+
+    "sentences": [{{"index": 0, "fragments": ["frag1","frag2"]}}]
+    Example:
+    [0] This chair is very pricy, for the poor quality of the design making
+    [1] Anyway, let's move on to the next one
+    [2] The armrests are soft and adjustable
+
+    Example JSON reponse:
+
+    {{
+        "sentences": [
+            {{"index": 0, "fragments": ["Chair is pricy", "Chair has poor quality design making"]}},
+            {{"index": 1, "fragments": []}},
+            {{"index": 2, "fragments": ["Armrests are soft", "Armrests are adjustable"]}}
+        ]
+    }}
+
+    ====== End of Example =====
+
+    **
+    IMPORTANT: Make sure to only return in the JSON format with one entry for every sentence index. No words or explanations are needed
+    Prioritize finding description fragments for a product
+    **
+
+    Sentences:
+    {sentences}
+
+    JSON:
+    """
+
+    input_variables = ["sentences"]
+
+    schema = {
+        "type": "object",
+        "properties": {
+            "sentences": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "index": {"type": "integer"},
+                        "fragments": {"type": "array", "items": {"type": "string"}},
+                    },
+                    "required": ["index", "fragments"],
+                },
+            },
+        },
+        "required": ["sentences"],
+    }
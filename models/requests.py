@@ -1,12 +1,32 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 
 class AnalyzeMediaRequest(BaseModel):
     "Request transcription and analysis via link"
 
     link: str #hyperlink to media
+    batch_size: Optional[int] = None #sentences per fragment prompt, one prompt per sentence if unset
+    batch_token_budget: Optional[int] = None #max estimated tokens of sentences per fragment prompt
+    prefilter_threshold: Optional[float] = None #min pre-filter score of sentences sent to the LLM, PREFILTER_THRESHOLD if unset
+    dedup_threshold: Optional[float] = None #cosine similarity from which fragments are collapsed, FRAGMENT_DEDUP_THRESHOLD if unset
+    budget_seconds: Optional[float] = None #latency budget, partial results past it, ANALYSIS_BUDGET_SECONDS if unset (jobs and bulk: no default)
+    priority: Literal["interactive", "batch"] = "interactive" #admission priority class, ignored by /jobs (always batch)
 
 class AnalysisResponse(BaseModel):
     "Response from Analysis"
     success: bool
-    details: Optional[dict] = None
\ No newline at end of file
+    details: Optional[dict] = None
+
+class JobResponse(BaseModel):
+    "Status of an asynchronous analysis job"
+    job_id: str
+    link: str
+    status: str #queued, running, done or failed
+    deduplicated: bool = False #True if the submission attached to an in-progress job
+    created_at: Optional[float] = None #unix time the job was queued
+    started_at: Optional[float] = None #unix time a worker started it
+    finished_at: Optional[float] = None #unix time it finished or failed
+    attached: int = 0 #later submissions merged into this job
+    progress: Optional[dict] = None #per-stage progress
+    result: Optional[dict] = None #same details as /transcription_analyzer once done
+    error: Optional[str] = None
@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+
+from ..Transcription.admission import AdmissionController, AdmissionRejected
+
+
+async def _queued(controller, priority, bounded=True):
+    """Start an acquire that has to wait, once it is in the queue."""
+    task = asyncio.create_task(controller.acquire(priority, bounded))
+    await asyncio.sleep(0)
+    return task
+
+
+def test_admits_up_to_max_pipelines():
+    async def run():
+        controller = AdmissionController(max_pipelines=2, max_queue=4)
+        assert await controller.acquire() == 0.0
+        assert await controller.acquire() == 0.0
+        waiting = await _queued(controller, "interactive")
+        assert controller.running == 2 and not waiting.done()
+        controller.release()
+        await waiting
+        assert controller.running == 2
+        controller.release()
+        controller.release()
+        assert controller.running == 0
+
+    asyncio.run(run())
+
+
+def test_release_serves_interactive_before_batch():
+    async def run():
+        controller = AdmissionController(max_pipelines=1, max_queue=4)
+        await controller.acquire()
+        batch = await _queued(controller, "batch")
+        interactive = await _queued(controller, "interactive")
+        controller.release()
+        await asyncio.wait_for(interactive, 1)
+        assert not batch.done()
+        controller.release()
+        await batch
+
+    asyncio.run(run())
+
+
+def test_full_queue_evicts_lower_priority_waiter():
+    async def run():
+        controller = AdmissionController(max_pipelines=1, max_queue=1)
+        await controller.acquire()
+        batch = await _queued(controller, "batch")
+        interactive = await _queued(controller, "interactive")
+        with pytest.raises(AdmissionRejected):
+            await batch
+        assert controller.rejected["batch"] == 1
+        controller.release()
+        await interactive
+        assert controller.running == 1
+
+    asyncio.run(run())
+
+
+def test_waiters_leave_queue_bound_before_their_task_resumes():
+    async def run():
+        controller = AdmissionController(max_pipelines=1, max_queue=1)
+        await controller.acquire()
+        batch = await _queued(controller, "batch")
+        interactive = await _queued(controller, "interactive")
+        # The batch waiter is evicted and the interactive one handed the slot, neither task has resumed yet
+        controller.release()
+        assert controller._bounded_waiting == 0
+        second = asyncio.create_task(controller.acquire("batch"))
+        third = asyncio.create_task(controller.acquire("batch"))
+        await asyncio.sleep(0)
+        assert not second.done()
+        with pytest.raises(AdmissionRejected):
+            await third
+        with pytest.raises(AdmissionRejected):
+            await batch
+        await interactive
+        assert controller.rejected["batch"] == 2
+        controller.release()
+        await asyncio.wait_for(second, 1)
+        assert controller.running == 1
+
+    asyncio.run(run())
+
+
+def test_full_queue_rejects_same_priority_newcomer():
+    async def run():
+        controller = AdmissionController(max_pipelines=1, max_queue=1)
+        await controller.acquire()
+        first = await _queued(controller, "interactive")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("interactive")
+        assert rejected.value.retry_after >= 1
+        controller.release()
+        await first
+
+    asyncio.run(run())
+
+
+def test_unbounded_waiters_skip_queue_bound():
+    async def run():
+        controller = AdmissionController(max_pipelines=1, max_queue=0)
+        await controller.acquire()
+        jobs = [await _queued(controller, "batch", bounded=False) for _ in range(3)]
+        for job in jobs:
+            controller.release()
+            await job
+        controller.release()
+        assert controller.running == 0
+
+    asyncio.run(run())
+
+
+def test_wait_timeout_rejects_and_frees_queue():
+    async def run():
+        controller = AdmissionController(max_pipelines=1, max_queue=4, max_wait=0.01)
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire()
+        assert controller.stats()["queued"] == {"interactive": 0, "batch": 0}
+        controller.release()
+        assert controller.running == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_is_not_handed_a_slot():
+    async def run():
+        controller = AdmissionController(max_pipelines=1, max_queue=4)
+        await controller.acquire()
+        waiting = await _queued(controller, "interactive")
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert controller.stats()["queued"]["interactive"] == 0
+        controller.release()
+        assert controller.running == 0
+
+    asyncio.run(run())
+
+
+def test_slot_release_is_idempotent():
+    async def run():
+        controller = AdmissionController(max_pipelines=1, max_queue=4)
+        slot = await controller.hold()
+        waiting = await _queued(controller, "interactive")
+        slot.release()
+        await slot.aclose()
+        await waiting
+        assert controller.running == 1
+        controller.release()
+        assert controller.running == 0
+
+    asyncio.run(run())
+
+
+def test_slot_released_when_stream_ends():
+    async def run():
+        controller = AdmissionController(max_pipelines=1)
+        slot = await controller.hold()
+
+        async def events():
+            yield 1
+            yield 2
+
+        assert [event async for event in slot.release_after(events())] == [1, 2]
+        assert slot.released and controller.running == 0
+
+    asyncio.run(run())
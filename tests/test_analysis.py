@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from ..Transcription.analysis import (
+    STAGE_SCHEMAS,
+    _conforms,
+    clean_strings,
+    extract_batched_fragments,
+    generation_options,
+    parse_reply,
+)
+from ..Transcription.metrics import LLM_MALFORMED
+
+
+def _response(content: str, done_reason: str = "stop") -> dict:
+    return {"message": {"role": "assistant", "content": content}, "done_reason": done_reason}
+
+
+def _malformed(stage: str, reason: str) -> float:
+    return LLM_MALFORMED.value(stage=stage, reason=reason)
+
+
+def test_parses_conforming_reply():
+    reply = parse_reply(_response('{"keywords": ["collision avoidance", "sensitive"]}'), "keywords", "fragment 1")
+    assert reply == {"keywords": ["collision avoidance", "sensitive"]}
+
+
+def test_extracts_object_wrapped_in_text():
+    content = 'Sure! Here it is:\n{"fragments": ["Chair is pricy"]}\nHope this helps.'
+    assert parse_reply(_response(content), "fragments", "sentence 1") == {"fragments": ["Chair is pricy"]}
+
+
+@pytest.mark.parametrize("content, done_reason, reason", [
+    ("", "stop", "empty"),
+    ("   ", "stop", "empty"),
+    ("no json here", "stop", "invalid_json"),
+    ('{"keywords": ["desk", "sturd', "length", "truncated"),
+    ('{"key_words": ["desk"]}', "stop", "schema"),
+    ('{"keywords": "desk"}', "stop", "schema"),
+    ('{"keywords": [1, 2]}', "stop", "schema"),
+])
+def test_malformed_replies_are_counted(content, done_reason, reason):
+    before = _malformed("keywords", reason)
+    assert parse_reply(_response(content, done_reason), "keywords", "fragment 1") is None
+    assert _malformed("keywords", reason) == before + 1
+
+
+def test_missing_message():
+    before = _malformed("fragments", "empty")
+    assert parse_reply({}, "fragments", "sentence 1") is None
+    assert _malformed("fragments", "empty") == before + 1
+
+
+def test_conforms_to_batched_schema():
+    schema = STAGE_SCHEMAS["fragments_batched"]
+    assert _conforms({"sentences": [{"index": 0, "fragments": ["a"]}]}, schema)
+    assert _conforms({"sentences": []}, schema)
+    assert not _conforms({"sentences": [{"index": "0", "fragments": []}]}, schema)
+    # Booleans are not integers in JSON schema
+    assert not _conforms({"sentences": [{"index": True, "fragments": []}]}, schema)
+    assert not _conforms({"sentences": [{"fragments": []}]}, schema)
+    assert not _conforms([], schema)
+
+
+def test_conforms_ignores_extra_keys():
+    assert _conforms({"keywords": ["a"], "note": 3}, STAGE_SCHEMAS["keywords"])
+
+
+def test_clean_strings():
+    assert clean_strings([" desk ", "", '"quoted"', "'single'", '"', "  "]) == ["desk", "quoted", "single", '"']
+
+
+def test_batched_fragments_mapped_to_positions():
+    reply = {"sentences": [
+        {"index": 1, "fragments": [" Armrests are soft "]},
+        {"index": 0, "fragments": []},
+        {"index": 7, "fragments": ["out of range"]},
+    ]}
+    assert extract_batched_fragments(reply, 2, 10) == [[], ["Armrests are soft"]]
+
+
+def test_incomplete_batch_is_rejected():
+    before = _malformed("fragments_batched", "incomplete")
+    reply = {"sentences": [{"index": 0, "fragments": ["a"]}]}
+    assert extract_batched_fragments(reply, 3, 0) is None
+    assert _malformed("fragments_batched", "incomplete") == before + 1
+
+
+def test_generation_options_scale_with_batch():
+    single = generation_options("fragments_batched")
+    batched = generation_options("fragments_batched", units=4)
+    assert batched["options"]["num_predict"] == 4 * single["options"]["num_predict"]
+    assert batched["format"] is STAGE_SCHEMAS["fragments_batched"]
+    # The schema must be serializable as the request's format
+    json.dumps(generation_options("keywords"))
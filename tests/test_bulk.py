@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+from ..Transcription.bulk import bulkAnalysis, completed_lines, iterLines, parse_link_line, runBulkFile
+
+
+def _write_lines(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def test_parse_link_line_forms():
+    assert parse_link_line("https://a") == ("https://a", {})
+    assert parse_link_line('"https://a"') == ("https://a", {})
+    assert parse_link_line('{"url": "https://a", "batch_size": 4, "priority": "x"}') == ("https://a", {"batch_size": 4})
+    assert parse_link_line("   ") is None
+
+
+def test_completed_lines_counts_only_successes(tmp_path):
+    output = tmp_path / "out.jsonl"
+    _write_lines(output, [
+        {"line": 1, "link": "https://a", "success": True, "details": {}},
+        {"line": 2, "link": "https://b", "success": False, "error": "boom"},
+        {"line": 3, "link": "https://c", "success": True, "details": {}},
+    ])
+    assert completed_lines(str(output)) == {1, 3}
+
+
+def test_completed_lines_truncates_partial_record(tmp_path):
+    output = tmp_path / "out.jsonl"
+    _write_lines(output, [{"line": 1, "link": "https://a", "success": True}])
+    with open(output, "a", encoding="utf-8") as f:
+        f.write('{"line": 2, "link": "htt')
+
+    assert completed_lines(str(output)) == {1}
+    assert output.read_text(encoding="utf-8").endswith("}\n")
+
+
+def test_completed_lines_missing_output(tmp_path):
+    assert completed_lines(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_resume_retries_failed_links(tmp_path):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    source.write_text("https://a\nhttps://b\nhttps://c\n", encoding="utf-8")
+    failing = {"https://b"}
+    analyzed = []
+
+    async def analyze(link, options):
+        analyzed.append(link)
+        if link in failing:
+            raise RuntimeError("boom")
+        return {"link": link}
+
+    first = asyncio.run(runBulkFile(str(source), str(output), analyze, concurrency=2))
+    assert (first["done"], first["failed"]) == (2, 1)
+
+    failing.clear()
+    analyzed.clear()
+    second = asyncio.run(runBulkFile(str(source), str(output), analyze, concurrency=2))
+    assert analyzed == ["https://b"]
+    assert (second["done"], second["failed"], second["skipped"]) == (1, 0, 2)
+    assert completed_lines(str(output)) == {1, 2, 3}
+
+
+def test_closing_early_cancels_and_awaits_workers():
+    cancelled = []
+
+    async def analyze(link, options):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(link)
+            raise
+        return {}
+
+    async def run():
+        stream = bulkAnalysis(iterLines(["https://a", "https://b"]), analyze, concurrency=2)
+        consume = asyncio.create_task(stream.__anext__())
+        await asyncio.sleep(0.05)
+        consume.cancel()
+        await asyncio.gather(consume, return_exceptions=True)
+        await stream.aclose()
+        return sorted(cancelled)
+
+    assert asyncio.run(run()) == ["https://a", "https://b"]
@@ -0,0 +1,49 @@
+from ..Transcription.dedup import FragmentDeduplicator, collapse_fragments, embed_fragments
+
+
+def test_collapses_near_duplicates_into_first_occurrence():
+    fragments = [
+        "The desk is very sturdy",
+        "Monitor arm is easy to install",
+        "the desk is really sturdy",
+        "Desk is very sturdy!",
+    ]
+    representatives, clusters = collapse_fragments(fragments, threshold=0.7)
+    assert representatives == ["The desk is very sturdy", "Monitor arm is easy to install"]
+    assert clusters == [
+        {"representative": 0, "members": [0, 2, 3]},
+        {"representative": 1, "members": [1]},
+    ]
+
+
+def test_keeps_distinct_fragments():
+    fragments = ["Battery lasts two days", "Screen is bright outdoors", "Keyboard feels mushy"]
+    representatives, clusters = collapse_fragments(fragments, threshold=0.85)
+    assert representatives == fragments
+    assert [cluster["members"] for cluster in clusters] == [[0], [1], [2]]
+
+
+def test_threshold_of_one_only_merges_identical_content():
+    representatives, _ = collapse_fragments(["Chair is comfy", "chair is comfy.", "Chair is comfier"], threshold=1.0)
+    assert representatives == ["Chair is comfy", "Chair is comfier"]
+
+
+def test_fragments_without_content_words_are_never_merged():
+    dedup = FragmentDeduplicator(threshold=0.5)
+    assert dedup.add("it is") is None
+    assert dedup.add("it is") is None
+    assert dedup.stats() == {"fragments": 2, "clusters": 2, "collapsed": 0}
+
+
+def test_embeddings_are_unit_length():
+    vectors = embed_fragments(["Sturdy steel frame", "and the"], dim=64)
+    assert vectors.shape == (2, 64)
+    assert abs(float((vectors[0] ** 2).sum()) - 1.0) < 1e-5
+    assert not vectors[1].any()
+
+
+def test_grows_past_initial_capacity():
+    dedup = FragmentDeduplicator(threshold=0.99)
+    for i in range(40):
+        assert dedup.add(f"unique{i} word{i * 7}") is None
+    assert dedup.add("unique3 word21") == 3
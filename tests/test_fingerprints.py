@@ -0,0 +1,71 @@
+import asyncio
+
+from ..Transcription.fingerprints import STAGES, dedup_fingerprint, stage_fingerprints, stale_stages
+from ..Transcription import dedup, prefilter
+from ..Transcription.reanalyze import reanalyzeStored
+
+
+def test_stale_stages_up_to_date():
+    current = stage_fingerprints("captions")
+    assert stale_stages(dict(current), current) == []
+
+
+def test_stale_stages_from_first_change_downstream():
+    current = stage_fingerprints("captions")
+    recorded = {**current, "dedup": "old", "segmentation": "old"}
+    assert stale_stages(recorded, current) == ["segmentation", "fragments", "dedup", "keywords"]
+
+
+def test_stale_stages_missing_record():
+    current = stage_fingerprints("captions")
+    recorded = {stage: current[stage] for stage in STAGES if stage != "keywords"}
+    assert stale_stages(recorded, current) == ["keywords"]
+    assert stale_stages({}, current) == list(STAGES)
+
+
+def test_options_change_their_stage_only():
+    base = stage_fingerprints("captions", dedup_threshold=0.85)
+    changed = stage_fingerprints("captions", dedup_threshold=0.9)
+    assert [stage for stage in STAGES if base[stage] != changed[stage]] == ["dedup"]
+    assert stage_fingerprints("whisper:base")["transcript"] != base["transcript"]
+    assert dedup_fingerprint(None) != dedup_fingerprint(0.85)
+
+
+class _Store:
+    """Stage records of stored analyses, as read by reanalyzeStored."""
+
+    def __init__(self, records: dict[str, dict]):
+        self.records = records
+
+    def videos(self):
+        return [(key, f"https://example.com/{key}") for key in self.records]
+
+    @staticmethod
+    def key(video):
+        return video
+
+    def stages(self, key):
+        return self.records[key]
+
+
+def test_reanalysis_counts_partial_records_as_failed():
+    # The options reanalyzeStored falls back to
+    current = stage_fingerprints(
+        "captions", prefilter_threshold=prefilter.DEFAULT_THRESHOLD, dedup_threshold=dedup.DEFAULT_THRESHOLD
+    )
+    outputs = {
+        "transcript": {"source": "captions"},
+        "segmentation": [{"text": "One."}, {"text": "Two."}],
+        "fragments": ["one", "two"],
+        "dedup": ["one"],
+        "keywords": [],
+    }
+    store = _Store({
+        "up-to-date": {stage: {"fingerprint": current[stage], "output": outputs[stage]} for stage in STAGES},
+        # No fingerprints, e.g. written by an interrupted run
+        "partial": {"transcript": {"output": {"source": "captions"}}},
+    })
+
+    stats = asyncio.run(reanalyzeStored(store, media=None, dry_run=True))
+    assert (stats["videos"], stats["up_to_date"], stats["failed"]) == (2, 1, 1)
+    assert stats["llm_calls_skipped"] == 3
@@ -0,0 +1,68 @@
+import pytest
+
+from ..Transcription.sentiment import LexiconSentimentScorer, analyze_sentiment, load_lexicon
+
+
+@pytest.fixture
+def scorer():
+    return LexiconSentimentScorer()
+
+
+def test_polarity_signs(scorer):
+    scores = scorer.score(["The screen is great", "The hinge is flimsy", "It ships in a box"])
+    assert scores[0] > 0 > scores[1]
+    assert scores[2] == 0
+
+
+def test_negation_flips_polarity(scorer):
+    plain, negated = scorer.score(["the chair is sturdy", "the chair is not sturdy"])
+    assert plain > 0 > negated
+
+
+def test_intensifiers_scale_magnitude(scorer):
+    plain, boosted, damped = scorer.score(["it is good", "it is very good", "it is slightly good"])
+    assert boosted > plain > damped > 0
+
+
+def test_clause_after_contrast_dominates(scorer):
+    (score,) = scorer.score(["great screen but the battery is terrible"])
+    assert score < 0
+
+
+def test_empty_texts(scorer):
+    scores = scorer.score(["", "nice", ""])
+    assert scores[0] == scores[2] == 0
+    assert scores[1] == pytest.approx(scorer.score(["nice"])[0])
+    assert len(scorer.score([])) == 0
+
+
+def test_analyze_sentiment_aggregates(scorer):
+    fragments = ["Battery life is excellent", "Battery charger is awful", "Screen is bright", "Ships today"]
+    result = analyze_sentiment(fragments, ["battery", "screen", "warranty"], scorer)
+
+    assert len(result["fragments"]) == 4
+    video = result["video"]
+    assert (video["positive"], video["negative"], video["neutral"]) == (2, 1, 1)
+    keywords = {entry["keyword"]: entry for entry in result["keywords"]}
+    assert keywords["battery"]["mentions"] == 2
+    assert keywords["battery"]["score"] == pytest.approx((result["fragments"][0] + result["fragments"][1]) / 2, abs=1e-3)
+    assert keywords["screen"]["score"] > 0
+    assert keywords["warranty"] == {"keyword": "warranty", "score": 0.0, "mentions": 0}
+
+
+def test_multi_word_keywords_match_as_phrases(scorer):
+    result = analyze_sentiment(["the battery life is great", "life of the battery is poor"], ["battery life"], scorer)
+    assert result["keywords"][0]["mentions"] == 1
+
+
+def test_analyze_sentiment_without_fragments(scorer):
+    result = analyze_sentiment([], ["desk"], scorer)
+    assert result["fragments"] == [] and result["video"]["score"] == 0.0
+    assert result["keywords"][0]["mentions"] == 0
+
+
+def test_load_lexicon(tmp_path):
+    path = tmp_path / "lexicon.txt"
+    path.write_text("# comment\ngrand\t2.5\t0.5\t[2, 3]\nbroken line\nmeh\tbad\n", encoding="utf-8")
+    assert load_lexicon(str(path)) == {"grand": 2.5}
+    assert LexiconSentimentScorer(load_lexicon(str(path))).score(["grand"])[0] > 0